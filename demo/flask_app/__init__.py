@@ -4,7 +4,15 @@ from flask import Flask, g
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from .models import db
-from .plant import get_plant_and_notifications
+from .engine import engine_options, engine_profile
+from .routing import REPLICA_BIND_PREFIX
+from .presence import presence
+from .images import images
+from .fragment_cache import fragment_cache
+from .recommend import recommender
+from .api import jwt
+from .plant import get_notifications
+from .search import include_object
 
 def create_app(test_config=None):
     app = Flask(__name__, instance_relative_config=True)
@@ -17,8 +25,17 @@ def create_app(test_config=None):
         app.config.from_mapping(test_config)
 
     # Database configuration
-    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or \
-        'sqlite:///' + os.path.join(app.instance_path, 'app.sqlite')
+    uri, options = engine_options(
+        app.config, os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(app.instance_path, 'app.sqlite')
+    )
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    # Options set in SQLALCHEMY_ENGINE_OPTIONS override the engine profile
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**options, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for number, replica_uri in enumerate(app.config['DATABASE_REPLICA_URLS']):
+        uri, options = engine_options(app.config, replica_uri)
+        binds[f'{REPLICA_BIND_PREFIX}{number}'] = {'url': uri, **options}
+    app.config['SQLALCHEMY_BINDS'] = binds
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
     try:
@@ -28,7 +45,13 @@ def create_app(test_config=None):
 
     # Initialize extensions
     db.init_app(app)
-    migrate = Migrate(app, db)
+    engine_profile.init_app(app)
+    migrate = Migrate(app, db, include_object=include_object)
+    presence.init_app(app)
+    images.init_app(app)
+    fragment_cache.init_app(app)
+    recommender.init_app(app)
+    jwt.init_app(app)
 
     # Register blueprints
     from . import auth
@@ -41,17 +64,44 @@ def create_app(test_config=None):
     app.register_blueprint(plant.bp)
     app.add_url_rule('/', endpoint='index')
 
+    # Conditional responses and fingerprinted static URLs
+    from . import http_cache
+    http_cache.init_app(app)
+
+    # Catalogue images are shown from their local copies, see catalogue_images.py
+    from . import catalogue_images
+    catalogue_images.init_app(app)
+
+    # Build the in-memory plant name index once per process
+    from . import autocomplete
+    autocomplete.init_app(app)
+
     @app.context_processor
     def inject_notifications():
         if g.user:
-            plants, notifications = get_plant_and_notifications()
+            notifications = get_notifications()
             per_page = app.config['PLANTS_PER_PAGE']
             return dict(notifications=notifications, notification_count=len(notifications), per_page=per_page)
         return dict(notifications=[], notification_count=0)
 
     # Import custom CLI commands
-    from flask_app.commands import import_plants_command, update_plants_command  # Use absolute import
+    from flask_app.commands import (  # Use absolute import
+        import_plants_command, update_plants_command, sync_plants_command, bench_search_command,
+        sweep_notifications_command, generate_image_variants_command, cache_plant_images_command,
+        bench_fragment_cache_command, refresh_watering_rollups_command,
+        fit_consumption_model_command, bench_facets_command, bench_pool_command
+    )
     app.cli.add_command(import_plants_command)
     app.cli.add_command(update_plants_command)
+    app.cli.add_command(sync_plants_command)
+    app.cli.add_command(bench_search_command)
+    app.cli.add_command(sweep_notifications_command)
+    app.cli.add_command(generate_image_variants_command)
+    app.cli.add_command(cache_plant_images_command)
+    app.cli.add_command(bench_fragment_cache_command)
+    app.cli.add_command(refresh_watering_rollups_command)
+    app.cli.add_command(fit_consumption_model_command)
+    app.cli.add_command(bench_facets_command)
+    app.cli.add_command(bench_pool_command)
 
     return app
@@ -0,0 +1,375 @@
+# flask_app/api.py
+import base64
+import binascii
+import functools
+import json
+from datetime import datetime
+from flask import Blueprint, Response, g, jsonify, request, stream_with_context, url_for
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt, get_jwt_identity, verify_jwt_in_request
+from werkzeug.exceptions import BadRequest, HTTPException, NotFound
+from werkzeug.security import check_password_hash
+
+from flask_app.auth import UserProxy
+from flask_app.catalogue import PlantRecord, get_plant_record, get_plant_records
+from flask_app.http_cache import bump_plants_version
+from flask_app.models import db, User, UserPlant
+from flask_app.notifications import get_user_notifications, sync_notification
+from flask_app.presence import presence
+from flask_app.recommend import recommender
+from flask_app.schedule import refresh_user_plant_schedule, start_of_tomorrow
+from flask_app.watering import PERIODS, record_watering, water_plants, water_use
+
+# Registered on the plant blueprint, so endpoints are named plant.api_v1.<view>
+bp = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+jwt = JWTManager()
+
+# Fields of a plant in API responses; ?fields= selects a subset
+USER_PLANT_FIELDS = (
+    'user_plant_id',
+    'plant_id',
+    'plant_nickname',
+    'size',
+    'sun_exposure',
+    'pot_diameter',
+    'plant_position',
+    'last_watered',
+    'watered_amount',
+    'image_path',
+    'daily_consumption_l',
+    'next_watering_at',
+    'row_version'
+)
+CATALOGUE_FIELDS = tuple(name for name in PlantRecord.__slots__ if name != 'plant_id')
+COMPUTED_FIELDS = ('needs_watering',)
+FIELDS = USER_PLANT_FIELDS + CATALOGUE_FIELDS + COMPUTED_FIELDS
+
+SUN_EXPOSURES = ('low', 'medium', 'high')
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+EXPORT_BATCH_SIZE = 500
+
+
+def token_required(view):
+    """Authenticate the request with its bearer token and set g.user from the token's claims."""
+    @functools.wraps(view)
+    def wrapped_view(**kwargs):
+        verify_jwt_in_request()
+        claims = get_jwt()
+        g.user = UserProxy({
+            'user_id': int(get_jwt_identity()),
+            'username': claims['username'],
+            'avatar': claims['avatar'],
+            'user_version': claims['user_version']
+        })
+        presence.touch(g.user.user_id)
+        return view(**kwargs)
+    return wrapped_view
+
+
+@bp.errorhandler(HTTPException)
+def handle_http_exception(e):
+    return jsonify(error=e.description), e.code
+
+
+def _parse_date(value):
+    """Parse an ISO 8601 date or date and time. Times with a UTC offset are converted to naive
+    local time, the convention of the stored datetimes they are compared with."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise BadRequest(f'Invalid date {value!r}, expected YYYY-MM-DD or an ISO 8601 date and time.')
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def _parse_float(value, name):
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise BadRequest(f'Invalid number for {name}: {value!r}.')
+
+
+def _parse_sun_exposure(value):
+    if value not in SUN_EXPOSURES:
+        raise BadRequest(f'sun_exposure must be one of {", ".join(SUN_EXPOSURES)}.')
+    return value
+
+
+def _parse_text(value):
+    return None if value is None else str(value)
+
+
+# Writable fields and their parsers
+WRITABLE_FIELDS = {
+    'size': lambda value: _parse_float(value, 'size'),
+    'sun_exposure': _parse_sun_exposure,
+    'last_watered': _parse_date,
+    'pot_diameter': lambda value: _parse_float(value, 'pot_diameter'),
+    'watered_amount': lambda value: _parse_float(value, 'watered_amount'),
+    'plant_position': _parse_text,
+    'plant_nickname': _parse_text
+}
+
+
+def _json_body():
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        raise BadRequest('Expected a JSON object.')
+    return body
+
+
+def _requested_fields():
+    """Return the fields selected with ?fields=a,b,c, or all of them."""
+    fields = request.args.get('fields')
+    if not fields:
+        return FIELDS
+    selected = tuple(field.strip() for field in fields.split(',') if field.strip())
+    unknown = sorted(set(selected) - set(FIELDS))
+    if unknown:
+        raise BadRequest(f'Unknown field(s) {", ".join(unknown)}.')
+    return selected
+
+
+def _encode_cursor(user_plant_id):
+    return base64.urlsafe_b64encode(str(user_plant_id).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    if not cursor:
+        return 0
+    try:
+        return int(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise BadRequest('Invalid cursor.')
+
+
+def _plants_query(fields):
+    """Select the user plant columns needed for fields, for the current user, in user_plant_id order."""
+    columns = {'user_plant_id', 'plant_id'} | {field for field in fields if field in USER_PLANT_FIELDS}
+    if 'needs_watering' in fields:
+        columns.add('next_watering_at')
+    return db.select(*[getattr(UserPlant, name) for name in USER_PLANT_FIELDS if name in columns]) \
+        .where(UserPlant.user_id == g.user.user_id).order_by(UserPlant.user_plant_id)
+
+
+def _serialize(rows, fields):
+    """Turn user plant rows into dicts with the requested fields, catalogue fields from the cache."""
+    records = get_plant_records([row.plant_id for row in rows]) if set(fields) & set(CATALOGUE_FIELDS) else {}
+    due_before = start_of_tomorrow()
+    items = []
+    for row in rows:
+        item = {}
+        for field in fields:
+            if field in USER_PLANT_FIELDS:
+                value = getattr(row, field)
+            elif field == 'needs_watering':
+                value = row.next_watering_at is not None and row.next_watering_at < due_before
+            else:
+                value = getattr(records.get(row.plant_id), field, None)
+            item[field] = value.isoformat() if isinstance(value, datetime) else value
+        items.append(item)
+    return items
+
+
+def _get_user_plant(user_plant_id):
+    user_plant = db.session.get(UserPlant, user_plant_id)
+    # Other users' plants are reported as missing
+    if user_plant is None or user_plant.user_id != g.user.user_id:
+        raise NotFound(f'Plant {user_plant_id} not found.')
+    return user_plant
+
+
+def _plant_response(user_plant_id, status=200):
+    row = db.session.execute(_plants_query(FIELDS).where(UserPlant.user_plant_id == user_plant_id)).one()
+    return jsonify(_serialize([row], _requested_fields())[0]), status
+
+
+def _after_write(user_plant):
+    record_watering(user_plant)
+    refresh_user_plant_schedule(user_plant)
+    sync_notification(user_plant)
+    bump_plants_version(user_plant.user_id)
+    db.session.commit()
+
+
+@bp.route('/tokens', methods=('POST',))
+def create_token():
+    """Exchange a username and password for an access token."""
+    body = _json_body()
+    user = User.query.filter_by(username=body.get('username')).first()
+    if user is None or not check_password_hash(user.password, body.get('password') or ''):
+        return jsonify(error='Incorrect username or password.'), 401
+    access_token = create_access_token(
+        identity=str(user.user_id),
+        additional_claims={'username': user.username, 'avatar': user.avatar, 'user_version': user.user_version}
+    )
+    return jsonify(access_token=access_token)
+
+
+@bp.route('/plants', methods=('GET',))
+@token_required
+def list_plants():
+    """List the user's plants, ?limit= at a time; pass the returned next_cursor as ?cursor= for more."""
+    fields = _requested_fields()
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    after = _decode_cursor(request.args.get('cursor'))
+
+    rows = db.session.execute(
+        _plants_query(fields).where(UserPlant.user_plant_id > after).limit(limit + 1)
+    ).all()
+    next_cursor = _encode_cursor(rows[limit - 1].user_plant_id) if len(rows) > limit else None
+    return jsonify(data=_serialize(rows[:limit], fields), next_cursor=next_cursor)
+
+
+@bp.route('/plants/<int:user_plant_id>', methods=('GET',))
+@token_required
+def get_plant(user_plant_id):
+    return _plant_response(_get_user_plant(user_plant_id).user_plant_id)
+
+
+@bp.route('/plants/due', methods=('GET',))
+@token_required
+def due_plants():
+    """List the user's plants that need watering today."""
+    notifications = get_user_notifications(g.user.user_id)
+    return jsonify(data=[
+        {
+            'user_plant_id': notification['user_plant_id'],
+            'plant_name': notification['plant_name'],
+            'overdue_days': notification['overdue_days']
+        }
+        for notification in notifications
+    ])
+
+
+@bp.route('/plants', methods=('POST',))
+@token_required
+def create_plant():
+    """Register a catalogue plant for the user."""
+    body = _json_body()
+    plant_id = body.get('plant_id')
+    if not isinstance(plant_id, int) or get_plant_record(plant_id) is None:
+        raise BadRequest('plant_id must be the id of a catalogue plant.')
+    for field in ('sun_exposure', 'last_watered', 'pot_diameter', 'watered_amount'):
+        if body.get(field) is None:
+            raise BadRequest(f'{field} is required.')
+
+    user_plant = UserPlant(user_id=g.user.user_id, plant_id=plant_id)
+    for field, parse in WRITABLE_FIELDS.items():
+        setattr(user_plant, field, parse(body.get(field)))
+    db.session.add(user_plant)
+    _after_write(user_plant)
+
+    response, status = _plant_response(user_plant.user_plant_id, 201)
+    response.headers['Location'] = url_for('.get_plant', user_plant_id=user_plant.user_plant_id)
+    return response, status
+
+
+@bp.route('/plants/<int:user_plant_id>', methods=('PATCH',))
+@token_required
+def update_plant(user_plant_id):
+    """Change the given fields of one of the user's plants."""
+    user_plant = _get_user_plant(user_plant_id)
+    body = _json_body()
+    unknown = sorted(set(body) - set(WRITABLE_FIELDS))
+    if unknown:
+        raise BadRequest(f'Field(s) {", ".join(unknown)} cannot be changed.')
+
+    for field, value in body.items():
+        setattr(user_plant, field, WRITABLE_FIELDS[field](value))
+    user_plant.row_version += 1
+    _after_write(user_plant)
+    return _plant_response(user_plant_id)
+
+
+@bp.route('/plants/<int:user_plant_id>/water', methods=('POST',))
+@token_required
+def water_plant(user_plant_id):
+    """Record a watering: watered_amount (defaults to the previous amount) at watered_at (defaults to now)."""
+    body = request.get_json(silent=True) or {}
+    watered_amount = _parse_float(body.get('watered_amount'), 'watered_amount')
+    watered_at = _parse_date(body['watered_at']) if body.get('watered_at') else None
+    if user_plant_id not in water_plants(g.user.user_id, [user_plant_id], watered_amount, watered_at):
+        raise NotFound(f'Plant {user_plant_id} not found.')
+    db.session.commit()
+    return _plant_response(user_plant_id)
+
+
+@bp.route('/stats/water-use', methods=('GET',))
+@token_required
+def water_use_stats():
+    """Water used by the user per ?period=week|month, optionally ?by=plant_type, from ?start= to ?end=."""
+    period = request.args.get('period', 'week')
+    if period not in PERIODS:
+        raise BadRequest(f'period must be one of {", ".join(PERIODS)}.')
+    by = request.args.get('by')
+    if by not in (None, 'plant_type'):
+        raise BadRequest('by must be plant_type.')
+    start = _parse_date(request.args['start']).date() if request.args.get('start') else None
+    end = _parse_date(request.args['end']).date() if request.args.get('end') else None
+
+    usage = water_use(period, ('plant_type',) if by else (), user_id=g.user.user_id, start=start, end=end)
+    return jsonify(data=[
+        {**row, 'period_start': row['period_start'].isoformat(), 'events': int(row['events'])}
+        for row in usage.to_dict('records')
+    ])
+
+
+def _catalogue_plants(plant_ids):
+    records = get_plant_records(plant_ids)
+    return [
+        {
+            'plant_id': plant_id,
+            'common_name': records[plant_id].common_name,
+            'botanical_name': records[plant_id].botanical_name
+        }
+        for plant_id in plant_ids if plant_id in records
+    ]
+
+
+def _recommendation_count():
+    return min(max(request.args.get('limit', 10, type=int), 1), MAX_PAGE_SIZE)
+
+
+@bp.route('/recommendations', methods=('GET',))
+@token_required
+def recommendations():
+    """Catalogue plants that fit the user's garden, best first."""
+    return jsonify(data=_catalogue_plants(recommender.recommend_for_user(g.user.user_id, _recommendation_count())))
+
+
+@bp.route('/catalogue/<int:plant_id>/similar', methods=('GET',))
+@token_required
+def similar_plants(plant_id):
+    """Catalogue plants most similar to a catalogue plant, most similar first."""
+    if get_plant_record(plant_id) is None:
+        raise NotFound(f'Catalogue plant {plant_id} not found.')
+    return jsonify(data=_catalogue_plants(recommender.similar_plants(plant_id, _recommendation_count())))
+
+
+@bp.route('/plants/export', methods=('GET',))
+@token_required
+def export_plants():
+    """Stream the user's whole collection as newline-delimited JSON, one plant per line."""
+    fields = _requested_fields()
+    query = _plants_query(fields).limit(EXPORT_BATCH_SIZE)
+
+    def generate():
+        after = 0
+        while True:
+            rows = db.session.execute(query.where(UserPlant.user_plant_id > after)).all()
+            if not rows:
+                return
+            for item in _serialize(rows, fields):
+                yield json.dumps(item) + '\n'
+            after = rows[-1].user_plant_id
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=plants.ndjson'}
+    )
@@ -1,6 +1,7 @@
 import functools
+import time
 from flask import (
-    Blueprint, flash, g, redirect, render_template, request, session, url_for
+    Blueprint, current_app, flash, g, redirect, render_template, request, session, url_for
 )
 from werkzeug.security import check_password_hash, generate_password_hash
 from wtforms.validators import Email
@@ -8,6 +9,7 @@ from hashlib import md5
 from datetime import datetime, timezone
 
 from flask_app.models import db, User  # Import the User model
+from flask_app.presence import presence
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -79,27 +81,99 @@ def login():
             # Log in the user by clearing session and setting the user_id in session
             session.clear()
             session['user_id'] = user.user_id
+            remember_user(user)
             return redirect(url_for('index'))
 
         flash(error)
 
     return render_template('auth/login.html')
 
+# Blueprints whose requests do not use the session
+TOKEN_AUTH_BLUEPRINTS = {'plant.api_v1'}
+
+# Format of the user snapshot stored in the session; bump to invalidate all snapshots
+USER_SNAPSHOT_FORMAT = 1
+
+
+class UserProxy:
+    """Stands in for the logged-in User as g.user.
+
+    user_id, username and avatar come from the snapshot in the (signed) session cookie.
+    Any other attribute loads the full User row on first access.
+    """
+    __slots__ = ('user_id', 'username', 'avatar', 'user_version', '_user')
+
+    def __init__(self, snapshot):
+        self.user_id = snapshot['user_id']
+        self.username = snapshot['username']
+        self.avatar = snapshot['avatar']
+        self.user_version = snapshot['user_version']
+        self._user = None
+
+    def __getattr__(self, name):
+        # Only called for attributes the snapshot does not carry
+        return getattr(self.get_user(), name)
+
+    def get_user(self):
+        """Load the full User row, refreshing the session snapshot if it is stale."""
+        if self._user is None:
+            self._user = db.session.get(User, self.user_id)
+            if self._user is not None and self._user.user_version != self.user_version:
+                remember_user(self._user)
+        return self._user
+
+
+def remember_user(user):
+    """Store a snapshot of user in the session, so later requests need no User lookup."""
+    session['user'] = {
+        'format': USER_SNAPSHOT_FORMAT,
+        'user_id': user.user_id,
+        'username': user.username,
+        'avatar': user.avatar,
+        'user_version': user.user_version,
+        'checked_at': int(time.time())
+    }
+
+
+def _user_snapshot(user_id):
+    """Return the session's snapshot of user_id, revalidated against the database when too old."""
+    snapshot = session.get('user')
+    if (
+        snapshot
+        and snapshot.get('format') == USER_SNAPSHOT_FORMAT
+        and snapshot.get('user_id') == user_id
+        and time.time() - snapshot['checked_at'] < current_app.config['USER_SNAPSHOT_MAX_AGE_SECONDS']
+    ):
+        return snapshot
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    remember_user(user)
+    return session['user']
+
+
 # Before every request, load the logged-in user from the session
 @bp.before_app_request
 def load_logged_in_user():
+    if request.blueprint in TOKEN_AUTH_BLUEPRINTS:
+        # Authenticated with bearer tokens instead of the session, see api.py
+        g.user = None
+        return
     user_id = session.get('user_id')
 
     if user_id is None:
         g.user = None
     else:
-        # Fetch the user using the user_id stored in session
-        g.user = User.query.get(user_id)
-        
+        # Use the user snapshot stored in the session; the User row is only loaded when needed
+        snapshot = _user_snapshot(user_id)
+        g.user = UserProxy(snapshot) if snapshot else None
+
         if g.user:
-            # Update the last_time_seen field
-            g.user.last_time_seen = datetime.now(timezone.utc)
-            db.session.commit()
+            # Buffer last_time_seen; it is written in batches by the presence tracker
+            presence.touch(g.user.user_id)
+        else:
+            session.clear()
 
 # Logout
 @bp.route('/logout')
@@ -0,0 +1,192 @@
+# flask_app/autocomplete.py
+import unicodedata
+from bisect import bisect_left, bisect_right
+import numpy as np
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+
+from flask_app.catalogue import current_catalogue_version, get_catalogue_version
+from flask_app.models import db, Plant
+
+NAME_SEPARATOR = '\x00'
+# Number of characters after each word start covered by the typo-tolerant trigram index
+FUZZY_SPAN = 16
+# Typo candidates looked at per query, most shared trigrams first
+CANDIDATE_LIMIT = 200
+
+
+def normalize(name):
+    """Lowercase name and strip accents, so that 'Pittosporum' and 'pittosporum' match."""
+    decomposed = unicodedata.normalize('NFKD', name or '')
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+def _trigrams(text):
+    padded = '$' + text
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _prefix_distance(query, word, max_edits):
+    """Smallest edit distance between query and any prefix of word, or None if above max_edits.
+
+    Only the cells within max_edits of the diagonal of the edit distance table are computed.
+    """
+    too_far = max_edits + 1
+    size = len(query)
+    previous = [j if j <= max_edits else too_far for j in range(size + 1)]
+    best = previous[size]
+    for i, char in enumerate(word[:size + max_edits], 1):
+        low, high = max(1, i - max_edits), min(size, i + max_edits)
+        current = [too_far] * (size + 1)
+        current[0] = min(i, too_far)
+        for j in range(low, high + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != query[j - 1]))
+        best = min(best, current[size])
+        if min(current[low - 1:high + 1]) > max_edits:
+            break
+        previous = current
+    return best if best <= max_edits else None
+
+
+class AutocompleteIndex:
+    """Prefix and typo-tolerant lookup over the common and botanical names of the catalogue.
+
+    Every plant contributes two names (common, botanical), so name number n belongs to plant
+    n // 2. The normalized names are stored in one string; lookups go through a sorted array
+    of the offsets where a word starts (exact prefixes, via bisect) and a CSR trigram index
+    over the same offsets (typos, verified with a bounded edit distance).
+    """
+
+    def __init__(self, plants, version=None):
+        self.version = version
+        self.plant_ids = np.array([plant_id for plant_id, _, _ in plants], dtype=np.int32)
+        self.labels = [(common_name or '', botanical_name or '') for _, common_name, botanical_name in plants]
+
+        names = [normalize(name) for label in self.labels for name in label]
+        self.text = NAME_SEPARATOR.join(names) + NAME_SEPARATOR
+        self.name_starts = np.cumsum([0] + [len(name) + 1 for name in names[:-1]], dtype=np.int64)
+
+        word_starts = [
+            offset for offset, char in enumerate(self.text)
+            if char not in ' ' + NAME_SEPARATOR and (offset == 0 or self.text[offset - 1] in ' ' + NAME_SEPARATOR)
+        ]
+        word_starts.sort(key=lambda offset: self.text[offset:self.text.index(NAME_SEPARATOR, offset)])
+        self.offsets = np.array(word_starts, dtype=np.int32)
+        # Name each word start belongs to, and the name lengths used for ranking
+        self.offset_names = (np.searchsorted(self.name_starts, self.offsets, side='right') - 1).astype(np.int32)
+        self.name_lengths = np.array([len(name) for name in names], dtype=np.int32)
+
+        postings = {}
+        for key, offset in enumerate(self.offsets.tolist()):
+            for trigram in _trigrams(self._span(offset)):
+                postings.setdefault(trigram, []).append(key)
+        self.trigram_slices = {}
+        flat = []
+        for trigram, keys in postings.items():
+            self.trigram_slices[trigram] = (len(flat), len(flat) + len(keys))
+            flat.extend(keys)
+        self.trigram_postings = np.array(flat, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.plant_ids)
+
+    def _span(self, offset):
+        end = self.text.find(NAME_SEPARATOR, offset, offset + FUZZY_SPAN)
+        return self.text[offset:end if end != -1 else offset + FUZZY_SPAN]
+
+    def _prefix_range(self, prefix):
+        def key(offset):
+            return self.text[offset:offset + len(prefix)]
+        return (
+            bisect_left(self.offsets, prefix, key=key),
+            bisect_right(self.offsets, prefix, key=key)
+        )
+
+    def _fuzzy_keys(self, query, max_edits):
+        slices = [self.trigram_slices[t] for t in _trigrams(query) if t in self.trigram_slices]
+        threshold = len(query) - 1 - 3 * max_edits
+        if threshold < 1 or not slices:
+            return []
+        hits = np.bincount(
+            np.concatenate([self.trigram_postings[start:end] for start, end in slices]),
+            minlength=len(self.offsets)
+        )
+        keys = np.flatnonzero(hits >= threshold)
+        return keys[np.argsort(-hits[keys], kind='stable')][:CANDIDATE_LIMIT]
+
+    def _rank(self, keys, distances, limit):
+        """Return the plants of the best ranked keys, one entry per plant."""
+        names = self.offset_names[keys]
+        inner_word = self.offsets[keys] != self.name_starts[names]
+        # Exact before fuzzy, name starts before inner words, common before botanical names, short first
+        order = np.lexsort((self.name_lengths[names], names % 2, inner_word, distances))
+        plants = names[order] // 2
+        _, first = np.unique(plants, return_index=True)
+        return plants[np.sort(first)][:limit]
+
+    def suggest(self, query, limit=10, max_edits=2):
+        """Return up to limit suggestions for query, allowing typos for longer queries."""
+        query = ' '.join(normalize(query).split())
+        if not query:
+            return []
+
+        start, end = self._prefix_range(query)
+        keys = np.arange(start, end, dtype=np.int64)
+        distances = np.zeros(len(keys), dtype=np.int32)
+
+        # Allow one typo from five characters on and two from nine
+        edits = min(max_edits, 0 if len(query) < 5 else 1 if len(query) < 9 else 2)
+        if edits and len(np.unique(self.offset_names[keys] // 2)) < limit:
+            fuzzy_keys, fuzzy_distances = [], []
+            for key in self._fuzzy_keys(query, edits):
+                distance = _prefix_distance(query, self._span(int(self.offsets[key])), edits)
+                if distance:
+                    fuzzy_keys.append(key)
+                    fuzzy_distances.append(distance)
+                    if len(fuzzy_keys) == limit:
+                        break
+            keys = np.concatenate([keys, np.array(fuzzy_keys, dtype=np.int64)])
+            distances = np.concatenate([distances, np.array(fuzzy_distances, dtype=np.int32)])
+
+        suggestions = []
+        for plant in self._rank(keys, distances, limit).tolist():
+            common_name, botanical_name = self.labels[plant]
+            suggestions.append({
+                'plant_id': int(self.plant_ids[plant]),
+                'common_name': common_name,
+                'botanical_name': botanical_name
+            })
+        return suggestions
+
+
+def build_autocomplete_index():
+    """Build the autocomplete index from the Plant table."""
+    version = get_catalogue_version()
+    plants = db.session.query(Plant.plant_id, Plant.common_name, Plant.botanical_name) \
+        .order_by(Plant.plant_id).all()
+    return AutocompleteIndex(plants, version=version)
+
+
+def rebuild_autocomplete_index(app=None):
+    """Rebuild the index of this process; other processes pick up the catalogue version change."""
+    app = app or current_app
+    app.extensions['plant_autocomplete'] = build_autocomplete_index()
+    return app.extensions['plant_autocomplete']
+
+
+def get_autocomplete_index():
+    """Return the index of this process, rebuilt when the catalogue version has changed."""
+    app = current_app._get_current_object()
+    index = app.extensions.get('plant_autocomplete')
+    if index is None or index.version != current_catalogue_version():
+        return rebuild_autocomplete_index(app)
+    return index
+
+
+def init_app(app):
+    """Build the index once at startup; if the tables do not exist yet it is built on first use."""
+    with app.app_context():
+        try:
+            rebuild_autocomplete_index(app)
+        except SQLAlchemyError:
+            app.extensions.pop('plant_autocomplete', None)
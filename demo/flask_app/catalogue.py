@@ -0,0 +1,453 @@
+# flask_app/catalogue.py
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from itertools import islice
+from flask import current_app
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from flask_app.models import db, AppMeta, Plant, PlantFacet, PlantSyncState, UserPlant
+
+CATALOGUE_VERSION_KEY = 'catalogue_version'
+CATALOGUE_UPDATED_AT_KEY = 'catalogue_updated_at'
+CATALOGUE_FILE_HASH_KEY = 'catalogue_file_hash'
+CSV_FILE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'waterwise_plants_cleaned.csv')
+
+# CSV header -> Plant column, for the text columns taken over as they are
+CSV_COLUMNS = {
+    'Botanical Name': 'botanical_name',
+    'Common Name': 'common_name',
+    'Plant Type': 'plant_type',
+    'Water Needs': 'water_needs',
+    'Climate Zones': 'climate_zones',
+    'Light Needs': 'light_needs',
+    'Soil Type': 'soil_type',
+    'Maintenance': 'maintenance',
+    'Flower colour': 'flower_color',
+    'Foliage Colour': 'foliage_color',
+    'Perfume': 'perfume',
+    'Aromatic': 'aromatic',
+    'Edible': 'edible',
+    'Bore water Tolerance': 'bore_water_tolerance',
+    'Frost Tolerance': 'frost_tolerance',
+    'Image Location': 'image_location'
+}
+PLANT_COLUMNS = ('plant_id', 'min_water_consumption', 'max_water_consumption') + tuple(CSV_COLUMNS.values())
+# Columns update-plants may overwrite; plants are matched on botanical_name
+UPDATABLE_COLUMNS = tuple(column for column in PLANT_COLUMNS if column not in ('plant_id', 'botanical_name'))
+# Columns that feed the watering schedule and the full-text index
+SCHEDULE_COLUMNS = {'min_water_consumption', 'max_water_consumption'}
+SEARCH_COLUMNS = {'common_name', 'plant_type'}
+# Columns normalized into plant_facet for faceted filtering; the multi-valued ones are comma-separated
+FACET_COLUMNS = (
+    'plant_type', 'light_needs', 'soil_type', 'climate_zones', 'frost_tolerance', 'edible',
+    'maintenance', 'flower_color', 'foliage_color'
+)
+MULTI_VALUED_COLUMNS = {'climate_zones', 'light_needs', 'soil_type', 'flower_color', 'foliage_color'}
+# Placeholders that say nothing about the plant and are left out of the facets
+UNKNOWN_VALUES = {'', 'unknown'}
+
+
+def get_meta(key, default=None):
+    meta = db.session.get(AppMeta, key)
+    return meta.value if meta else default
+
+
+def set_meta(key, value):
+    """Store value under key in app_meta; the caller commits."""
+    meta = db.session.get(AppMeta, key)
+    if meta is None:
+        meta = AppMeta(key=key)
+        db.session.add(meta)
+    meta.value = value
+
+
+def get_catalogue_version():
+    """Return the current version stamp of the plant catalogue."""
+    return int(get_meta(CATALOGUE_VERSION_KEY, 0))
+
+
+def bump_catalogue_version():
+    """Mark the plant catalogue as changed, so that every process rebuilds what it derived from it.
+
+    Called by the catalogue CLI commands; the caller commits.
+    """
+    version = get_catalogue_version() + 1
+    set_meta(CATALOGUE_VERSION_KEY, str(version))
+    set_meta(CATALOGUE_UPDATED_AT_KEY, datetime.now(timezone.utc).replace(microsecond=0).isoformat())
+    return version
+
+
+def _catalogue_state():
+    """Return this process's view of the catalogue version and its update time.
+
+    The stored values are re-read at most every CATALOGUE_VERSION_CHECK_SECONDS, so that
+    in-process caches notice catalogue changes made by the CLI commands.
+    """
+    app = current_app._get_current_object()
+    state = app.extensions.setdefault('catalogue_version', {'version': None, 'updated_at': None, 'checked_at': None})
+    now = time.monotonic()
+    if state['checked_at'] is None or now - state['checked_at'] >= app.config['CATALOGUE_VERSION_CHECK_SECONDS']:
+        state['version'] = get_catalogue_version()
+        updated_at = get_meta(CATALOGUE_UPDATED_AT_KEY)
+        state['updated_at'] = datetime.fromisoformat(updated_at) if updated_at else None
+        state['checked_at'] = now
+    return state
+
+
+def current_catalogue_version():
+    """Return the catalogue version as seen by this process."""
+    return _catalogue_state()['version']
+
+
+def current_catalogue_updated_at():
+    """Return when the catalogue was last changed (UTC), as seen by this process, or None if unknown."""
+    return _catalogue_state()['updated_at']
+
+
+class PlantRecord:
+    """Immutable, read-only copy of one Plant row."""
+    __slots__ = tuple(column.key for column in Plant.__table__.columns)
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __repr__(self):
+        return f'<PlantRecord {self.plant_id} {self.common_name!r}>'
+
+
+class CatalogueCache:
+    """Process-wide, read-through LRU cache of PlantRecords keyed by plant_id.
+
+    The cache is emptied whenever the catalogue version changes.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self._records = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def get_many(self, plant_ids):
+        """Return {plant_id: PlantRecord} for the given ids; unknown ids are left out."""
+        version = current_catalogue_version()
+        found = {}
+        with self._lock:
+            if version != self.version:
+                self._records.clear()
+                self.version = version
+            for plant_id in plant_ids:
+                record = self._records.get(plant_id)
+                if record is not None:
+                    self._records.move_to_end(plant_id)
+                    found[plant_id] = record
+        self.hits += len(found)
+
+        missing = [plant_id for plant_id in set(plant_ids) if plant_id not in found]
+        if missing:
+            self.misses += len(missing)
+            rows = db.session.execute(db.select(Plant.__table__).where(Plant.plant_id.in_(missing))).mappings()
+            loaded = {row['plant_id']: PlantRecord(**row) for row in rows}
+            with self._lock:
+                if version == self.version:
+                    self._records.update(loaded)
+                    while len(self._records) > self.maxsize:
+                        self._records.popitem(last=False)
+            found.update(loaded)
+        return found
+
+    def get(self, plant_id):
+        return self.get_many([plant_id]).get(plant_id)
+
+
+def get_catalogue_cache():
+    app = current_app._get_current_object()
+    cache = app.extensions.get('catalogue_cache')
+    if cache is None:
+        cache = app.extensions['catalogue_cache'] = CatalogueCache(app.config['CATALOGUE_CACHE_SIZE'])
+    return cache
+
+
+def get_plant_record(plant_id):
+    """Return the PlantRecord for plant_id from the catalogue cache, or None."""
+    return get_catalogue_cache().get(plant_id)
+
+
+def get_plant_records(plant_ids):
+    """Return {plant_id: PlantRecord} for plant_ids from the catalogue cache."""
+    return get_catalogue_cache().get_many(plant_ids)
+
+
+def plant_values(row):
+    """Convert one row of the catalogue CSV into Plant column values."""
+    values = {
+        'plant_id': int(float(row['Plant ID'])),
+        'min_water_consumption': int(float(row.get('min_water_consumption') or 0)),
+        'max_water_consumption': int(float(row.get('max_water_consumption') or 0))
+    }
+    for header, column in CSV_COLUMNS.items():
+        values[column] = row[header]
+    return values
+
+
+def facet_values(column, text):
+    """Split and normalize the value of a facet column, e.g. 'Sand,loam' -> ['Sand', 'Loam']."""
+    if not text:
+        return []
+    values = []
+    for part in text.split(',') if column in MULTI_VALUED_COLUMNS else [text]:
+        # The CSV is inconsistent about case ('Open Compost', 'Open compost', 'yes')
+        value = part.strip().capitalize()[:100]
+        if value.lower() not in UNKNOWN_VALUES and value not in values:
+            values.append(value)
+    return values
+
+
+def write_plant_facets(plants):
+    """Replace the plant_facet rows of plants, dicts with plant_id and the FACET_COLUMNS; the caller commits."""
+    if not plants:
+        return
+    db.session.execute(db.delete(PlantFacet).where(PlantFacet.plant_id.in_([values['plant_id'] for values in plants])))
+    rows = [
+        {'facet': column, 'value': value, 'plant_id': values['plant_id']}
+        for values in plants for column in FACET_COLUMNS for value in facet_values(column, values[column])
+    ]
+    if rows:
+        db.session.execute(db.insert(PlantFacet), rows)
+
+
+def refresh_plant_facets(plant_ids=None, batch_size=1000):
+    """Rebuild the plant_facet rows of the given plants, or of the whole catalogue, from the plant table.
+
+    Returns the number of plants refreshed. The caller commits.
+    """
+    query = db.select(Plant.plant_id, *[getattr(Plant, column) for column in FACET_COLUMNS]) \
+        .order_by(Plant.plant_id).limit(batch_size)
+    if plant_ids is None:
+        db.session.execute(db.delete(PlantFacet))
+    else:
+        query = query.where(Plant.plant_id.in_(list(plant_ids)))
+    refreshed = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(query.where(Plant.plant_id > last_id)).all()
+        if not rows:
+            return refreshed
+        write_plant_facets([row._asdict() for row in rows])
+        refreshed += len(rows)
+        last_id = rows[-1].plant_id
+
+
+def read_catalogue(csv_file_path=CSV_FILE_PATH):
+    """Stream the catalogue CSV as Plant column values, one dict per row."""
+    with open(csv_file_path, newline='', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile):
+            yield plant_values(row)
+
+
+def batched(iterable, batch_size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def _upsert_statement(dialect):
+    """Insert statement that updates rows whose plant_id already exists, or None if unsupported."""
+    columns = [column for column in PLANT_COLUMNS if column != 'plant_id']
+    if dialect == 'sqlite':
+        statement = sqlite_insert(Plant.__table__)
+        return statement.on_conflict_do_update(
+            index_elements=['plant_id'],
+            set_={column: statement.excluded[column] for column in columns}
+        )
+    if dialect == 'mysql':
+        statement = mysql_insert(Plant.__table__)
+        return statement.on_duplicate_key_update({column: statement.inserted[column] for column in columns})
+    return None
+
+
+def upsert_plants(plants, batch_size=1000):
+    """Insert or update catalogue plants in batches, one transaction per batch.
+
+    Each batch is diffed against the stored rows first, so only new and changed rows are
+    written. Returns (inserted, updated, unchanged) lists of plant ids.
+    """
+    inserted, updated, unchanged = [], [], []
+    upsert = _upsert_statement(db.session.get_bind().dialect.name)
+    columns = [getattr(Plant, column) for column in PLANT_COLUMNS]
+
+    for batch in batched(plants, batch_size):
+        stored = {
+            row.plant_id: row._asdict()
+            for row in db.session.query(*columns).filter(Plant.plant_id.in_([values['plant_id'] for values in batch]))
+        }
+        new_rows = [values for values in batch if values['plant_id'] not in stored]
+        changed_rows = [
+            values for values in batch
+            if values['plant_id'] in stored and values != stored[values['plant_id']]
+        ]
+        unchanged.extend(values['plant_id'] for values in batch if stored.get(values['plant_id']) == values)
+
+        if upsert is not None:
+            if new_rows or changed_rows:
+                db.session.execute(upsert, new_rows + changed_rows)
+        else:
+            if new_rows:
+                db.session.execute(db.insert(Plant), new_rows)
+            if changed_rows:
+                db.session.execute(db.update(Plant), changed_rows)
+        write_plant_facets(new_rows + changed_rows)
+        db.session.commit()
+
+        inserted.extend(values['plant_id'] for values in new_rows)
+        updated.extend(values['plant_id'] for values in changed_rows)
+    return inserted, updated, unchanged
+
+
+def diff_plants_by_botanical_name(plants, columns):
+    """Compare catalogue rows with the stored plants of the same botanical name.
+
+    The stored values are loaded in one query. Returns (changes, missing): changes maps
+    plant_id to {column: (old, new)} for the given columns that differ, missing lists the
+    botanical names without a stored plant.
+    """
+    stored = {}
+    query = db.session.query(Plant.plant_id, Plant.botanical_name, *[getattr(Plant, column) for column in columns]) \
+        .order_by(Plant.plant_id)
+    for row in query:
+        # Like the former per-row lookup, the first plant with a botanical name wins
+        stored.setdefault(row.botanical_name, row._asdict())
+
+    changes = {}
+    missing = []
+    seen = set()
+    for values in plants:
+        # Several CSV rows can share a botanical name; only the first one is applied
+        if values['botanical_name'] in seen:
+            continue
+        seen.add(values['botanical_name'])
+        current = stored.get(values['botanical_name'])
+        if current is None:
+            missing.append(values['botanical_name'])
+            continue
+        changed = {
+            column: (current[column], values[column])
+            for column in columns if current[column] != values[column]
+        }
+        if changed:
+            changes[current['plant_id']] = changed
+    return changes, missing
+
+
+def apply_plant_changes(changes):
+    """Write the changes found by diff_plants_by_botanical_name with one bulk UPDATE. The caller commits."""
+    if changes:
+        db.session.execute(db.update(Plant), [
+            {'plant_id': plant_id, **{column: new for column, (_, new) in changed.items()}}
+            for plant_id, changed in changes.items()
+        ])
+        faceted = [plant_id for plant_id, changed in changes.items() if set(changed) & set(FACET_COLUMNS)]
+        if faceted:
+            refresh_plant_facets(faceted)
+
+
+def file_hash(path):
+    """SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def row_hash(values):
+    """SHA-256 of one catalogue row's Plant column values."""
+    return hashlib.sha256(json.dumps(values, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def sync_catalogue(csv_file_path=CSV_FILE_PATH, delete_missing=False, batch_size=1000, force=False):
+    """Bring the plant table in line with the catalogue CSV, touching only rows whose content changed.
+
+    Returns None if the file hash is unchanged since the last sync. Otherwise returns a dict
+    with the inserted, updated and unchanged plant ids, the ids of rows that disappeared from
+    the file and were deleted or flagged (kept because user plants reference them).
+    """
+    current_file_hash = file_hash(csv_file_path)
+    if not force and get_meta(CATALOGUE_FILE_HASH_KEY) == current_file_hash:
+        return None
+
+    stored_hashes = dict(db.session.query(PlantSyncState.plant_id, PlantSyncState.row_hash))
+    removed = set(db.session.scalars(db.select(PlantSyncState.plant_id).where(PlantSyncState.removed_at.isnot(None))))
+    seen = set()
+    unchanged = []
+    new_hashes = {}
+
+    def changed_rows():
+        for values in read_catalogue(csv_file_path):
+            seen.add(values['plant_id'])
+            digest = row_hash(values)
+            if stored_hashes.get(values['plant_id']) == digest:
+                unchanged.append(values['plant_id'])
+            else:
+                new_hashes[values['plant_id']] = digest
+                yield values
+
+    inserted, updated, rewritten = upsert_plants(changed_rows(), batch_size=batch_size)
+    for batch in batched(list(new_hashes.items()), batch_size):
+        db.session.execute(db.delete(PlantSyncState).where(PlantSyncState.plant_id.in_([plant_id for plant_id, _ in batch])))
+        db.session.execute(db.insert(PlantSyncState), [
+            {'plant_id': plant_id, 'row_hash': digest, 'removed_at': None} for plant_id, digest in batch
+        ])
+
+    # Flagged rows that are back in the file unchanged; changed ones were rewritten above
+    for batch in batched([plant_id for plant_id in unchanged if plant_id in removed], batch_size):
+        db.session.execute(
+            db.update(PlantSyncState).where(PlantSyncState.plant_id.in_(batch)).values(removed_at=None)
+        )
+
+    # Rows that disappeared from the file: delete the plant if no user owns it, otherwise flag it
+    missing = sorted(set(stored_hashes) - seen)
+    referenced = set(db.session.scalars(
+        db.select(UserPlant.plant_id).where(UserPlant.plant_id.in_(missing)).distinct()
+    )) if missing else set()
+    deleted = [plant_id for plant_id in missing if delete_missing and plant_id not in referenced]
+    flagged = [plant_id for plant_id in missing if plant_id not in deleted]
+    if deleted:
+        db.session.execute(db.delete(PlantFacet).where(PlantFacet.plant_id.in_(deleted)))
+        db.session.execute(db.delete(Plant).where(Plant.plant_id.in_(deleted)))
+        db.session.execute(db.delete(PlantSyncState).where(PlantSyncState.plant_id.in_(deleted)))
+    if flagged:
+        db.session.execute(
+            db.update(PlantSyncState)
+            .where(PlantSyncState.plant_id.in_(flagged), PlantSyncState.removed_at.is_(None))
+            .values(removed_at=datetime.now())
+        )
+
+    set_meta(CATALOGUE_FILE_HASH_KEY, current_file_hash)
+    db.session.commit()
+    return {
+        'inserted': inserted,
+        'updated': updated,
+        'unchanged': unchanged + rewritten,
+        'deleted': deleted,
+        'flagged': flagged
+    }
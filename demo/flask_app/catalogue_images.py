@@ -0,0 +1,125 @@
+# flask_app/catalogue_images.py
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import requests
+from flask import current_app, url_for
+
+from flask_app.catalogue import bump_catalogue_version, current_catalogue_version
+from flask_app.images import load_rgb, write_variants
+from flask_app.models import db, CachedImage, Plant
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+_local = threading.local()
+
+
+def _http():
+    # requests sessions are not thread-safe, every fetch thread keeps its own connection pool
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def url_hash(url):
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def fetch_image(url, timeout, max_bytes):
+    """Download url and return its body; raises ValueError if it is larger than max_bytes."""
+    with _http().get(url, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        body = bytearray()
+        for chunk in response.iter_content(CHUNK_SIZE):
+            body += chunk
+            if len(body) > max_bytes:
+                raise ValueError(f'{url} is larger than {max_bytes} bytes')
+    return bytes(body)
+
+
+def store_image(body, folder, sizes):
+    """Store the resized variants of an image under its content hash in folder.
+
+    Returns the path of the smallest WebP variant relative to folder.
+    """
+    name = hashlib.sha256(body).hexdigest()
+    image_path = f'{name[:2]}/{name}_{min(sizes)}.webp'
+    if not os.path.exists(os.path.join(folder, image_path)):
+        os.makedirs(os.path.join(folder, name[:2]), exist_ok=True)
+        write_variants(load_rgb(body), os.path.join(folder, name[:2], name), sizes)
+        if not os.path.exists(os.path.join(folder, image_path)):
+            raise OSError(f'could not write the variants of {name}')
+    return image_path
+
+
+def cache_catalogue_images(workers=8, timeout=10):
+    """Copy the external images referenced by Plant.image_location to CATALOGUE_IMAGE_FOLDER.
+
+    Every distinct URL not cached before is fetched once, with at most workers downloads
+    at a time, and recorded in cached_image. image_location keeps the source URL, which
+    the catalogue commands write back from the CSV; catalogue_image_url() maps it to the
+    local copy when pages are rendered. Returns (fetched, plants served locally, failed)
+    with failed mapping URLs to the error.
+    """
+    folder = current_app.config['CATALOGUE_IMAGE_FOLDER']
+    sizes = current_app.config['IMAGE_VARIANT_SIZES']
+    max_bytes = current_app.config['MAX_CONTENT_LENGTH']
+
+    plants = db.session.execute(
+        db.select(Plant.plant_id, Plant.image_location).where(
+            db.or_(Plant.image_location.like('http://%'), Plant.image_location.like('https://%'))
+        )
+    ).all()
+    cached = set(db.session.scalars(db.select(CachedImage.url_hash)))
+    to_fetch = {location for _, location in plants if url_hash(location) not in cached}
+
+    def fetch_and_store(url):
+        return store_image(fetch_image(url, timeout, max_bytes), folder, sizes)
+
+    failed = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='catalogue-images') as pool:
+        futures = {pool.submit(fetch_and_store, url): url for url in to_fetch}
+        for future in as_completed(futures):
+            url = futures[future]
+            try:
+                image_path = future.result()
+            except Exception as e:
+                logger.warning('Could not cache %s: %s', url, e)
+                failed[url] = str(e)
+                continue
+            db.session.add(CachedImage(
+                url_hash=url_hash(url), source_url=url, image_path=image_path, fetched_at=datetime.now()
+            ))
+
+    if len(to_fetch) > len(failed):
+        # Rendered pages and fragments are keyed by the catalogue version
+        bump_catalogue_version()
+    db.session.commit()
+    served = sum(1 for _, location in plants if location not in failed)
+    return len(to_fetch) - len(failed), served, failed
+
+
+def catalogue_image_url(location):
+    """Return the URL to show for a Plant.image_location: its cached copy if there is one.
+
+    The map of cached source URLs is loaded once per catalogue version in each worker.
+    """
+    app = current_app._get_current_object()
+    version = current_catalogue_version()
+    cached = app.extensions.get('cached_images')
+    if cached is None or cached[0] != version:
+        paths = dict(db.session.execute(db.select(CachedImage.source_url, CachedImage.image_path)).all())
+        cached = app.extensions['cached_images'] = (version, paths)
+    image_path = cached[1].get(location) if location else None
+    if image_path is None:
+        return location
+    return url_for('plant.catalogue_image', filename=image_path)
+
+
+def init_app(app):
+    app.add_template_global(catalogue_image_url)
@@ -1,72 +1,386 @@
 # flask_app/commands.py
 import click
-import csv
-import os
+import statistics
+import threading
+import time
+from datetime import datetime
+from flask import current_app, g, render_template
 from flask.cli import with_appcontext
-from .models import db, Plant
+from .catalogue import (
+    CSV_FILE_PATH, PLANT_COLUMNS, SCHEDULE_COLUMNS, SEARCH_COLUMNS, UPDATABLE_COLUMNS, apply_plant_changes,
+    bump_catalogue_version, current_catalogue_version, diff_plants_by_botanical_name, get_catalogue_cache,
+    read_catalogue, set_meta, sync_catalogue, upsert_plants
+)
+from .catalogue_images import cache_catalogue_images
+from .consumption import fit_consumption_factors, reset_fit_statistics, update_fit_statistics
+from .engine import engine_profile
+from .facets import facet_counts, filter_plants, filter_plants_like
+from .fragment_cache import fragment_cache
+from .images import images
+from .models import db, AppMeta, Plant, PlantFacet, User, UserPlant
+from .notifications import sweep_notifications
+from .plant import get_plant_page
+from .recommend import recommender
+from .schedule import refresh_schedules
+from .search import rebuild_search_index, search_plants, search_plants_like
+from .watering import PERIODS, refresh_watering_rollups, water_use
 
 @click.command('import-plants')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows written per transaction.')
 @with_appcontext
-def import_plants_command():
-    """Import plant data from CSV."""
-    csv_file_path = os.path.join(os.path.dirname(__file__), 'data', 'waterwise_plants_cleaned.csv')
-
-    with open(csv_file_path, newline='') as csvfile:
-        csvreader = csv.DictReader(csvfile)
-        for row in csvreader:
-            plant = Plant(
-                plant_id=int(float(row['Plant ID'])),
-                botanical_name=row['Botanical Name'],
-                common_name=row['Common Name'],
-                plant_type=row['Plant Type'],
-                water_needs=row['Water Needs'],
-                min_water_consumption=int(float(row.get('min_water_consumption') or 0)),
-                max_water_consumption=int(float(row.get('max_water_consumption') or 0)),
-                climate_zones=row['Climate Zones'],
-                light_needs=row['Light Needs'],
-                soil_type=row['Soil Type'],
-                maintenance=row['Maintenance'],
-                flower_color=row['Flower colour'],
-                foliage_color=row['Foliage Colour'],
-                perfume=row['Perfume'],
-                aromatic=row['Aromatic'],
-                edible=row['Edible'],
-                bore_water_tolerance=row['Bore water Tolerance'],
-                frost_tolerance=row['Frost Tolerance'],
-                image_location=row['Image Location']
-            )
-            db.session.add(plant)
+def import_plants_command(batch_size):
+    """Import plant data from CSV, inserting new plants and updating changed ones."""
+    start = time.perf_counter()
+    inserted, updated, unchanged = upsert_plants(read_catalogue(), batch_size=batch_size)
+
+    if inserted or updated:
+        # Plants' water consumption feeds into the persisted watering schedule of user plants
+        if updated:
+            refresh_schedules(plant_ids=updated)
+        rebuild_search_index()
+        bump_catalogue_version()
         db.session.commit()
-    click.echo('Imported plant data from CSV.')
+        recommender.build()
+        if updated:
+            sweep_notifications(full=True)
+
+    elapsed = time.perf_counter() - start
+    total = len(inserted) + len(updated) + len(unchanged)
+    click.echo(
+        f'Imported plant data from CSV: {len(inserted)} inserted, {len(updated)} updated, '
+        f'{len(unchanged)} unchanged in {elapsed:.2f}s ({total / elapsed:.0f} rows/s).'
+    )
 
 
 @click.command('update-plants')
+@click.option('--columns', '-c', multiple=True, default=('image_location',), show_default=True,
+              help=f'Columns to update, repeatable or comma-separated. One of: {", ".join(UPDATABLE_COLUMNS)}.')
+@click.option('--dry-run', is_flag=True, help='Only report the differences, do not write them.')
+@with_appcontext
+def update_plants_command(columns, dry_run):
+    """Update existing Plant records, matched on botanical name, with values from the CSV file."""
+    columns = [column.strip() for option in columns for column in option.split(',') if column.strip()]
+    unknown = sorted(set(columns) - set(UPDATABLE_COLUMNS))
+    if unknown:
+        raise click.BadParameter(f'unknown column(s) {", ".join(unknown)}', param_hint='--columns')
+
+    changes, missing = diff_plants_by_botanical_name(read_catalogue(), columns)
+    for botanical_name in missing:
+        click.echo(f"Plant with botanical name '{botanical_name}' not found. Skipping.")
+
+    if dry_run:
+        for plant_id, changed in changes.items():
+            for column, (old, new) in changed.items():
+                click.echo(f'{plant_id}: {column}: {old!r} -> {new!r}')
+        click.echo(f'Dry run: {len(changes)} records would be updated, {len(missing)} records skipped.')
+        return
+
+    apply_plant_changes(changes)
+    changed_columns = {column for changed in changes.values() for column in changed}
+    if changed_columns & SCHEDULE_COLUMNS:
+        refresh_schedules(plant_ids=list(changes))
+    if changed_columns & SEARCH_COLUMNS:
+        rebuild_search_index()
+    if changes:
+        bump_catalogue_version()
+    db.session.commit()
+    if changes:
+        recommender.build()
+    if changed_columns & SCHEDULE_COLUMNS:
+        sweep_notifications(full=True)
+    click.echo(f'Plant data has been updated successfully. {len(changes)} records updated, {len(missing)} records skipped.')
+
+
+@click.command('sync-plants')
+@click.option('--delete-missing', is_flag=True,
+              help='Delete plants that disappeared from the CSV unless user plants reference them.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows written per transaction.')
+@click.option('--force', is_flag=True, help='Sync even if the file hash is unchanged.')
+@click.option('--csv-file', type=click.Path(exists=True, dir_okay=False), default=CSV_FILE_PATH,
+              show_default='bundled waterwise dataset', help='Catalogue CSV to sync from.')
 @with_appcontext
-def update_plants_command():
-    """Update existing Plant records with new image_location values from a CSV file."""
-    # Path to your CSV file
-    csv_file_path = os.path.join(os.path.dirname(__file__), 'data', 'waterwise_plants_cleaned.csv')
-
-    with open(csv_file_path, newline='', encoding='utf-8') as csvfile:
-        plant_reader = csv.DictReader(csvfile)
-        updated_records = 0
-        skipped_records = 0
-        for row in plant_reader:
-            # Use a unique identifier to find existing plant
-            botanical_name = row['Botanical Name']
-
-            # Try to find an existing plant by botanical_name
-            plant = Plant.query.filter_by(botanical_name=botanical_name).first()
-
-            if plant:
-                # Update the 'image_location' field
-                plant.image_location = row['Image Location']
-                updated_records += 1
-            else:
-                # Handle cases where the plant does not exist
-                click.echo(f"Plant with botanical name '{botanical_name}' not found. Skipping.")
-                skipped_records += 1
-                continue
+def sync_plants_command(delete_missing, batch_size, force, csv_file):
+    """Incrementally sync the plant table with the CSV, using per-row content hashes."""
+    start = time.perf_counter()
+    result = sync_catalogue(csv_file, delete_missing=delete_missing, batch_size=batch_size, force=force)
+    if result is None:
+        click.echo('Catalogue file unchanged since the last sync.')
+        return
 
+    if result['inserted'] or result['updated'] or result['deleted']:
+        if result['updated']:
+            refresh_schedules(plant_ids=result['updated'])
+        rebuild_search_index()
+        bump_catalogue_version()
         db.session.commit()
-        click.echo(f'Plant data has been updated successfully. {updated_records} records updated, {skipped_records} records skipped.')
\ No newline at end of file
+        recommender.build()
+        if result['updated']:
+            sweep_notifications(full=True)
+
+    click.echo(
+        f"Synced plant data in {time.perf_counter() - start:.2f}s: {len(result['inserted'])} inserted, "
+        f"{len(result['updated'])} updated, {len(result['unchanged'])} unchanged, "
+        f"{len(result['deleted'])} deleted, {len(result['flagged'])} missing from the CSV but kept."
+    )
+
+
+@click.command('sweep-notifications')
+@click.option('--full', is_flag=True, help='Reconcile the notifications of every user plant.')
+@click.option('--batch-size', default=5000, show_default=True, help='User plants handled per transaction.')
+@with_appcontext
+def sweep_notifications_command(full, batch_size):
+    """Write the watering notifications of user plants that became due since the last sweep.
+
+    Meant to be run periodically, e.g. from cron shortly after midnight.
+    """
+    start = time.perf_counter()
+    created, removed = sweep_notifications(full=full, batch_size=batch_size)
+    click.echo(
+        f'Swept notifications in {time.perf_counter() - start:.2f}s: '
+        f'{created} created, {removed} removed.'
+    )
+
+
+@click.command('refresh-watering-rollups')
+@click.option('--batch-size', default=50000, show_default=True, help='Watering events handled per transaction.')
+@click.option('--report', type=click.Choice(list(PERIODS)), help='Print the water use per period and plant type.')
+@with_appcontext
+def refresh_watering_rollups_command(batch_size, report):
+    """Add the watering events logged since the last refresh to the weekly and monthly rollups."""
+    start = time.perf_counter()
+    refreshed = refresh_watering_rollups(batch_size=batch_size)
+    click.echo(f'Rolled up {refreshed} watering events in {time.perf_counter() - start:.2f}s.')
+    if report:
+        click.echo(water_use(report, group_by=('plant_type',)).to_string(index=False))
+
+
+@click.command('fit-consumption-model')
+@click.option('--batch-size', default=10000, show_default=True, help='Watering events handled per transaction.')
+@click.option('--full', is_flag=True, help='Refit from the whole watering history, e.g. after a formula change.')
+@with_appcontext
+def fit_consumption_model_command(batch_size, full):
+    """Learn user and plant type corrections of the water consumption from the watering history.
+
+    Only the events logged since the last run are read, so it is cheap to run nightly. The
+    schedules and notifications are refreshed with the new factors.
+    """
+    start = time.perf_counter()
+    if full:
+        reset_fit_statistics()
+        db.session.commit()
+    processed = update_fit_statistics(batch_size=batch_size)
+    factors = fit_consumption_factors()
+    refreshed = refresh_schedules()
+    db.session.commit()
+    sweep_notifications(full=True)
+    click.echo(
+        f'Fitted the consumption model in {time.perf_counter() - start:.2f}s: {processed} new watering events, '
+        f'{factors} factors, {refreshed} schedules refreshed.'
+    )
+
+
+@click.command('generate-image-variants')
+@click.option('--force', is_flag=True, help='Regenerate variants that already exist.')
+@with_appcontext
+def generate_image_variants_command(force):
+    """Generate the thumbnails of uploaded plant photos, e.g. of photos uploaded before they existed."""
+    image_paths = db.session.execute(
+        db.select(UserPlant.image_path).where(UserPlant.image_path.isnot(None)).distinct()
+    ).scalars().all()
+    generated = 0
+    for image_path in image_paths:
+        if force or not images.variants(image_path):
+            generated += bool(images.generate_variants(image_path))
+    click.echo(f'Generated variants for {generated} of {len(image_paths)} images.')
+
+
+@click.command('cache-plant-images')
+@click.option('--workers', default=8, show_default=True, help='Concurrent downloads.')
+@click.option('--timeout', default=10.0, show_default=True, help='Timeout per download in seconds.')
+@with_appcontext
+def cache_plant_images_command(workers, timeout):
+    """Download the external plant images and store resized copies that pages show instead."""
+    start = time.perf_counter()
+    fetched, served, failed = cache_catalogue_images(workers=workers, timeout=timeout)
+    for url, error in sorted(failed.items()):
+        click.echo(f'Could not cache {url}: {error}')
+    click.echo(
+        f'Cached plant images in {time.perf_counter() - start:.2f}s: {fetched} downloaded, '
+        f'{served} plants served locally, {len(failed)} failed.'
+    )
+
+
+@click.command('bench-fragment-cache')
+@click.option('--repeat', default=20, show_default=True, help='Renders per run.')
+@click.option('--plants', default=20, show_default=True, help='Plant cards per page.')
+@click.argument('username', required=False)
+@with_appcontext
+def bench_fragment_cache_command(repeat, plants, username):
+    """Compare rendering a user's plant page with a cold and with a warm fragment cache."""
+    query = db.select(User).join(UserPlant).order_by(User.user_id).limit(1)
+    if username:
+        query = query.where(User.username == username)
+    user = db.session.execute(query).scalar()
+    if user is None:
+        raise click.ClickException('No user with plants found.')
+
+    with current_app.test_request_context('/'):
+        g.user = user
+        plants_df, total_plants = get_plant_page(1, plants)
+        context = dict(
+            plants=list(plants_df.itertuples(index=False)), page=1, total_pages=1, per_page=plants,
+            catalogue_version=current_catalogue_version(), today=datetime.today().date()
+        )
+        fragment_cache.reset_stats()
+        for name, cold in (('cold', True), ('warm', False)):
+            fragment_cache.clear()
+            render_template('plant/index.html', **context)
+            timings = []
+            for _ in range(repeat):
+                if cold:
+                    fragment_cache.clear()
+                start = time.perf_counter()
+                render_template('plant/index.html', **context)
+                timings.append((time.perf_counter() - start) * 1000)
+            stats = fragment_cache.stats()
+            click.echo(
+                f'{name}: {len(context["plants"])} cards  median {statistics.median(timings):7.3f} ms  '
+                f'hits {stats["hits"]}  misses {stats["misses"]}  saved {stats["saved_seconds"] * 1000:.1f} ms'
+            )
+
+
+@click.command('bench-search')
+@click.option('--repeat', default=20, show_default=True, help='Searches per term and method.')
+@click.argument('terms', nargs=-1)
+@with_appcontext
+def bench_search_command(repeat, terms):
+    """Compare plant search latency of the full-text index against the ILIKE scan."""
+    terms = terms or ('abelia', 'grevillea', 'lil', 'red gum', 'shrub', 'zz')
+    methods = (('ilike', search_plants_like), ('fulltext', search_plants))
+
+    for term in terms:
+        for name, search in methods:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                results = search(term)
+                timings.append((time.perf_counter() - start) * 1000)
+            click.echo(
+                f'{term!r:12} {name:9} {len(results):3} results  '
+                f'median {statistics.median(timings):7.3f} ms  max {max(timings):7.3f} ms'
+            )
+
+
+# Filters timed by bench-facets: narrow combinations, a single multi-valued facet and none
+BENCH_FACET_FILTERS = (
+    {'plant_type': ['Shrub'], 'soil_type': ['Clay'], 'light_needs': ['Sun'], 'frost_tolerance': ['Light', 'Medium', 'Heavy']},
+    {'edible': ['Yes'], 'light_needs': ['Sun'], 'soil_type': ['Clay']},
+    {'soil_type': ['Clay']},
+    {'climate_zones': ['Temperate'], 'flower_color': ['White']},
+    {}
+)
+
+
+@click.command('bench-facets')
+@click.option('--replicate', default=100, show_default=True, help='Copies of the catalogue to filter.')
+@click.option('--repeat', default=5, show_default=True, help='Runs per filter and method.')
+@with_appcontext
+def bench_facets_command(replicate, repeat):
+    """Compare faceted filtering through plant_facet against LIKE scans over a replicated catalogue.
+
+    The copies are inserted in a transaction that is rolled back at the end.
+    """
+    max_id = db.session.execute(db.select(db.func.max(Plant.plant_id))).scalar()
+    if max_id is None:
+        raise click.ClickException('The catalogue is empty, run flask import-plants first.')
+    start = time.perf_counter()
+    plant_columns = [getattr(Plant, column) for column in PLANT_COLUMNS if column != 'plant_id']
+    for copy in range(1, replicate):
+        offset = copy * (max_id + 1)
+        source = db.select(Plant.plant_id + offset, *plant_columns).where(Plant.plant_id <= max_id)
+        db.session.execute(db.insert(Plant).from_select(['plant_id', *[column.key for column in plant_columns]], source))
+        source = db.select(PlantFacet.facet, PlantFacet.value, PlantFacet.plant_id + offset) \
+            .where(PlantFacet.plant_id <= max_id)
+        db.session.execute(db.insert(PlantFacet).from_select(['facet', 'value', 'plant_id'], source))
+    plants = db.session.execute(db.select(db.func.count(Plant.plant_id))).scalar()
+    click.echo(f'Replicated the catalogue to {plants} plants in {time.perf_counter() - start:.2f}s.')
+    # The cached catalogue counts, which order the filters, are of the catalogue without the copies
+    current_app.extensions.pop('facet_counts', None)
+
+    def timed(function):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function()
+            timings.append((time.perf_counter() - start) * 1000)
+        return result, statistics.median(timings)
+
+    try:
+        for filters in BENCH_FACET_FILTERS:
+            label = ' '.join(f'{column}={"|".join(values)}' for column, values in filters.items()) or '(none)'
+            click.echo(label)
+            (_, total), like_ms = timed(lambda: filter_plants_like(filters))
+            click.echo(f'  like      {total:7} plants  median {like_ms:9.2f} ms')
+            (_, total), facet_ms = timed(lambda: filter_plants(filters))
+            click.echo(f'  facets    {total:7} plants  median {facet_ms:9.2f} ms')
+            counts, counts_ms = timed(lambda: facet_counts(filters))
+            values = sum(len(column_counts) for column_counts in counts.values())
+            click.echo(f'  counts    {values:7} values  median {counts_ms:9.2f} ms')
+    finally:
+        db.session.rollback()
+        # The caches may hold copies that were rolled back
+        get_catalogue_cache().clear()
+        current_app.extensions.pop('facet_counts', None)
+
+
+@click.command('bench-pool')
+@click.option('--threads', default=16, show_default=True, help='Concurrent threads, each with its own session.')
+@click.option('--requests', 'requests_per_thread', default=200, show_default=True, help='Transactions per thread.')
+@click.option('--writes', default=0.2, show_default=True, help='Share of transactions that write.')
+@with_appcontext
+def bench_pool_command(threads, requests_per_thread, writes):
+    """Run concurrent read and write transactions and report the connection pool metrics.
+
+    Writes go to app_meta keys that are removed at the end.
+    """
+    app = current_app._get_current_object()
+    errors = []
+    durations = []
+    write_every = round(1 / writes) if writes > 0 else 0
+
+    def worker(number):
+        with app.app_context():
+            for i in range(requests_per_thread):
+                start = time.perf_counter()
+                try:
+                    if write_every and i % write_every == 0:
+                        set_meta(f'bench_pool_{number}', str(i))
+                    else:
+                        db.session.execute(db.select(db.func.count(Plant.plant_id))).scalar()
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    errors.append(str(e).splitlines()[0])
+                durations.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    db.session.execute(db.delete(AppMeta).where(AppMeta.key.like('bench_pool_%')))
+    db.session.commit()
+
+    total = threads * requests_per_thread
+    click.echo(
+        f'{total} transactions in {elapsed:.2f}s ({total / elapsed:.0f}/s), '
+        f'median {statistics.median(durations):.2f} ms, {len(errors)} errors'
+    )
+    for error in sorted(set(errors)):
+        click.echo(f'  {errors.count(error)} x {error}')
+    for key, stats in engine_profile.pool_stats().items():
+        click.echo(f'{key or "default"}: ' + ', '.join(
+            f'{name} {value:.4f}' if isinstance(value, float) else f'{name} {value}' for name, value in stats.items()
+        ))
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -13,6 +14,50 @@ class Config:
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static/images')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    CATALOGUE_VERSION_CHECK_SECONDS = 30  # how often workers look for a new catalogue version
+    CATALOGUE_CACHE_SIZE = 5000  # plants kept in each worker's catalogue cache
+    PRESENCE_WRITE_INTERVAL_SECONDS = 5 * 60  # last_time_seen is written at most this often per user
+    PRESENCE_FLUSH_SECONDS = 30  # how often buffered last_time_seen values are flushed
+    PRESENCE_BACKGROUND_FLUSH = True
+    IMAGE_VARIANT_SIZES = (480, 1024)  # widths of the thumbnails generated for uploaded photos
+    IMAGE_WORKERS = 2  # threads generating thumbnails in each worker process
+    IMAGE_BACKGROUND_PROCESSING = True
+    CATALOGUE_IMAGE_FOLDER = os.path.join(
+        os.path.abspath(os.path.dirname(__file__)), '..', 'instance', 'catalogue_images'
+    )
+    CATALOGUE_IMAGE_MAX_AGE = 365 * 24 * 60 * 60  # cached catalogue images never change under their name
+    FRAGMENT_CACHE_SIZE = 2000  # rendered plant card fragments kept in each worker
+    FRAGMENT_CACHE_BACKEND = None  # optional shared cache client with get(key) and set(key, value, timeout)
+    FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
+    STATIC_MAX_AGE = 365 * 24 * 60 * 60  # static URLs carry a content fingerprint
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or SECRET_KEY
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)  # API tokens carry a snapshot of the user
+    USER_SNAPSHOT_MAX_AGE_SECONDS = 5 * 60  # session user snapshots are revalidated this often
+    RECOMMENDATION_FOLDER = os.path.join(
+        os.path.abspath(os.path.dirname(__file__)), '..', 'instance', 'recommendations'
+    )
+    RECOMMENDATION_COUNT = 6  # plants suggested on the add page
+    CONSUMPTION_FIT_PRIOR_WEIGHT = 5  # watering intervals needed before a learned factor counts as much as the formula
+    CONSUMPTION_FIT_MAX_INTERVAL_DAYS = 60  # longer gaps between waterings are taken as unlogged waterings
+    CONSUMPTION_FACTOR_RANGE = (0.25, 4.0)  # learned corrections are clipped to this range
+    # Engine profile, see engine.py; SQLALCHEMY_ENGINE_OPTIONS overrides single options
+    DB_POOL_SIZE = 5  # connections kept open in each worker process
+    DB_POOL_MAX_OVERFLOW = 10  # extra connections opened under load and closed when returned
+    DB_POOL_TIMEOUT = 10  # seconds a request waits for a free connection before failing
+    DB_POOL_RECYCLE = 1800  # MySQL connections are replaced before the server's wait_timeout drops them
+    DB_POOL_PRE_PING = True  # MySQL connections are tested on checkout, replacing ones the server closed
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',  # readers do not block the writer and the writer does not block readers
+        'synchronous': 'NORMAL',  # safe with WAL, fsyncs at checkpoints instead of every commit
+        'mmap_size': 256 * 1024 * 1024,
+        'busy_timeout': 5000  # milliseconds a writer waits for the lock instead of failing with "database is locked"
+    }
+    # Connections of a worker share one page cache. Off by default: shared-cache connections
+    # lock whole tables and fail with SQLITE_LOCKED, which busy_timeout does not wait for
+    SQLITE_SHARED_CACHE = False
+    # Read replicas serving the reads of GET requests, see routing.py; comma-separated in the environment
+    DATABASE_REPLICA_URLS = [url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url]
+    REPLICA_STICKY_SECONDS = 10  # after a write, the user's requests read from the primary for this long
 
 # Ensure the upload folder exists
 os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
\ No newline at end of file
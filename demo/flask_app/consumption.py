@@ -0,0 +1,190 @@
+# flask_app/consumption.py
+import numpy as np
+import pandas as pd
+from flask import current_app
+
+from flask_app.catalogue import get_meta, set_meta
+from flask_app.models import db, ConsumptionFactor, ConsumptionFitStat, Plant, UserPlant, WateringEvent
+from flask_app.schedule import base_daily_consumption, consumption_keys
+from flask_app.watering import add_to_counters
+
+# app_meta key of the last watering event added to the fit statistics
+FIT_EVENT_ID_KEY = 'consumption_fit_event_id'
+# Watering intervals shorter than this many days are treated as top-ups and skipped
+MIN_INTERVAL_DAYS = 0.5
+# Gauss-Seidel sweeps over the normal equations, stopped earlier once the effects settle. A weak
+# prior makes the split between user and plant type effects converge slowly, hence the high cap
+MAX_SWEEPS = 1000
+TOLERANCE = 1e-9
+
+
+def _watering_intervals(events_df):
+    """Return the intervals between consecutive waterings of the same user plant.
+
+    events_df holds the new events plus, for every user plant, its last event already
+    fitted. An interval runs from one watering to the next; the amount given at the start
+    is what the plant used up during it.
+    """
+    events_df = events_df.sort_values(['user_plant_id', 'event_id'], ignore_index=True)
+    user_plant_id = events_df['user_plant_id'].to_numpy()
+    watered_at = events_df['watered_at'].to_numpy(dtype='datetime64[us]')
+    amount_l = events_df['amount_l'].to_numpy(dtype=float)
+
+    same_plant = user_plant_id[1:] == user_plant_id[:-1]
+    days = (watered_at[1:] - watered_at[:-1]) / np.timedelta64(1, 'D')
+    return pd.DataFrame({
+        'user_plant_id': user_plant_id[1:][same_plant],
+        'days': days[same_plant],
+        'amount_l': amount_l[:-1][same_plant]
+    })
+
+
+def _interval_statistics(intervals_df):
+    """Sum log(observed / formula daily consumption) of the usable intervals per user and plant type."""
+    plants_df = pd.DataFrame(db.session.execute(
+        db.select(
+            UserPlant.user_plant_id, UserPlant.user_id, Plant.plant_type, UserPlant.sun_exposure,
+            UserPlant.pot_diameter, Plant.min_water_consumption, Plant.max_water_consumption
+        ).join(Plant).where(UserPlant.user_plant_id.in_(intervals_df['user_plant_id'].unique().tolist()))
+    ).all(), columns=[
+        'user_plant_id', 'user_id', 'plant_type', 'sun_exposure', 'pot_diameter',
+        'min_water_consumption', 'max_water_consumption'
+    ])
+    # Intervals of deleted user plants have nothing to be compared with
+    intervals_df = intervals_df.merge(plants_df, on='user_plant_id')
+    if intervals_df.empty:
+        return []
+
+    # The formula uses the current settings of the user plant, which may have been edited since
+    base = base_daily_consumption(intervals_df)
+    max_days = current_app.config['CONSUMPTION_FIT_MAX_INTERVAL_DAYS']
+    days = intervals_df['days'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_ratio = np.log(intervals_df['amount_l'].to_numpy(dtype=float) / days / base)
+    # Very long intervals are waterings that were not logged, not slow consumption
+    usable = np.isfinite(log_ratio) & (days >= MIN_INTERVAL_DAYS) & (days <= max_days)
+
+    users, plant_types = consumption_keys(intervals_df)
+    cells = pd.DataFrame({
+        'user_id': users[usable],
+        'plant_type': plant_types[usable],
+        'log_ratio': log_ratio[usable]
+    })
+    cells = cells[cells['user_id'] != '']
+    summary = cells.groupby(['user_id', 'plant_type'], as_index=False).agg(
+        intervals=('log_ratio', 'size'),
+        sum_log_ratio=('log_ratio', 'sum')
+    )
+    return summary.astype({'user_id': int, 'intervals': int, 'sum_log_ratio': float}).to_dict('records')
+
+
+def reset_fit_statistics():
+    """Forget the fit statistics, so that the next update reads the whole history; the caller commits."""
+    db.session.execute(db.delete(ConsumptionFitStat))
+    set_meta(FIT_EVENT_ID_KEY, '0')
+
+
+def update_fit_statistics(batch_size=10000):
+    """Add the watering intervals ended by the events logged since the last fit to the statistics.
+
+    Events are read in event_id order from a watermark in app_meta, together with the last
+    fitted event of each user plant involved, and the watermark moves in the same transaction
+    as the statistics. Returns the number of events processed.
+    """
+    last_event_id = int(get_meta(FIT_EVENT_ID_KEY, 0))
+    columns = (
+        WateringEvent.event_id, WateringEvent.user_plant_id, WateringEvent.watered_at, WateringEvent.amount_l
+    )
+    query = db.select(*columns).order_by(WateringEvent.event_id).limit(batch_size)
+    processed = 0
+    while True:
+        new = db.session.execute(query.where(WateringEvent.event_id > last_event_id)).all()
+        if not new:
+            return processed
+
+        # The previous event of every user plant, where its first new interval starts
+        user_plant_ids = list({row.user_plant_id for row in new})
+        latest = db.select(db.func.max(WateringEvent.event_id)).where(
+            WateringEvent.user_plant_id.in_(user_plant_ids), WateringEvent.event_id <= last_event_id
+        ).group_by(WateringEvent.user_plant_id)
+        previous = db.session.execute(db.select(*columns).where(WateringEvent.event_id.in_(latest))).all()
+
+        events_df = pd.DataFrame(previous + new, columns=['event_id', 'user_plant_id', 'watered_at', 'amount_l'])
+        intervals_df = _watering_intervals(events_df)
+        if not intervals_df.empty:
+            add_to_counters(ConsumptionFitStat, _interval_statistics(intervals_df), ('intervals', 'sum_log_ratio'))
+        last_event_id = new[-1].event_id
+        set_meta(FIT_EVENT_ID_KEY, str(last_event_id))
+        db.session.commit()
+        processed += len(new)
+
+
+def solve_factors(user_index, plant_type_index, intervals, sum_log_ratio, prior_weight):
+    """Least-squares fit of log(observed / formula) = user effect + plant type effect.
+
+    The inputs are arrays over (user, plant type) cells: the index of the user and of the
+    plant type, the number of intervals and the sum of their log ratios. The intervals of a
+    cell share its prediction, so these sums are all the normal equations need. prior_weight
+    pseudo-intervals with a log ratio of 0 pull effects with little data towards factor 1
+    and make the split between the user and plant type effects unique. The equations are
+    solved by alternately solving for each group of effects, vectorized with bincount.
+    Returns (user_effects, plant_type_effects).
+    """
+    users = np.bincount(user_index, weights=intervals) + prior_weight
+    plant_types = np.bincount(plant_type_index, weights=intervals) + prior_weight
+    user_effects = np.zeros(len(users))
+    plant_type_effects = np.zeros(len(plant_types))
+    for _ in range(MAX_SWEEPS):
+        previous = user_effects
+        plant_type_effects = np.bincount(
+            plant_type_index, weights=sum_log_ratio - intervals * user_effects[user_index],
+            minlength=len(plant_types)
+        ) / plant_types
+        user_effects = np.bincount(
+            user_index, weights=sum_log_ratio - intervals * plant_type_effects[plant_type_index],
+            minlength=len(users)
+        ) / users
+        if np.max(np.abs(user_effects - previous), initial=0.0) < TOLERANCE:
+            break
+    return user_effects, plant_type_effects
+
+
+def fit_consumption_factors():
+    """Refit the user and plant type correction factors from the fit statistics.
+
+    Replaces the consumption_factor rows; the caller commits and refreshes the schedules.
+    Returns the number of factors written.
+    """
+    stats_df = pd.DataFrame(
+        db.session.execute(db.select(
+            ConsumptionFitStat.user_id, ConsumptionFitStat.plant_type,
+            ConsumptionFitStat.intervals, ConsumptionFitStat.sum_log_ratio
+        )).all(),
+        columns=['user_id', 'plant_type', 'intervals', 'sum_log_ratio']
+    )
+    db.session.execute(db.delete(ConsumptionFactor))
+    if stats_df.empty:
+        return 0
+
+    user_index, user_keys = pd.factorize(stats_df['user_id'])
+    plant_type_index, plant_type_keys = pd.factorize(stats_df['plant_type'])
+    intervals = stats_df['intervals'].to_numpy(dtype=float)
+    user_effects, plant_type_effects = solve_factors(
+        user_index, plant_type_index, intervals, stats_df['sum_log_ratio'].to_numpy(dtype=float),
+        current_app.config['CONSUMPTION_FIT_PRIOR_WEIGHT']
+    )
+
+    low, high = current_app.config['CONSUMPTION_FACTOR_RANGE']
+    rows = []
+    for scope, keys, index, effects in (
+        ('user', user_keys, user_index, user_effects),
+        ('plant_type', plant_type_keys, plant_type_index, plant_type_effects)
+    ):
+        counts = np.bincount(index, weights=intervals).astype(int)
+        factors = np.clip(np.exp(effects), low, high)
+        rows += [
+            {'scope': scope, 'scope_key': str(key), 'factor': float(factor), 'intervals': int(count)}
+            for key, factor, count in zip(keys, factors, counts)
+        ]
+    db.session.execute(db.insert(ConsumptionFactor), rows)
+    return len(rows)
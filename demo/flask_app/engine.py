@@ -0,0 +1,126 @@
+# flask_app/engine.py
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+from flask_app.models import db
+
+
+class MeasuredQueuePool(QueuePool):
+    """QueuePool that counts checkouts and the time spent waiting for a free connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.max_checked_out = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except TimeoutError:
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - start
+        with self._metrics_lock:
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            self.max_checked_out = max(self.max_checked_out, self.checkedout())
+        return record
+
+    def metrics(self):
+        with self._metrics_lock:
+            return {
+                'size': self.size(),
+                'checked_out': self.checkedout(),
+                'max_checked_out': self.max_checked_out,
+                'overflow': self.overflow(),
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_seconds': self.wait_seconds,
+                'max_wait_seconds': self.max_wait_seconds
+            }
+
+
+def engine_options(config, uri):
+    """Return (uri, engine options) of the engine profile in config for a database URI.
+
+    SQLite files get a pool of connections with busy_timeout, and the shared cache if
+    SQLITE_SHARED_CACHE is set, which needs the file: URI form. MySQL gets the pool
+    sizing, pre-ping and recycle settings.
+    """
+    url = make_url(uri)
+    options = {}
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            # Flask-SQLAlchemy keeps in-memory databases on a single static connection
+            return uri, options
+        connect_args = {'timeout': config['SQLITE_PRAGMAS'].get('busy_timeout', 5000) / 1000}
+        if config['SQLITE_SHARED_CACHE'] and not url.database.startswith('file:'):
+            url = url.set(database=f'file:{url.database}').update_query_dict({'cache': 'shared', 'uri': 'true'})
+        # pysqlite connections are handed between the threads of a worker by the pool
+        connect_args['check_same_thread'] = False
+        options['connect_args'] = connect_args
+    elif url.get_backend_name() == 'mysql':
+        options.update(pool_pre_ping=config['DB_POOL_PRE_PING'], pool_recycle=config['DB_POOL_RECYCLE'])
+    else:
+        return uri, options
+    options.update(
+        poolclass=MeasuredQueuePool,
+        pool_size=config['DB_POOL_SIZE'],
+        max_overflow=config['DB_POOL_MAX_OVERFLOW'],
+        pool_timeout=config['DB_POOL_TIMEOUT']
+    )
+    return url.render_as_string(hide_password=False), options
+
+
+def _sqlite_pragmas(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # busy_timeout first, so that switching the journal mode waits for other connections
+        for name, value in sorted(pragmas.items(), key=lambda item: item[0] != 'busy_timeout'):
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return set_pragmas
+
+
+class EngineProfile:
+    """Applies the engine profile of the config to the engines of db and reports pool metrics.
+
+    engine_options() feeds SQLALCHEMY_ENGINE_OPTIONS before db.init_app; init_app then
+    registers the SQLite pragmas on the engines it created, run on every new connection.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        with app.app_context():
+            for engine in db.engines.values():
+                if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:'):
+                    event.listen(engine, 'connect', _sqlite_pragmas(app.config['SQLITE_PRAGMAS']))
+        app.extensions['engine_profile'] = self
+
+    def pool_stats(self):
+        """Return {bind key: pool metrics} of the current app's engines."""
+        stats = {}
+        for key, engine in db.engines.items():
+            pool = engine.pool
+            if isinstance(pool, MeasuredQueuePool):
+                stats[key] = pool.metrics()
+            else:
+                stats[key] = {'status': pool.status()}
+        return stats
+
+
+engine_profile = EngineProfile()
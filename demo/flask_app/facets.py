@@ -0,0 +1,172 @@
+# flask_app/facets.py
+from flask import current_app
+from sqlalchemy.orm import aliased
+
+from flask_app.catalogue import FACET_COLUMNS, current_catalogue_version, get_plant_records
+from flask_app.models import db, Plant, PlantFacet
+from flask_app.search import SEARCH_LIMIT, count_search_matches, search_plant_ids
+
+# Facet headings on the add page, in display order
+FACET_LABELS = {
+    'plant_type': 'Plant type',
+    'light_needs': 'Light',
+    'soil_type': 'Soil',
+    'climate_zones': 'Climate zone',
+    'frost_tolerance': 'Frost tolerance',
+    'edible': 'Edible',
+    'maintenance': 'Maintenance',
+    'flower_color': 'Flower colour',
+    'foliage_color': 'Foliage colour'
+}
+# Search matches among which the facets filter; the rest of a broad search is not faceted
+MAX_SEARCH_CANDIDATES = 1000
+
+
+def parse_facet_filters(args):
+    """Return {facet column: [values]} for the facet columns selected in a MultiDict such as request.args."""
+    filters = {}
+    for column in FACET_COLUMNS:
+        values = [value for value in args.getlist(column) if value]
+        if values:
+            filters[column] = values
+    return filters
+
+
+def _matching(column, values):
+    return db.select(PlantFacet.plant_id).where(PlantFacet.facet == column, PlantFacet.value.in_(values))
+
+
+def _count_facets(query):
+    counts = {column: [] for column in FACET_COLUMNS}
+    for column, value, count in db.session.execute(query):
+        if column in counts:
+            counts[column].append((value, count))
+    for values in counts.values():
+        values.sort(key=lambda item: (-item[1], item[0]))
+    return counts
+
+
+def catalogue_facet_counts():
+    """Return the facet counts of the whole catalogue, cached in each worker per catalogue version."""
+    version = current_catalogue_version()
+    cached = current_app.extensions.get('facet_counts')
+    if cached is None or cached[0] != version:
+        query = db.select(PlantFacet.facet, PlantFacet.value, db.func.count()) \
+            .group_by(PlantFacet.facet, PlantFacet.value)
+        cached = current_app.extensions['facet_counts'] = (version, _count_facets(query))
+    return cached[1]
+
+
+def _matching_plants(filters, candidates, skip=None):
+    """Select the ids of the plants matching every filter but the one on skip, or None if all plants do.
+
+    A plant matches a filter if it has any of its values. The query reads the candidates
+    or the index range of the most selective filter, going by the catalogue counts, and
+    checks the other filters with index lookups for each of these plants.
+    """
+    filters = sorted(
+        ((column, values) for column, values in filters.items() if column != skip),
+        key=lambda item: sum(dict(catalogue_facet_counts()[item[0]]).get(value, 0) for value in item[1])
+    )
+    if candidates is not None:
+        plant_id = Plant.plant_id
+        query = db.select(Plant.plant_id).where(Plant.plant_id.in_(candidates))
+    elif filters:
+        (column, values), *filters = filters
+        plant_id = PlantFacet.plant_id
+        query = _matching(column, values)
+        if len(values) > 1:
+            query = query.distinct()
+    else:
+        return None
+    for column, values in filters:
+        other = aliased(PlantFacet)
+        query = query.where(
+            db.select(other.plant_id).where(
+                other.plant_id == plant_id, other.facet == column, other.value.in_(values)
+            ).exists()
+        )
+    return query
+
+
+def facet_counts(filters, candidates=None):
+    """Count the plants per facet value, in one grouped query over plant_facet.
+
+    The counts of a facet take the filters on all other facets into account but not its
+    own, so they tell how many plants selecting one more value of it would add. That makes
+    one branch per filtered facet plus one for the others, combined with UNION ALL; each
+    branch joins the plants it counts to their plant_facet rows through the plant_id index.
+    candidates optionally restricts the counts to some plant ids, e.g. the matches of a search.
+    Returns {facet column: [(value, count), ...]} with the largest counts first.
+    """
+    branches = []
+    for column in [*filters, None]:
+        query = db.select(PlantFacet.facet, PlantFacet.value, db.func.count())
+        # The branch of a filtered facet ignores its own filter, the last one applies them all
+        matching = _matching_plants(filters, candidates, skip=column)
+        if matching is not None:
+            matching = matching.subquery()
+            query = query.join(matching, matching.c.plant_id == PlantFacet.plant_id)
+        if column is not None:
+            query = query.where(PlantFacet.facet == column)
+        elif filters:
+            query = query.where(PlantFacet.facet.notin_(list(filters)))
+        branches.append(query.group_by(PlantFacet.facet, PlantFacet.value))
+    return _count_facets(db.union_all(*branches) if len(branches) > 1 else branches[0])
+
+
+def filter_plants(filters, limit=SEARCH_LIMIT):
+    """Return (plant_ids, total): the first limit plants matching every filter by plant_id and their number."""
+    matching = _matching_plants(filters, None)
+    if matching is None:
+        matching = db.select(Plant.plant_id)
+    total = db.session.execute(db.select(db.func.count()).select_from(matching.subquery())).scalar()
+    plant_ids = db.session.execute(matching.order_by('plant_id').limit(limit)).scalars().all()
+    return plant_ids, total
+
+
+def faceted_search(term=None, filters=None, limit=SEARCH_LIMIT):
+    """Search the catalogue by name and facet filters.
+
+    Returns (plants, total, counts, complete): up to limit PlantRecords (best match first if
+    there is a search term, by plant_id otherwise), the number of matching plants, the facet
+    counts, and False if the facets only filtered the first MAX_SEARCH_CANDIDATES name
+    matches, in which case total and counts leave out the plants beyond them.
+    """
+    filters = filters or {}
+    candidates = search_plant_ids(term, MAX_SEARCH_CANDIDATES) if term else None
+    complete = candidates is None or len(candidates) < MAX_SEARCH_CANDIDATES
+
+    if candidates is None:
+        plant_ids, total = filter_plants(filters, limit)
+    elif filters:
+        matching = set(db.session.execute(_matching_plants(filters, candidates)).scalars())
+        plant_ids = [plant_id for plant_id in candidates if plant_id in matching]
+        total = len(plant_ids)
+        plant_ids = plant_ids[:limit]
+    else:
+        plant_ids = candidates[:limit]
+        total = len(candidates) if complete else count_search_matches(term)
+        complete = True
+
+    records = get_plant_records(plant_ids)
+    plants = [records[plant_id] for plant_id in plant_ids if plant_id in records]
+    if candidates is None and not filters:
+        return plants, total, catalogue_facet_counts(), complete
+    return plants, total, facet_counts(filters, candidates), complete
+
+
+def filter_plants_like(filters, limit=SEARCH_LIMIT):
+    """Unindexed LIKE scan over the comma-separated columns, used as benchmark baseline.
+
+    Returns (plant_ids, total) like filter_plants.
+    """
+    conditions = [
+        db.or_(*[getattr(Plant, column).ilike(f'%{value}%') for value in values])
+        for column, values in filters.items()
+    ]
+    total = db.session.execute(db.select(db.func.count(Plant.plant_id)).where(*conditions)).scalar()
+    plant_ids = db.session.execute(
+        db.select(Plant.plant_id).where(*conditions).order_by(Plant.plant_id).limit(limit)
+    ).scalars().all()
+    return plant_ids, total
@@ -0,0 +1,14 @@
+# flask_app/files.py
+import os
+
+# Mode of the files the app writes for others: a front-end server or workers running as another user
+PUBLISHED_FILE_MODE = 0o644
+
+
+def publish_file(temp_path, path):
+    """Move a finished temporary file to path in one step, readable by everyone.
+
+    tempfile.mkstemp creates files readable by their owner only, so the mode is set first.
+    """
+    os.chmod(temp_path, PUBLISHED_FILE_MODE)
+    os.replace(temp_path, path)
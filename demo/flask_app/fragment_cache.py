@@ -0,0 +1,116 @@
+# flask_app/fragment_cache.py
+import threading
+import time
+from collections import OrderedDict
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+class FragmentCache:
+    """Caches rendered template fragments, see the {% cache %} tag below.
+
+    Fragments are kept in a bounded in-process LRU (FRAGMENT_CACHE_SIZE entries). If
+    FRAGMENT_CACHE_BACKEND is set to a client with get(key) and set(key, value, timeout)
+    methods (e.g. a memcached or Redis client), fragments missing locally are looked up
+    there and every rendered fragment is stored there too, so worker processes share them.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.maxsize = 0
+        self.backend = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.maxsize = app.config['FRAGMENT_CACHE_SIZE']
+        self.backend = app.config['FRAGMENT_CACHE_BACKEND']
+        app.extensions['fragment_cache'] = self
+        app.jinja_env.add_extension(FragmentCacheExtension)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.render_seconds = 0.0
+
+    def stats(self):
+        """Return the hit/miss counters and an estimate of the rendering time saved by hits."""
+        average = self.render_seconds / self.misses if self.misses else 0.0
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'backend_hits': self.backend_hits,
+            'misses': self.misses,
+            'render_seconds': self.render_seconds,
+            'saved_seconds': (self.hits + self.backend_hits) * average
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def fetch(self, key, render):
+        """Return the fragment cached under key, calling render() to produce it on a miss."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        if self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                if isinstance(value, bytes):
+                    value = value.decode()
+                value = Markup(value)
+                self.backend_hits += 1
+                self._remember(key, value)
+                return value
+
+        start = time.perf_counter()
+        value = Markup(render())
+        self.render_seconds += time.perf_counter() - start
+        self.misses += 1
+        self._remember(key, value)
+        if self.backend is not None:
+            self.backend.set(key, str(value), self.app.config['FRAGMENT_CACHE_TIMEOUT'])
+        return value
+
+
+class FragmentCacheExtension(Extension):
+    """Adds {% cache part, part, ... %}...{% endcache %}, caching the enclosed output under the parts.
+
+    The parts must identify everything the fragment depends on, e.g. a row id and version.
+    """
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method('_cache', [nodes.List(parts)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _cache(self, parts, caller):
+        key = 'fragment:' + ':'.join(str(part) for part in parts)
+        return fragment_cache.fetch(key, caller)
+
+
+fragment_cache = FragmentCache()
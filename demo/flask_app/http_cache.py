@@ -0,0 +1,139 @@
+# flask_app/http_cache.py
+import functools
+import hashlib
+import os
+from datetime import datetime
+from flask import current_app, g, make_response, request, session
+from werkzeug.http import is_resource_modified
+
+from flask_app.catalogue import current_catalogue_version
+from flask_app.models import db, User
+
+# Query argument carrying the fingerprint of static files
+STATIC_FINGERPRINT_ARG = 'v'
+
+
+def bump_plants_version(user_id):
+    """Mark the plants of user_id as changed, invalidating their cached pages; the caller commits."""
+    db.session.execute(
+        db.update(User).where(User.user_id == user_id).values(plants_version=User.plants_version + 1)
+    )
+
+
+def bump_plants_versions(user_ids):
+    """bump_plants_version for many users at once, e.g. from a batch job; the caller commits."""
+    if user_ids:
+        db.session.execute(
+            db.update(User).where(User.user_id.in_(list(user_ids))).values(plants_version=User.plants_version + 1)
+        )
+
+
+def _user_state():
+    """Return what the pages of the current user depend on besides the catalogue and the view.
+
+    The counters are read from the User row rather than the session snapshot, so that changes
+    made through the API, in another session or by a CLI command show up right away. One
+    primary key lookup costs far less than the render a 304 saves.
+    """
+    versions = db.session.execute(
+        db.select(User.user_version, User.plants_version).where(User.user_id == g.user.user_id)
+    ).one_or_none()
+    # The day matters because of the overdue days shown in the notifications
+    return g.user.user_id, tuple(versions or ()), datetime.today().date().isoformat()
+
+
+def _etag(parts):
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def conditional(key=None, user=True, last_modified=None):
+    """Answer conditional GET and HEAD requests with 304 Not Modified before the view runs.
+
+    The ETag covers the template build, the catalogue version, the view and query arguments,
+    key(**view_args) if given and, if user, the current user's change counters. last_modified is an optional
+    function returning the Last-Modified time. Requests with pending flash messages are always
+    rendered, so that the messages are shown.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped_view(**kwargs):
+            if request.method not in ('GET', 'HEAD') or '_flashes' in session:
+                return view(**kwargs)
+
+            parts = (
+                request.endpoint,
+                current_app.extensions['http_cache']['build'],
+                current_catalogue_version(),
+                sorted(kwargs.items()),
+                sorted(request.args.items(multi=True)),
+                key(**kwargs) if key else None,
+                _user_state() if user else None
+            )
+            etag = _etag(parts)
+            modified = last_modified() if last_modified else None
+            if not is_resource_modified(request.environ, etag=etag, last_modified=modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if modified is not None:
+                response.last_modified = modified
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            response.vary.add('Cookie')
+            return response
+        return wrapped_view
+    return decorator
+
+
+def static_fingerprint(filename):
+    """Return a short hash of the content of a static file, or None if it does not exist."""
+    fingerprints = current_app.extensions['http_cache']['fingerprints']
+    path = os.path.join(current_app.static_folder, filename)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    cached = fingerprints.get(path)
+    if cached is None or cached[0] != (stat.st_mtime_ns, stat.st_size):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        cached = fingerprints[path] = ((stat.st_mtime_ns, stat.st_size), digest.hexdigest()[:12])
+    return cached[1]
+
+
+def _template_build(app):
+    # Pages rendered by other templates must not match ETags of the old ones
+    digest = hashlib.sha256()
+    for root, _, files in sorted(os.walk(os.path.join(app.root_path, app.template_folder))):
+        for name in sorted(files):
+            with open(os.path.join(root, name), 'rb') as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def init_app(app):
+    """Fingerprint static URLs and cache fingerprinted static files for a year."""
+    app.extensions['http_cache'] = {'build': _template_build(app), 'fingerprints': {}}
+
+    @app.url_defaults
+    def add_static_fingerprint(endpoint, values):
+        if endpoint == 'static' and STATIC_FINGERPRINT_ARG not in values:
+            fingerprint = static_fingerprint(values.get('filename', ''))
+            if fingerprint:
+                values[STATIC_FINGERPRINT_ARG] = fingerprint
+
+    @app.after_request
+    def cache_fingerprinted_static(response):
+        if request.endpoint == 'static' and STATIC_FINGERPRINT_ARG in request.args \
+                and response.status_code in (200, 304):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = app.config['STATIC_MAX_AGE']
+            response.cache_control.immutable = True
+        return response
@@ -0,0 +1,203 @@
+# flask_app/images.py
+import atexit
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import imageio.v3 as iio
+import numpy as np
+
+from flask_app.files import publish_file
+
+logger = logging.getLogger(__name__)
+
+# Size of the chunks uploads are streamed and hashed in
+CHUNK_SIZE = 64 * 1024
+
+
+def _shrink(image, max_size):
+    """Downscale an image array by an integer factor with box averaging, so that no side exceeds max_size."""
+    factor = -(-max(image.shape[:2]) // max_size)
+    if factor <= 1:
+        return image
+    height, width = image.shape[0] // factor, image.shape[1] // factor
+    blocks = image[:height * factor, :width * factor].reshape(height, factor, width, factor, image.shape[2])
+    return blocks.mean(axis=(1, 3)).round().astype(np.uint8)
+
+
+def load_rgb(uri):
+    """Read the (first frame of the) image at uri (a path or bytes) as an 8-bit RGB or RGBA array."""
+    image = iio.imread(uri, index=0)
+    if image.dtype != np.uint8:
+        image = (image / np.iinfo(image.dtype).max * 255).round().astype(np.uint8)
+    if image.ndim == 2:
+        image = np.stack([image] * 3, axis=-1)
+    elif image.shape[2] == 2:
+        image = np.concatenate([np.repeat(image[..., :1], 3, axis=-1), image[..., 1:]], axis=-1)
+    return image
+
+
+def _flatten(image):
+    """Drop the alpha channel of an RGBA array by compositing it on white, for JPEG."""
+    if image.shape[2] != 4:
+        return image
+    alpha = image[..., 3:] / 255
+    return (image[..., :3] * alpha + 255 * (1 - alpha)).round().astype(np.uint8)
+
+
+def write_variants(image, stem, sizes):
+    """Write the WebP and JPEG variants of an image array to <stem>_<size>.<ext> for every size
+    in sizes; returns the number of files written.
+
+    _shrink divides by an integer factor, so a variant can be narrower than its size; the
+    actual widths are recorded in <stem>_widths.json for the srcset descriptors.
+    """
+    written = 0
+    widths = {}
+    for size in sizes:
+        resized = _shrink(image, size)
+        for extension, pixels in (('webp', resized), ('jpg', _flatten(resized))):
+            target = f'{stem}_{size}.{extension}'
+            # Write to a temporary name first, so that no half-written variant is ever served
+            partial = f'{target}.part.{extension}'
+            try:
+                iio.imwrite(partial, pixels, quality=80 if extension == 'webp' else 85)
+                os.replace(partial, target)
+                written += 1
+            except Exception:
+                logger.exception('Could not write %s', target)
+                if os.path.exists(partial):
+                    os.remove(partial)
+        widths[str(size)] = int(resized.shape[1])
+    fd, partial = tempfile.mkstemp(dir=os.path.dirname(stem) or '.', suffix='.json.part')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(widths, f)
+    publish_file(partial, widths_path(stem))
+    return written
+
+
+def widths_path(stem):
+    """Path of the file recording the actual pixel widths of the variants of stem."""
+    return f'{stem}_widths.json'
+
+
+def variant_path(image_path, width, extension):
+    """Path of the variant of image_path (relative to the static folder) at most width pixels wide."""
+    stem, _ = os.path.splitext(image_path)
+    return f'{stem}_{width}.{extension}'
+
+
+class ImagePipeline:
+    """Stores uploaded images under content-addressed paths and derives their resized variants.
+
+    An upload is streamed to images/<hash[:2]>/<sha256>.<ext> in the upload folder, so the
+    same photo is stored once. Thumbnails (WebP plus a JPEG fallback) for every width in
+    IMAGE_VARIANT_SIZES are generated by a thread pool, and the request returns right away.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if self.app is None:
+            atexit.register(self.shutdown)
+        self.app = app
+        app.extensions['images'] = self
+        app.add_template_global(self.variants, 'image_variants')
+
+    def _absolute(self, image_path):
+        # image_path is relative to the static folder, the upload folder is static/images
+        return os.path.join(os.path.dirname(self.app.config['UPLOAD_FOLDER']), image_path)
+
+    def ingest(self, file, extension):
+        """Store an uploaded file and schedule its variants; returns its path relative to the static folder."""
+        upload_folder = self.app.config['UPLOAD_FOLDER']
+        digest = hashlib.sha256()
+        handle, temp_path = tempfile.mkstemp(dir=upload_folder, suffix='.part')
+        try:
+            with os.fdopen(handle, 'wb') as temp:
+                for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+                    digest.update(chunk)
+                    temp.write(chunk)
+
+            name = digest.hexdigest()
+            image_path = f'images/{name[:2]}/{name}.{extension}'
+            absolute_path = self._absolute(image_path)
+            if os.path.exists(absolute_path):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
+                publish_file(temp_path, absolute_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        if not self.variants(image_path):
+            self.submit(image_path)
+        return image_path
+
+    def submit(self, image_path):
+        """Generate the variants of image_path in the background (or right away if disabled)."""
+        if not self.app.config['IMAGE_BACKGROUND_PROCESSING']:
+            self.generate_variants(image_path)
+            return None
+        return self._ensure_executor().submit(self.generate_variants, image_path)
+
+    def generate_variants(self, image_path):
+        """Write the WebP and JPEG variants of image_path; returns the number of files written."""
+        try:
+            image = load_rgb(self._absolute(image_path))
+        except Exception:
+            logger.exception('Could not read image %s', image_path)
+            return 0
+
+        stem, _ = os.path.splitext(self._absolute(image_path))
+        return write_variants(image, stem, self.app.config['IMAGE_VARIANT_SIZES'])
+
+    def variants(self, image_path):
+        """Return the generated variants of image_path as (width, webp_path, jpg_path), narrowest first.
+
+        width is the actual pixel width of the variant, which the srcset descriptors need.
+        """
+        if not image_path:
+            return []
+        stem, _ = os.path.splitext(self._absolute(image_path))
+        try:
+            with open(widths_path(stem)) as f:
+                widths = json.load(f)
+        except (OSError, ValueError):
+            widths = {}
+        variants = []
+        for size in sorted(self.app.config['IMAGE_VARIANT_SIZES']):
+            webp, jpg = variant_path(image_path, size, 'webp'), variant_path(image_path, size, 'jpg')
+            if os.path.exists(self._absolute(webp)) and os.path.exists(self._absolute(jpg)):
+                # Variants written before the widths were recorded are measured from the file
+                width = widths.get(str(size)) or iio.improps(self._absolute(jpg)).shape[1]
+                variants.append((width, webp, jpg))
+        return sorted(variants)
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=True)
+
+    def _ensure_executor(self):
+        # Created lazily so that every (forked) worker process gets its own pool
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.app.config['IMAGE_WORKERS'], thread_name_prefix='image-variants'
+                )
+            return self._executor
+
+
+images = ImagePipeline()
@@ -1,7 +1,10 @@
 # flask_app/models.py
+import secrets
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+from flask_app.routing import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     __tablename__ = 'user'
@@ -12,6 +15,10 @@ class User(db.Model):
     password = db.Column(db.Text, nullable=False)
     user_description = db.Column(db.Text)
     last_time_seen = db.Column(db.TIMESTAMP)
+    # Bumped on profile changes, invalidates the user snapshots stored in sessions
+    user_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # Bumped whenever the user's plants change, part of the ETags of the user's pages
+    plants_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
     user_plants = db.relationship('UserPlant', back_populates='user')
 
@@ -40,6 +47,45 @@ class Plant(db.Model):
     user_plants = db.relationship('UserPlant', back_populates='plant')
 
 
+class PlantFacet(db.Model):
+    """Normalized values of the categorical catalogue columns, one row per plant and value,
+    so that the comma-separated ones can be filtered on with an index (see facets.py)."""
+    __tablename__ = 'plant_facet'
+    facet = db.Column(db.String(32), primary_key=True)  # the Plant column, e.g. 'soil_type'
+    value = db.Column(db.String(100), primary_key=True)
+    plant_id = db.Column(db.Integer, db.ForeignKey('plant.plant_id'), primary_key=True)
+
+    __table_args__ = (
+        db.Index('ix_plant_facet_plant_id_facet_value', 'plant_id', 'facet', 'value'),
+    )
+
+
+class AppMeta(db.Model):
+    """Small key/value store for application-wide state such as the catalogue version."""
+    __tablename__ = 'app_meta'
+    key = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Text)
+
+
+class PlantSyncState(db.Model):
+    """Content hash of each catalogue CSV row last synced into the plant table."""
+    __tablename__ = 'plant_sync_state'
+    plant_id = db.Column(db.Integer, primary_key=True)
+    row_hash = db.Column(db.String(64), nullable=False)
+    # Set when the row disappeared from the CSV but the plant was kept
+    removed_at = db.Column(db.DateTime)
+
+
+class CachedImage(db.Model):
+    """Local copy of an external catalogue image, see catalogue_images.py."""
+    __tablename__ = 'cached_image'
+    # sha256 of source_url
+    url_hash = db.Column(db.String(64), primary_key=True)
+    source_url = db.Column(db.Text, nullable=False)
+    # Path of the default variant, relative to CATALOGUE_IMAGE_FOLDER
+    image_path = db.Column(db.String(255), nullable=False)
+    fetched_at = db.Column(db.DateTime, nullable=False)
+
 
 class UserPlant(db.Model):
     __tablename__ = 'userplant'
@@ -55,6 +101,80 @@ class UserPlant(db.Model):
     plant_position = db.Column(db.Text)
     plant_nickname = db.Column(db.Text)
     registered_at = db.Column(db.TIMESTAMP, nullable=False, server_default=db.func.current_timestamp())
+    # Watering schedule derived from the columns above, kept up to date on write (see schedule.py)
+    daily_consumption_l = db.Column(db.Float)
+    next_watering_at = db.Column(db.DateTime)
+    # Bumped whenever the user edits the row, part of the key of its cached card fragment
+    row_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # Random per insert, also part of that key: SQLite reuses the ids of deleted rows, and
+    # row_version starts over at 1. Rows inserted before it was added have none
+    row_token = db.Column(db.String(16), default=lambda: secrets.token_hex(8))
+
+    __table_args__ = (
+        db.Index('ix_userplant_user_id_next_watering_at', 'user_id', 'next_watering_at'),
+        db.Index('ix_userplant_next_watering_at', 'next_watering_at'),
+    )
 
     user = db.relationship('User', back_populates='user_plants')
     plant = db.relationship('Plant', back_populates='user_plants')
+
+
+class Notification(db.Model):
+    """Watering notification of a due user plant, precomputed by the notification sweep."""
+    __tablename__ = 'notification'
+    user_plant_id = db.Column(db.Integer, db.ForeignKey('userplant.user_plant_id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.user_id'), nullable=False)
+    plant_id = db.Column(db.Integer, db.ForeignKey('plant.plant_id'))
+    # next_watering_at of the user plant when the notification was created
+    due_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.TIMESTAMP, nullable=False, server_default=db.func.current_timestamp())
+
+    __table_args__ = (
+        db.Index('ix_notification_user_id_user_plant_id', 'user_id', 'user_plant_id'),
+    )
+
+
+class WateringEvent(db.Model):
+    """Append-only log of waterings. user_id and plant_id are copied from the user plant,
+    so that the history outlives deleted user plants."""
+    __tablename__ = 'watering_event'
+    event_id = db.Column(db.Integer, primary_key=True)
+    user_plant_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    plant_id = db.Column(db.Integer, nullable=False)
+    watered_at = db.Column(db.DateTime, nullable=False)
+    amount_l = db.Column(db.Float)
+
+    __table_args__ = (
+        db.Index('ix_watering_event_user_plant_id_watered_at', 'user_plant_id', 'watered_at'),
+    )
+
+
+class WateringRollup(db.Model):
+    """Watering events summed per week or month, user and plant type, see watering.py."""
+    __tablename__ = 'watering_rollup'
+    period = db.Column(db.String(8), primary_key=True)  # 'week' or 'month'
+    period_start = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)
+    plant_type = db.Column(db.String(100), primary_key=True)
+    events = db.Column(db.Integer, nullable=False)
+    amount_l = db.Column(db.Float, nullable=False)
+
+
+class ConsumptionFitStat(db.Model):
+    """Sufficient statistics of the consumption model fit, per user and plant type: the number
+    of watering intervals seen and the sum of their log(observed / formula consumption)."""
+    __tablename__ = 'consumption_fit_stat'
+    user_id = db.Column(db.Integer, primary_key=True)
+    plant_type = db.Column(db.String(100), primary_key=True)
+    intervals = db.Column(db.Integer, nullable=False)
+    sum_log_ratio = db.Column(db.Float, nullable=False)
+
+
+class ConsumptionFactor(db.Model):
+    """Correction factor applied to the formula daily consumption, per user or plant type, see consumption.py."""
+    __tablename__ = 'consumption_factor'
+    scope = db.Column(db.String(16), primary_key=True)  # 'user' or 'plant_type'
+    scope_key = db.Column(db.String(100), primary_key=True)  # user_id or plant type
+    factor = db.Column(db.Float, nullable=False)
+    intervals = db.Column(db.Integer, nullable=False)
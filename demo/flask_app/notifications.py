@@ -0,0 +1,179 @@
+# flask_app/notifications.py
+from datetime import datetime
+from sqlalchemy.orm import aliased
+
+from flask_app.catalogue import get_meta, get_plant_records, set_meta
+from flask_app.models import db, Notification, UserPlant
+from flask_app.schedule import start_of_tomorrow
+
+# app_meta key of the moment up to which due plants have been swept into the notification table
+SWEPT_UNTIL_KEY = 'notifications_swept_until'
+
+
+def get_swept_until():
+    value = get_meta(SWEPT_UNTIL_KEY)
+    return datetime.fromisoformat(value) if value else None
+
+
+def _insert_notifications(rows):
+    if rows:
+        db.session.execute(db.insert(Notification), [
+            {
+                'user_plant_id': row.user_plant_id,
+                'user_id': row.user_id,
+                'plant_id': row.plant_id,
+                'due_at': row.next_watering_at
+            }
+            for row in rows
+        ])
+
+
+def _delete_notifications(user_plant_ids):
+    if user_plant_ids:
+        db.session.execute(db.delete(Notification).where(Notification.user_plant_id.in_(user_plant_ids)))
+
+
+def remove_notification(user_plant_id):
+    """Remove the notification of a user plant, e.g. before deleting it; the caller commits."""
+    _delete_notifications([user_plant_id])
+
+
+def sync_notifications(user_plants, today=None):
+    """Create, move or remove the notifications of user plants after their schedule changed.
+
+    user_plants are UserPlants or rows with user_plant_id, user_id, plant_id and
+    next_watering_at. The caller commits.
+    """
+    until = start_of_tomorrow(today)
+    _delete_notifications([user_plant.user_plant_id for user_plant in user_plants])
+    _insert_notifications([
+        user_plant for user_plant in user_plants
+        if user_plant.next_watering_at is not None and user_plant.next_watering_at < until
+    ])
+
+
+def sync_notification(user_plant, today=None):
+    """Create, move or remove the notification of one UserPlant; the caller commits."""
+    if user_plant.user_plant_id is None:
+        db.session.flush()
+    sync_notifications([user_plant], today)
+
+
+def sweep_notifications(today=None, full=False, batch_size=5000):
+    """Write the notifications of the user plants that became due since the last sweep.
+
+    Due means next_watering_at, persisted with the schedule formula of schedule.py, is before
+    the start of tomorrow. An incremental sweep only reads the plants whose next_watering_at
+    lies between the previous sweep and now, through the next_watering_at index. A full
+    sweep (the first one, or after bulk schedule changes) reconciles every user plant.
+    Both work in batches with one commit per batch. Returns (created, removed).
+    """
+    until = start_of_tomorrow(today)
+    since = None if full else get_swept_until()
+    if since is not None and since >= until:
+        return 0, 0
+
+    columns = (UserPlant.user_plant_id, UserPlant.user_id, UserPlant.plant_id, UserPlant.next_watering_at)
+    created = removed = 0
+    if since is None:
+        query = db.select(*columns).order_by(UserPlant.user_plant_id).limit(batch_size)
+        last_id = 0
+        while True:
+            rows = db.session.execute(query.where(UserPlant.user_plant_id > last_id)).all()
+            if not rows:
+                break
+            existing = dict(db.session.execute(
+                db.select(Notification.user_plant_id, Notification.due_at)
+                .where(Notification.user_plant_id.between(rows[0].user_plant_id, rows[-1].user_plant_id))
+            ).all())
+            due = {row.user_plant_id: row for row in rows if row.next_watering_at is not None and row.next_watering_at < until}
+            stale = [
+                user_plant_id for user_plant_id, due_at in existing.items()
+                if user_plant_id not in due or due[user_plant_id].next_watering_at != due_at
+            ]
+            new = [row for user_plant_id, row in due.items() if existing.get(user_plant_id) != row.next_watering_at]
+            _delete_notifications(stale)
+            _insert_notifications(new)
+            db.session.commit()
+            created += len(new)
+            removed += len(stale)
+            last_id = rows[-1].user_plant_id
+
+        # Notifications left behind by user plants that no longer exist
+        orphans = db.session.execute(
+            db.select(Notification.user_plant_id).outerjoin(UserPlant)
+            .where(UserPlant.user_plant_id.is_(None))
+        ).scalars().all()
+        _delete_notifications(orphans)
+        removed += len(orphans)
+    else:
+        # Keyset over (next_watering_at, user_plant_id), which follows the next_watering_at index
+        query = db.select(*columns).where(UserPlant.next_watering_at < until) \
+            .order_by(UserPlant.next_watering_at, UserPlant.user_plant_id).limit(batch_size)
+        last = (since, 0)
+        while True:
+            rows = db.session.execute(
+                query.where(db.tuple_(UserPlant.next_watering_at, UserPlant.user_plant_id) > last)
+            ).all()
+            if not rows:
+                break
+            _delete_notifications([row.user_plant_id for row in rows])
+            _insert_notifications(rows)
+            db.session.commit()
+            created += len(rows)
+            last = (rows[-1].next_watering_at, rows[-1].user_plant_id)
+
+    set_meta(SWEPT_UNTIL_KEY, until.isoformat())
+    db.session.commit()
+    return created, removed
+
+
+def _position(user_plant_id, user_id):
+    # Number of the user's plants listed before this one, to link to the right index page
+    earlier = aliased(UserPlant)
+    return db.select(db.func.count(earlier.user_plant_id)).where(
+        earlier.user_id == user_id,
+        earlier.user_plant_id < user_plant_id
+    ).scalar_subquery().label('position')
+
+
+def get_user_notifications(user_id, today=None):
+    """Return the watering notifications of user_id from the notification table.
+
+    User plants that became due after the last sweep (or all of them if no sweep has
+    run yet) are added with a range scan on the user's next_watering_at index.
+    """
+    if today is None:
+        today = datetime.today().date()
+    until = start_of_tomorrow(today)
+
+    rows = db.session.query(
+        Notification.user_plant_id,
+        Notification.plant_id,
+        Notification.due_at,
+        _position(Notification.user_plant_id, user_id)
+    ).filter(Notification.user_id == user_id).all()
+    due = {row.user_plant_id: row for row in rows}
+
+    since = get_swept_until()
+    if since is None or since < until:
+        query = db.session.query(
+            UserPlant.user_plant_id,
+            UserPlant.plant_id,
+            UserPlant.next_watering_at.label('due_at'),
+            _position(UserPlant.user_plant_id, user_id)
+        ).filter(UserPlant.user_id == user_id, UserPlant.next_watering_at < until)
+        if since is not None:
+            query = query.filter(UserPlant.next_watering_at >= since)
+        due.update((row.user_plant_id, row) for row in query.all())
+
+    records = get_plant_records([row.plant_id for row in due.values()])
+    return [
+        {
+            'user_plant_id': row.user_plant_id,
+            'plant_name': getattr(records.get(row.plant_id), 'common_name', None),
+            'overdue_days': max((today - row.due_at.date()).days, 0),
+            'position': row.position
+        }
+        for _, row in sorted(due.items())
+    ]
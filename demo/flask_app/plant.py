@@ -1,16 +1,32 @@
-from flask import Blueprint, flash, g, redirect, render_template, request, url_for, current_app
+from flask import (
+    Blueprint, flash, g, jsonify, redirect, render_template, request, send_from_directory, url_for, current_app
+)
 from werkzeug.exceptions import abort
-from werkzeug.utils import secure_filename
 import os
 from datetime import datetime, timedelta
 import math
 import pandas as pd
 
+from flask_app import api
 from flask_app.auth import login_required
 from flask_app.models import db, Plant, UserPlant
 from flask_app.models import User  # if user information is needed
+from flask_app.autocomplete import get_autocomplete_index
+from flask_app.catalogue import (
+    current_catalogue_updated_at, current_catalogue_version, get_plant_record, get_plant_records
+)
+from flask_app.http_cache import bump_plants_version, conditional
+from flask_app.facets import FACET_LABELS, MAX_SEARCH_CANDIDATES, faceted_search, parse_facet_filters
+from flask_app.images import images
+from flask_app.notifications import get_user_notifications, remove_notification, sync_notification
+from flask_app.recommend import recommender
+from flask_app.search import SEARCH_LIMIT
+from flask_app.watering import record_watering, water_plants
+from flask_app.schedule import apply_stored_schedule, refresh_user_plant_schedule
 
 bp = Blueprint('plant', __name__)
+# Versioned JSON API under /api/v1, see api.py
+bp.register_blueprint(api.bp)
 
 def calculate_water_consumption(sun_exposure, pot_diameter, min_water, max_water):
     if sun_exposure == 'low':
@@ -43,94 +59,71 @@ def check_if_watering_needed(next_watering_date):
     else:
         return (time_to_watering_plant, False)
 
-def get_plant_and_notifications():
-    user_id = g.user.user_id  # Access the current user from the ORM model
-
-    # Query the database using SQLAlchemy ORM instead of raw SQL
-    plants = db.session.query(Plant, UserPlant).join(UserPlant).filter(UserPlant.user_id == user_id).all()
-
-    # Convert the result into a Pandas DataFrame for manipulation
-    plant_data = []
-    for plant, userplant in plants:
-        plant_data.append({
-            'plant_id': plant.plant_id,
-            'common_name': plant.common_name,
-            'botanical_name': plant.botanical_name,
-            'image_location': plant.image_location,
-            'plant_type': plant.plant_type,
-            'water_needs':plant.water_needs,
-            'min_water_consumption':plant.min_water_consumption,
-            'max_water_consumption':plant.max_water_consumption,
-            'climate_zones':plant.climate_zones,
-            'light_needs':plant.light_needs,
-            'soil_type':plant.soil_type,
-            'maintenance':plant.maintenance,
-            'flower_color':plant.flower_color,
-            'foliage_color':plant.foliage_color,
-            'perfume':plant.perfume,
-            'aromatic':plant.aromatic,
-            'edible':plant.edible,
-            'bore_water_tolerance':plant.bore_water_tolerance,
-            'frost_tolerance':plant.frost_tolerance,
-            'sun_exposure': userplant.sun_exposure,
-            'size': userplant.size,
-            'last_watered': userplant.last_watered,
-            'pot_diameter': userplant.pot_diameter,
-            'watered_amount': userplant.watered_amount,
-            'plant_position': userplant.plant_position,
-            'user_plant_id': userplant.user_plant_id,
-            'min_water_consumption': plant.min_water_consumption,
-            'max_water_consumption': plant.max_water_consumption,
-            'plant_nickname': userplant.plant_nickname,
-            'image_path': userplant.image_path
-        })
-
-    plants_df = pd.DataFrame(plant_data)
-    notifications = []
-    daily_water_consumption_list = []
-    next_watering_date_list = []
-    time_to_watering_list = []
-    needs_watering_list = []
-
+def get_notifications():
+    """Return the current user's watering notifications, read at most once per request.
+
+    The notifications are precomputed by the notification sweep (see notifications.py).
+    """
+    if 'notifications' not in g:
+        g.notifications = get_user_notifications(g.user.user_id)
+    return g.notifications
+
+# Columns rendered by plant/index.html: the user's plant, including the persisted watering
+# schedule, and the catalogue fields merged in from the catalogue cache
+INDEX_COLUMNS = (
+    UserPlant.user_plant_id,
+    UserPlant.plant_id,
+    UserPlant.plant_nickname,
+    UserPlant.image_path,
+    UserPlant.size,
+    UserPlant.sun_exposure,
+    UserPlant.pot_diameter,
+    UserPlant.plant_position,
+    UserPlant.last_watered,
+    UserPlant.watered_amount,
+    UserPlant.daily_consumption_l,
+    UserPlant.next_watering_at,
+    UserPlant.row_version,
+    UserPlant.row_token
+)
+INDEX_CATALOGUE_FIELDS = (
+    'common_name',
+    'botanical_name',
+    'image_location',
+    'plant_type',
+    'water_needs',
+    'climate_zones',
+    'light_needs',
+    'soil_type',
+    'maintenance',
+    'flower_color',
+    'foliage_color',
+    'perfume',
+    'aromatic',
+    'edible',
+    'bore_water_tolerance',
+    'frost_tolerance'
+)
+
+def get_plant_page(page, per_page):
+    """Return one page of the current user's plants with their watering schedule, and the total count.
+
+    Only the page's rows are fetched (LIMIT/OFFSET), in the same order as the notifications.
+    """
+    user_id = g.user.user_id
+    total_plants = db.session.query(db.func.count(UserPlant.user_plant_id)) \
+        .filter(UserPlant.user_id == user_id).scalar()
+
+    rows = db.session.query(*INDEX_COLUMNS).filter(UserPlant.user_id == user_id) \
+        .order_by(UserPlant.user_plant_id).limit(per_page).offset((page - 1) * per_page).all()
+
+    plants_df = pd.DataFrame(rows, columns=[column.key for column in INDEX_COLUMNS])
     if not plants_df.empty:
-        for idx, plant in plants_df.iterrows():
-            plant['daily_water_consumption'] = calculate_water_consumption(
-                sun_exposure=plant['sun_exposure'],
-                pot_diameter=plant['pot_diameter'],
-                min_water=plant['min_water_consumption'],
-                max_water=plant['max_water_consumption']
-            )
-            daily_water_consumption_list.append(plant['daily_water_consumption'])
-
-            plant['next_watering_date'] = calculate_next_watering(
-                watered_date=plant['last_watered'],
-                watered_amount=plant['watered_amount'],
-                daily_consumption=plant['daily_water_consumption']
-            )
-            next_watering_date_list.append(plant['next_watering_date'])
-
-            if plant['next_watering_date']:
-                time_to_watering, needs_watering = check_if_watering_needed(plant['next_watering_date'])
-                plant['time_to_watering'] = time_to_watering
-                plant['needs_watering'] = needs_watering
-                if needs_watering:
-                    overdue_days = time_to_watering if time_to_watering > 0 else 0
-                    notifications.append({
-                        'user_plant_id': plant['user_plant_id'],
-                        'plant_name': plant['common_name'],
-                        'overdue_days': overdue_days,
-                        'position': idx
-                    })
-                time_to_watering_list.append(time_to_watering)
-                needs_watering_list.append(needs_watering)
-
-        plants_df['daily_water_consumption'] = daily_water_consumption_list
-        plants_df['next_watering_date'] = next_watering_date_list
-        plants_df['time_to_watering'] = time_to_watering_list
-        plants_df['needs_watering'] = needs_watering_list
-        return plants_df, notifications
-    else:
-        return plants_df, notifications
+        records = get_plant_records(plants_df['plant_id'].tolist())
+        for field in INDEX_CATALOGUE_FIELDS:
+            plants_df[field] = [getattr(records.get(plant_id), field, None) for plant_id in plants_df['plant_id']]
+        plants_df = apply_stored_schedule(plants_df)
+    return plants_df, total_plants
 
 def allowed_file(filename):
     return '.' in filename and \
@@ -138,22 +131,19 @@ def allowed_file(filename):
 
 @bp.route('/')
 @login_required
+@conditional()
 def index():
     """Show all plants registered by the current user."""
-    plants, notifications = get_plant_and_notifications()
+    notifications = get_notifications()
 
     # add pagination
-    page = request.args.get('page', 1, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
     per_page = current_app.config['PLANTS_PER_PAGE']
-
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_plants = plants.iloc[start:end]
+    paginated_plants, total_plants = get_plant_page(page, per_page)
 
     # convert to list of named tuples so that jinja for loop can list plants in index.html
     plants_list = list(paginated_plants.itertuples(index=False))
 
-    total_plants = len(plants)
     total_pages = (total_plants + per_page - 1) // per_page
 
     return render_template(
@@ -163,29 +153,75 @@ def index():
         notification_count=len(notifications),
         page=page,
         total_pages=total_pages,
-        per_page=per_page
+        per_page=per_page,
+        # Parts of the cache keys of the plant card fragments
+        catalogue_version=current_catalogue_version(),
+        today=datetime.today().date()
     )
 
 
+def _plant_records(plant_ids):
+    records = get_plant_records(plant_ids)
+    return [records[plant_id] for plant_id in plant_ids if plant_id in records]
+
+
 @bp.route('/add', methods=('GET', 'POST'))
 @login_required
+@conditional()
 def add():
     """Add a new plant to the user's account."""
-    if request.method == 'POST':
-        # Extract plant name from form
-        plant_name = request.form['plant_name']
-        # Query the database using SQLAlchemy ORM
-        plants = Plant.query.filter(Plant.common_name.ilike(f"%{plant_name}%")).all()
-        return render_template('plant/add.html', plants=plants)
-    return render_template('plant/add.html', plants=[])
+    # Searches are sent as GET so that their results can be revalidated; POST is still accepted
+    plant_name = request.values.get('plant_name')
+    filters = parse_facet_filters(request.values)
+    # Full-text search over common name, botanical name and plant type, narrowed by the facets
+    searching = plant_name is not None or bool(filters)
+    plants, total, facets, complete = faceted_search(plant_name, filters, limit=SEARCH_LIMIT if searching else 0)
+    # Suggestions from the catalogue feature vectors, see recommend.py
+    recommendations = [] if searching else _plant_records(
+        recommender.recommend_for_user(g.user.user_id, current_app.config['RECOMMENDATION_COUNT'])
+    )
+    return render_template(
+        'plant/add.html', plants=plants, total=total, facets=facets, filters=filters, facet_labels=FACET_LABELS,
+        search_complete=complete, max_search_candidates=MAX_SEARCH_CANDIDATES, recommendations=recommendations
+    )
+
+
+@bp.route('/autocomplete')
+@login_required
+@conditional(user=False, last_modified=current_catalogue_updated_at)
+def autocomplete():
+    """Suggest catalogue plants for a partially typed name."""
+    query = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    return jsonify(suggestions=get_autocomplete_index().suggest(query, limit=limit))
+
+
+@bp.route('/catalogue-images/<path:filename>')
+def catalogue_image(filename):
+    """Serve a catalogue image cached by flask cache-plant-images.
+
+    File names contain the hash of the image, so the name is a strong ETag and the
+    response can be cached forever.
+    """
+    response = send_from_directory(
+        current_app.config['CATALOGUE_IMAGE_FOLDER'], filename,
+        etag=os.path.basename(filename), max_age=current_app.config['CATALOGUE_IMAGE_MAX_AGE']
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 
 @bp.route('/select/<int:plant_id>', methods=['GET'])
 @login_required
+@conditional()
 def select(plant_id):
-    # Query using SQLAlchemy ORM
-    selected_plant = Plant.query.get_or_404(plant_id)
-    return render_template('plant/add.html', selected_plant=selected_plant)
+    # Catalogue rows are served from the in-process catalogue cache
+    selected_plant = get_plant_record(plant_id)
+    if selected_plant is None:
+        abort(404)
+    similar_plants = _plant_records(recommender.similar_plants(plant_id, current_app.config['RECOMMENDATION_COUNT']))
+    return render_template('plant/add.html', selected_plant=selected_plant, similar_plants=similar_plants)
 
 
 @bp.route('/save', methods=['POST'])
@@ -215,7 +251,11 @@ def save():
             plant_position=plant_position,
             plant_nickname=plant_nickname
         )
+        refresh_user_plant_schedule(user_plant)
         db.session.add(user_plant)
+        record_watering(user_plant)
+        sync_notification(user_plant)
+        bump_plants_version(user_id)
         db.session.commit()
 
         flash('Plant registered successfully!')
@@ -250,12 +290,11 @@ def update(user_plant_id):
         if 'image' in request.files and request.files['image'].filename != '':
             file = request.files['image']
             if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                relative_file_path = os.path.join('images', filename).replace('\\', '/')
-                file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename).replace('\\', '/')
+                # The extension allowed_file checked; the stored name is the content hash
+                extension = file.filename.rsplit('.', 1)[1].lower()
                 try:
-                    file.save(file_path)
-                    user_plant.image_path = relative_file_path
+                    # Stored under its content hash; thumbnails are generated in the background
+                    user_plant.image_path = images.ingest(file, extension)
                 except Exception as e:
                     error = f"File upload failed: {str(e)}"
             else:
@@ -269,13 +308,22 @@ def update(user_plant_id):
                 user_plant.size = float(size) if size else None
                 user_plant.sun_exposure = sun_exposure
                 if last_watered_str:
-                    user_plant.last_watered = datetime.strptime(last_watered_str, '%Y-%m-%d')
+                    last_watered = datetime.strptime(last_watered_str, '%Y-%m-%d')
+                    # The form only has the date; keep the time of a watering on the same day
+                    if user_plant.last_watered is None or user_plant.last_watered.date() != last_watered.date():
+                        user_plant.last_watered = last_watered
                 else:
                     user_plant.last_watered = None
                 user_plant.pot_diameter = float(pot_diameter) if pot_diameter else None
                 user_plant.watered_amount = float(watered_amount) if watered_amount else None
                 user_plant.plant_position = plant_position
                 user_plant.plant_nickname = plant_nickname
+                user_plant.row_version += 1
+                # Before anything flushes the changes, which tell whether it was watered
+                record_watering(user_plant)
+                refresh_user_plant_schedule(user_plant)
+                sync_notification(user_plant)
+                bump_plants_version(user_plant.user_id)
                 # Save changes to the database
                 db.session.commit()
                 flash('Plant updated successfully!')
@@ -287,6 +335,58 @@ def update(user_plant_id):
     # GET request or form validation failed
     return render_template('plant/update.html', user_plant=user_plant)
 
+# Most plants one bulk watering request may record
+MAX_BULK_WATERING = 1000
+
+def _watered_amount(data):
+    value = data.get('watered_amount')
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        abort(400, f'Invalid watered_amount {value!r}.')
+
+def _watering_result(user_plant_id, next_at):
+    return {
+        'user_plant_id': user_plant_id,
+        'next_watering_at': next_at.isoformat() if next_at else None,
+        'next_watering_date': next_at.date().isoformat() if next_at else None
+    }
+
+@bp.route('/<int:user_plant_id>/water', methods=('POST',))
+@login_required
+def water(user_plant_id):
+    """Record that a plant was watered now, with the given or else the previous amount."""
+    data = request.get_json(silent=True) or request.form
+    schedule = water_plants(g.user.user_id, [user_plant_id], _watered_amount(data))
+    if user_plant_id not in schedule:
+        abort(404)
+    db.session.commit()
+    return jsonify(_watering_result(user_plant_id, schedule[user_plant_id]))
+
+@bp.route('/water', methods=('POST',))
+@login_required
+def water_many():
+    """Record that many plants were watered now, given as JSON user_plant_ids or form user_plant_id fields."""
+    data = request.get_json(silent=True)
+    if data is not None:
+        user_plant_ids = data.get('user_plant_ids') if isinstance(data, dict) else None
+        if not isinstance(user_plant_ids, list) or not all(isinstance(id, int) for id in user_plant_ids):
+            abort(400, 'user_plant_ids must be a list of ids.')
+    else:
+        data = request.form
+        user_plant_ids = data.getlist('user_plant_id', type=int)
+    if len(user_plant_ids) > MAX_BULK_WATERING:
+        abort(400, f'At most {MAX_BULK_WATERING} plants can be watered at once.')
+
+    schedule = water_plants(g.user.user_id, user_plant_ids, _watered_amount(data))
+    db.session.commit()
+    return jsonify(
+        plants=[_watering_result(user_plant_id, next_at) for user_plant_id, next_at in sorted(schedule.items())],
+        not_found=sorted(set(user_plant_ids) - set(schedule))
+    )
+
 @bp.route('/<int:user_plant_id>/delete', methods=('POST',))
 @login_required
 def delete(user_plant_id):
@@ -299,6 +399,8 @@ def delete(user_plant_id):
         abort(403)  # HTTP Forbidden
 
     # Delete the user_plant
+    remove_notification(user_plant_id)
+    bump_plants_version(user_plant.user_id)
     db.session.delete(user_plant)
     db.session.commit()
     flash('Plant deleted successfully.')
@@ -0,0 +1,108 @@
+# flask_app/presence.py
+import atexit
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from flask_app.models import db, User
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceTracker:
+    """Buffers users' last-seen timestamps in memory and writes them to the database in batches.
+
+    A user's timestamp is written at most once per PRESENCE_WRITE_INTERVAL_SECONDS. A
+    background thread flushes due timestamps every PRESENCE_FLUSH_SECONDS, and everything
+    still buffered is flushed when the process exits.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._pending = {}
+        self._written = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if self.app is None:
+            atexit.register(self.shutdown)
+        self.app = app
+        app.extensions['presence'] = self
+
+    def touch(self, user_id, when=None):
+        """Record that user_id was seen now (or at when)."""
+        when = when or datetime.now(timezone.utc)
+        self._ensure_thread()
+        with self._lock:
+            self._pending[user_id] = when
+
+    def last_seen(self, user_id):
+        """Return the buffered last-seen timestamp of user_id, or None if nothing is buffered."""
+        with self._lock:
+            return self._pending.get(user_id) or self._written.get(user_id)
+
+    def flush(self, force=False):
+        """Write the buffered timestamps that are due (all of them if force) in one batch."""
+        interval = timedelta(seconds=self.app.config['PRESENCE_WRITE_INTERVAL_SECONDS'])
+        with self._lock:
+            due = {
+                user_id: seen for user_id, seen in self._pending.items()
+                if force or user_id not in self._written or seen - self._written[user_id] >= interval
+            }
+            for user_id in due:
+                del self._pending[user_id]
+        if not due:
+            return 0
+
+        try:
+            with self.app.app_context():
+                db.session.execute(db.update(User), [
+                    {'user_id': user_id, 'last_time_seen': seen} for user_id, seen in due.items()
+                ])
+                db.session.commit()
+        except Exception:
+            logger.exception('Could not write last_time_seen for %d users', len(due))
+            with self._lock:
+                for user_id, seen in due.items():
+                    self._pending.setdefault(user_id, seen)
+            return 0
+
+        with self._lock:
+            self._written.update(due)
+            # Older writes are already visible in the database
+            horizon = datetime.now(timezone.utc) - interval
+            self._written = {user_id: seen for user_id, seen in self._written.items() if seen >= horizon}
+        return len(due)
+
+    def shutdown(self):
+        self._stop.set()
+        if self._pid == os.getpid() and self.app is not None:
+            self.flush(force=True)
+
+    def _ensure_thread(self):
+        # Started lazily so that every (forked) worker process gets its own buffer and flusher
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._pending.clear()
+            self._written.clear()
+            self._stop = threading.Event()
+            if self.app.config['PRESENCE_BACKGROUND_FLUSH']:
+                self._thread = threading.Thread(target=self._run, name='presence-flusher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.app.config['PRESENCE_FLUSH_SECONDS']):
+            self.flush()
+
+
+presence = PresenceTracker()
@@ -0,0 +1,176 @@
+# flask_app/recommend.py
+import glob
+import re
+from datetime import datetime
+import logging
+import os
+import tempfile
+import threading
+import numpy as np
+
+from flask_app.catalogue import (
+    CATALOGUE_UPDATED_AT_KEY, current_catalogue_updated_at, current_catalogue_version, facet_values,
+    get_catalogue_version, get_meta
+)
+from flask_app.files import publish_file
+from flask_app.models import db, Plant, UserPlant
+
+logger = logging.getLogger(__name__)
+
+# Categorical catalogue columns encoded as multi-hot feature groups, with their weights
+FEATURE_COLUMNS = {
+    'plant_type': 1.5,
+    'water_needs': 1.0,
+    'climate_zones': 1.0,
+    'light_needs': 1.0,
+    'soil_type': 1.0,
+    'maintenance': 0.5,
+    'frost_tolerance': 0.5,
+    'bore_water_tolerance': 0.5
+}
+# Weight of the (log-scaled) min and max annual water consumption
+WATER_RANGE_WEIGHT = 1.0
+
+
+def build_features(rows):
+    """Encode catalogue rows (plant_id, min/max_water_consumption and the FEATURE_COLUMNS) as vectors.
+
+    Every categorical column becomes a group of one-hot columns, scaled to unit length per
+    plant and then by its weight, so that multi-valued columns do not outweigh the others.
+    Rows are normalized to unit length, which turns cosine similarity into a dot product.
+    Returns (plant_ids, matrix) with plant_ids sorted and matrix a float32 array.
+    """
+    rows = sorted(rows, key=lambda row: row['plant_id'])
+    plant_ids = np.array([row['plant_id'] for row in rows], dtype=np.int64)
+    groups = []
+    for column, weight in FEATURE_COLUMNS.items():
+        values = [facet_values(column, row[column]) for row in rows]
+        vocabulary = {value: i for i, value in enumerate(sorted({value for plant in values for value in plant}))}
+        group = np.zeros((len(rows), len(vocabulary)), dtype=np.float32)
+        for i, plant in enumerate(values):
+            for value in plant:
+                group[i, vocabulary[value]] = weight / np.sqrt(len(plant))
+        groups.append(group)
+
+    water = np.log1p(np.array(
+        [[row['min_water_consumption'] or 0, row['max_water_consumption'] or 0] for row in rows], dtype=np.float32
+    ).reshape(len(rows), 2))
+    groups.append(water / max(water.max(initial=0), 1) * WATER_RANGE_WEIGHT / np.sqrt(2))
+
+    matrix = np.hstack(groups).astype(np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms > 0, norms, 1)
+    return plant_ids, matrix
+
+
+def _top_k(scores, k, exclude):
+    """Return the indices of the k highest positive scores, best first, leaving out exclude."""
+    scores[exclude] = -np.inf
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    best = np.argpartition(-scores, k - 1)[:k]
+    best = best[np.argsort(-scores[best], kind='stable')]
+    return best[scores[best] > 0]
+
+
+class Recommender:
+    """Similar plants and "fits your garden" suggestions from catalogue feature vectors.
+
+    The feature matrix of each catalogue version is stored in RECOMMENDATION_FOLDER as a
+    .npy file and opened memory-mapped, so worker processes share the pages through the
+    OS page cache instead of each holding a copy. It is built by the catalogue commands,
+    or by the first worker that needs it.
+    """
+
+    def __init__(self, app=None):
+        self.folder = None
+        self._index = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.folder = app.config['RECOMMENDATION_FOLDER']
+        app.extensions['recommender'] = self
+
+    def _paths(self, version, updated_at):
+        # The update time tells apart catalogues of the same version in different databases
+        stamp = f'{version}_{int(updated_at.timestamp()) if updated_at else 0}'
+        return (
+            os.path.join(self.folder, f'plant_ids_{stamp}.npy'),
+            os.path.join(self.folder, f'plant_features_{stamp}.npy')
+        )
+
+    def build(self, version=None, updated_at=None):
+        """Encode the catalogue and store the feature matrix of its version; returns the matrix shape."""
+        if version is None:
+            version = get_catalogue_version()
+            updated_at = get_meta(CATALOGUE_UPDATED_AT_KEY)
+            updated_at = datetime.fromisoformat(updated_at) if updated_at else None
+        paths = self._paths(version, updated_at)
+        columns = ('plant_id', 'min_water_consumption', 'max_water_consumption', *FEATURE_COLUMNS)
+        rows = db.session.execute(db.select(*[getattr(Plant, column) for column in columns])).all()
+        plant_ids, matrix = build_features([row._asdict() for row in rows])
+
+        os.makedirs(self.folder, exist_ok=True)
+        for path, array in zip(paths, (plant_ids, matrix)):
+            # Written under a temporary name first, so that workers never map a partial file
+            fd, partial = tempfile.mkstemp(dir=self.folder, suffix='.npy.part')
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, array)
+            publish_file(partial, path)
+        # Files of older versions; workers that still map one keep it until they switch
+        for path in glob.glob(os.path.join(self.folder, 'plant_*.npy')):
+            match = re.search(r'_(\d+)_\d+\.npy$', path)
+            if match and int(match.group(1)) < version:
+                os.remove(path)
+        return matrix.shape
+
+    def _load(self):
+        """Return (plant_ids, matrix) of the current catalogue version, building it if missing."""
+        version = current_catalogue_version()
+        updated_at = current_catalogue_updated_at()
+        index = self._index
+        if index is not None and index[0] == (version, updated_at):
+            return index[1], index[2]
+        with self._lock:
+            if self._index is None or self._index[0] != (version, updated_at):
+                ids_path, matrix_path = self._paths(version, updated_at)
+                if not (os.path.exists(ids_path) and os.path.exists(matrix_path)):
+                    logger.info('Building the plant feature matrix of catalogue version %s', version)
+                    self.build(version, updated_at)
+                self._index = ((version, updated_at), np.load(ids_path), np.load(matrix_path, mmap_mode='r'))
+            return self._index[1], self._index[2]
+
+    def similar_plants(self, plant_id, k=10):
+        """Return the ids of the k catalogue plants most similar to plant_id, most similar first."""
+        plant_ids, matrix = self._load()
+        position = np.searchsorted(plant_ids, plant_id)
+        if position >= len(plant_ids) or plant_ids[position] != plant_id:
+            return []
+        scores = matrix @ matrix[position]
+        return plant_ids[_top_k(scores, k, [position])].tolist()
+
+    def recommend_for(self, plant_ids_owned, k=10):
+        """Return the ids of the k catalogue plants closest to a garden of plants, leaving those out.
+
+        The garden is represented by the mean direction of its plants' vectors.
+        """
+        plant_ids, matrix = self._load()
+        positions = np.flatnonzero(np.isin(plant_ids, np.asarray(plant_ids_owned, dtype=np.int64)))
+        if not len(positions):
+            return []
+        profile = np.asarray(matrix[positions]).sum(axis=0)
+        scores = matrix @ profile
+        return plant_ids[_top_k(scores, k, positions)].tolist()
+
+    def recommend_for_user(self, user_id, k=10):
+        """Return the ids of the k catalogue plants that fit the garden of user_id best."""
+        owned = db.session.execute(
+            db.select(UserPlant.plant_id).where(UserPlant.user_id == user_id).distinct()
+        ).scalars().all()
+        return self.recommend_for([plant_id for plant_id in owned if plant_id is not None], k)
+
+
+recommender = Recommender()
@@ -0,0 +1,63 @@
+# flask_app/routing.py
+import random
+import time
+from flask import current_app, has_request_context, request, session as cookie_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.elements import TextClause
+
+# Bind keys of the read replicas in SQLALCHEMY_BINDS, numbered from 0
+REPLICA_BIND_PREFIX = 'replica_'
+# Key in the cookie session of the moment until which the user's requests read from the primary
+PRIMARY_UNTIL_KEY = '_db_primary_until'
+# Requests that may read from a replica; everything else runs on the primary from the start
+READ_ONLY_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+
+def _is_read(clause):
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip()[:6].upper() == 'SELECT'
+    return getattr(clause, 'is_select', False) and getattr(clause, '_for_update_arg', None) is None
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of read-only requests to a replica and everything else to the primary.
+
+    A session serves one request (Flask-SQLAlchemy scopes it to the app context) and
+    reads from one replica, picked at random, so that its reads are consistent with
+    each other. Writes, and reads after a write, go to the primary, which also makes
+    the rest of the request read its own writes. A commit that wrote stores a moment in
+    the cookie session until which the user's next requests also read from the primary,
+    so that the page shown after a redirect is not missing what was just saved.
+    Outside requests (CLI commands, background threads) everything uses the primary.
+    """
+
+    def __init__(self, db, **kwargs):
+        super().__init__(db, **kwargs)
+        self._replica = None  # bind key of the replica read from, False once on the primary
+        self._wrote = False
+
+    def _replica_key(self):
+        if self._replica is None:
+            replicas = [key for key in self._db.engines if key and key.startswith(REPLICA_BIND_PREFIX)]
+            if (
+                replicas and has_request_context() and request.method in READ_ONLY_METHODS
+                and cookie_session.get(PRIMARY_UNTIL_KEY, 0) <= time.time()
+            ):
+                self._replica = random.choice(replicas)
+            else:
+                self._replica = False
+        return self._replica
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or clause is not None and not _is_read(clause):
+                self._replica = False
+                self._wrote = True
+            elif clause is not None and self._replica_key():
+                return self._db.engines[self._replica]
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+    def commit(self):
+        super().commit()
+        if self._wrote and has_request_context() and current_app.config['DATABASE_REPLICA_URLS']:
+            cookie_session[PRIMARY_UNTIL_KEY] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
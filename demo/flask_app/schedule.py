@@ -0,0 +1,217 @@
+# flask_app/schedule.py
+import math
+from datetime import datetime, time, timedelta
+import numpy as np
+import pandas as pd
+
+from flask_app.http_cache import bump_plants_versions
+from flask_app.models import db, ConsumptionFactor, Plant, UserPlant
+
+# Microseconds per day, used to round watering intervals the same way datetime.timedelta does
+MICROSECONDS_PER_DAY = 86_400_000_000
+
+# Inputs of the watering schedule, as (column key, model column) pairs
+SCHEDULE_INPUTS = (
+    ('user_plant_id', UserPlant.user_plant_id),
+    ('user_id', UserPlant.user_id),
+    ('plant_type', Plant.plant_type),
+    ('sun_exposure', UserPlant.sun_exposure),
+    ('pot_diameter', UserPlant.pot_diameter),
+    ('watered_amount', UserPlant.watered_amount),
+    ('last_watered', UserPlant.last_watered),
+    ('min_water_consumption', Plant.min_water_consumption),
+    ('max_water_consumption', Plant.max_water_consumption)
+)
+
+
+def base_daily_consumption(plants_df):
+    """Return the daily water consumption in liters given by the catalogue formula, before corrections."""
+    sun_exposure = plants_df['sun_exposure'].to_numpy(dtype=object)
+    min_water = pd.to_numeric(plants_df['min_water_consumption'], errors='coerce').to_numpy(dtype=float)
+    max_water = pd.to_numeric(plants_df['max_water_consumption'], errors='coerce').to_numpy(dtype=float)
+    pot_diameter = pd.to_numeric(plants_df['pot_diameter'], errors='coerce').to_numpy(dtype=float)
+
+    # Annual mm picked by sun exposure; anything other than low/medium counts as high
+    daily_consumption_mm = np.select(
+        [sun_exposure == 'low', sun_exposure == 'medium'],
+        [min_water, (min_water + max_water) / 2],
+        default=max_water
+    ) / 365
+
+    # Area of the pot in square meters, daily water consumption in liters
+    pot_area = np.pi * (pot_diameter / 100 / 2) ** 2
+    return daily_consumption_mm * pot_area
+
+
+def consumption_keys(plants_df):
+    """Return the (user, plant type) keys of the consumption factors of a DataFrame of user plants."""
+    users = plants_df['user_id'].map(lambda user_id: '' if pd.isna(user_id) else str(int(user_id)))
+    plant_types = plants_df['plant_type'].fillna('').astype(str)
+    return users.to_numpy(dtype=object), plant_types.to_numpy(dtype=object)
+
+
+def consumption_factors(plants_df):
+    """Return the learned correction of every row: the product of its user's and plant type's factors.
+
+    Rows without user_id and plant_type columns, or without fitted factors, get 1.
+    """
+    if plants_df.empty or 'user_id' not in plants_df or 'plant_type' not in plants_df:
+        return np.ones(len(plants_df))
+    users, plant_types = consumption_keys(plants_df)
+    rows = db.session.execute(
+        db.select(ConsumptionFactor.scope, ConsumptionFactor.scope_key, ConsumptionFactor.factor).where(db.or_(
+            db.and_(ConsumptionFactor.scope == 'user', ConsumptionFactor.scope_key.in_(set(users))),
+            db.and_(ConsumptionFactor.scope == 'plant_type', ConsumptionFactor.scope_key.in_(set(plant_types)))
+        ))
+    ).all()
+    factors = {'user': {}, 'plant_type': {}}
+    for scope, scope_key, factor in rows:
+        factors[scope][scope_key] = factor
+    user_factor = np.array([factors['user'].get(key, 1.0) for key in users])
+    plant_type_factor = np.array([factors['plant_type'].get(key, 1.0) for key in plant_types])
+    return user_factor * plant_type_factor
+
+
+def _schedule_arrays(plants_df):
+    """Return (daily_consumption_l, next_watering_at, valid) arrays for a DataFrame of user plants."""
+    watered_amount = pd.to_numeric(plants_df['watered_amount'], errors='coerce').to_numpy(dtype=float)
+    daily_consumption_l = base_daily_consumption(plants_df) * consumption_factors(plants_df)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_to_next_watering = watered_amount / daily_consumption_l
+
+    watered_date = pd.to_datetime(plants_df['last_watered']).to_numpy(dtype='datetime64[us]')
+    # Intervals that are not finite or would overflow datetime64 have no schedule
+    max_days = (np.datetime64(pd.Timestamp.max.floor('D'), 'us') - watered_date) / np.timedelta64(1, 'D')
+    valid = np.isfinite(days_to_next_watering) & ~np.isnat(watered_date)
+    valid &= np.abs(days_to_next_watering) < np.where(np.isnan(max_days), 0, max_days)
+
+    interval = np.round(np.where(valid, days_to_next_watering, 0) * MICROSECONDS_PER_DAY).astype('int64')
+    next_watering_at = watered_date + interval.astype('timedelta64[us]')
+    return daily_consumption_l, next_watering_at, valid
+
+
+def _add_schedule_columns(plants_df, daily_consumption_l, next_watering_at, valid, today):
+    next_watering = next_watering_at.astype('datetime64[D]')
+    time_to_watering = (np.datetime64(today, 'D') - next_watering).astype('int64')
+
+    next_watering_date = pd.Series(next_watering, index=plants_df.index).dt.date.astype(object)
+    plants_df['daily_water_consumption'] = daily_consumption_l
+    plants_df['next_watering_date'] = next_watering_date.where(valid, None)
+    plants_df['time_to_watering'] = pd.arrays.IntegerArray(np.where(valid, time_to_watering, 0), ~valid)
+    plants_df['needs_watering'] = valid & (time_to_watering >= 0)
+    return plants_df
+
+
+def apply_stored_schedule(plants_df, today=None):
+    """Add the watering schedule columns to a DataFrame of user plants from their persisted
+    daily_consumption_l and next_watering_at columns.
+
+    Adds daily_water_consumption, next_watering_date, time_to_watering and needs_watering.
+    Rows without a schedule (missing inputs, zero consumption) get next_watering_date None,
+    time_to_watering <NA> and needs_watering False.
+    """
+    if today is None:
+        today = datetime.today().date()
+    next_watering_at = pd.to_datetime(plants_df['next_watering_at']).to_numpy(dtype='datetime64[us]')
+    valid = ~np.isnat(next_watering_at)
+    daily_consumption_l = pd.to_numeric(plants_df['daily_consumption_l'], errors='coerce').to_numpy(dtype=float)
+    return _add_schedule_columns(plants_df, daily_consumption_l, next_watering_at, valid, today)
+
+
+def schedule_values(plants_df):
+    """Return the (daily_consumption_l, next_watering_at) column values for a DataFrame of user plants."""
+    daily_consumption_l, next_watering_at, valid = _schedule_arrays(plants_df)
+    daily = [float(value) if np.isfinite(value) else None for value in daily_consumption_l]
+    next_at = [value.item() if ok else None for value, ok in zip(next_watering_at, valid)]
+    return daily, next_at
+
+
+def next_watering_at(last_watered, watered_amount, daily_consumption_l):
+    """Scalar version of the next_watering_at computed by _schedule_arrays from the stored daily consumption."""
+    if last_watered is None or watered_amount is None or not daily_consumption_l:
+        return None
+    days_to_next_watering = watered_amount / daily_consumption_l
+    if not np.isfinite(days_to_next_watering):
+        return None
+    try:
+        return last_watered + timedelta(microseconds=round(days_to_next_watering * MICROSECONDS_PER_DAY))
+    except OverflowError:
+        return None
+
+
+def refresh_user_plant_schedule(user_plant):
+    """Recompute the persisted daily_consumption_l and next_watering_at of one UserPlant."""
+    plant = db.session.get(Plant, int(user_plant.plant_id))
+    plants_df = pd.DataFrame([{
+        'user_id': user_plant.user_id,
+        'plant_type': plant.plant_type if plant else None,
+        'sun_exposure': user_plant.sun_exposure,
+        'pot_diameter': user_plant.pot_diameter,
+        'watered_amount': user_plant.watered_amount,
+        'last_watered': user_plant.last_watered,
+        'min_water_consumption': plant.min_water_consumption if plant else None,
+        'max_water_consumption': plant.max_water_consumption if plant else None
+    }])
+    daily, next_at = schedule_values(plants_df)
+    user_plant.daily_consumption_l = daily[0]
+    user_plant.next_watering_at = next_at[0]
+
+
+def _schedule_changed(stored_daily, stored_next, daily, next_at):
+    # MySQL stores FLOAT in single precision and DATETIME to the second, so compare loosely
+    if (stored_daily is None) != (daily is None) or (stored_next is None) != (next_at is None):
+        return True
+    if daily is not None and not math.isclose(stored_daily, daily, rel_tol=1e-6):
+        return True
+    return next_at is not None and abs(stored_next - next_at) >= timedelta(seconds=1)
+
+
+def refresh_schedules(plant_ids=None, batch_size=5000):
+    """Recompute the persisted schedule of every UserPlant, or of those of the given plants.
+
+    Rows are read in batches, and those whose schedule changed are written with one bulk
+    UPDATE per batch. Their row_version and their owners' plants_version are bumped, so that
+    cached cards and pages are not served stale. Returns the number of user plants whose
+    schedule changed. The caller commits.
+    """
+    keys = [key for key, _ in SCHEDULE_INPUTS]
+    query = db.select(
+        *[column for _, column in SCHEDULE_INPUTS], UserPlant.daily_consumption_l, UserPlant.next_watering_at
+    ).join(Plant).order_by(UserPlant.user_plant_id).limit(batch_size)
+    if plant_ids is not None:
+        query = query.where(UserPlant.plant_id.in_(list(plant_ids)))
+    table = UserPlant.__table__
+    update = table.update().where(table.c.user_plant_id == db.bindparam('b_user_plant_id')).values(
+        daily_consumption_l=db.bindparam('b_daily_consumption_l'),
+        next_watering_at=db.bindparam('b_next_watering_at'),
+        row_version=table.c.row_version + 1
+    )
+
+    refreshed = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(query.where(UserPlant.user_plant_id > last_id)).all()
+        if not rows:
+            return refreshed
+        plants_df = pd.DataFrame(rows, columns=[*keys, 'stored_daily', 'stored_next'])
+        daily, next_at = schedule_values(plants_df)
+        changed = [
+            (row, d, n) for row, d, n in zip(rows, daily, next_at)
+            if _schedule_changed(row.daily_consumption_l, row.next_watering_at, d, n)
+        ]
+        if changed:
+            db.session.execute(update, [
+                {'b_user_plant_id': row.user_plant_id, 'b_daily_consumption_l': d, 'b_next_watering_at': n}
+                for row, d, n in changed
+            ])
+            bump_plants_versions({row.user_id for row, _, _ in changed})
+        refreshed += len(changed)
+        last_id = rows[-1].user_plant_id
+
+
+def start_of_tomorrow(today=None):
+    """Plants whose next_watering_at is before this moment need watering today."""
+    if today is None:
+        today = datetime.today().date()
+    return datetime.combine(today + timedelta(days=1), time())
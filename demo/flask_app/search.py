@@ -0,0 +1,149 @@
+# flask_app/search.py
+import re
+from flask import current_app
+from sqlalchemy import inspect, text
+
+from flask_app.catalogue import get_plant_records
+from flask_app.models import db, Plant
+
+# Catalogue columns covered by the full-text index, with their bm25 weights on SQLite
+SEARCH_COLUMNS = (
+    ('common_name', 10.0),
+    ('botanical_name', 5.0),
+    ('plant_type', 1.0)
+)
+FTS_TABLE = 'plant_fts'
+FULLTEXT_INDEX = 'ix_plant_fulltext'
+SEARCH_LIMIT = 50
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def _tokens(term):
+    return re.findall(r'\w+', term.lower())
+
+
+def has_search_index():
+    """Return whether the full-text index exists.
+
+    It is created by migration 5b2e8d41c0a7, so databases built with db.create_all() lack
+    it until rebuild_search_index() runs. Only a positive answer is cached per app.
+    """
+    if current_app.extensions.get('search_index'):
+        return True
+    dialect = _dialect()
+    inspector = inspect(db.session.get_bind())
+    if dialect == 'sqlite':
+        exists = inspector.has_table(FTS_TABLE)
+    elif dialect == 'mysql':
+        exists = any(index['name'] == FULLTEXT_INDEX for index in inspector.get_indexes('plant'))
+    else:
+        exists = False
+    if exists:
+        current_app.extensions['search_index'] = True
+    return exists
+
+
+def _match_query(term, select):
+    """Return (statement, params) selecting select over the plants matching term, or None without an index."""
+    if not has_search_index():
+        return None
+    tokens = _tokens(term)
+    columns = ', '.join(column for column, _ in SEARCH_COLUMNS)
+    dialect = _dialect()
+    if dialect == 'sqlite':
+        statement = f'SELECT {select} FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match'
+        match = ' '.join(f'"{token}"*' for token in tokens)
+    else:
+        statement = f'SELECT {select} FROM plant WHERE MATCH({columns}) AGAINST (:match IN BOOLEAN MODE)'
+        match = ' '.join(f'+{token}*' for token in tokens)
+    return statement, {'match': match}
+
+
+def search_plant_ids(term, limit=SEARCH_LIMIT):
+    """Return the ids of the first limit catalogue plants matching every word of term as a prefix, best match first.
+
+    Uses the FTS5 table on SQLite and the FULLTEXT index on MySQL. Other databases, and
+    databases without the index, fall back to a LIKE scan over common and botanical names.
+    count_search_matches() tells how many plants match in all.
+    """
+    if not _tokens(term):
+        return []
+    query = _match_query(term, 'rowid' if _dialect() == 'sqlite' else 'plant_id')
+    if query is None:
+        return [plant.plant_id for plant in search_plants_like(term, limit)]
+
+    statement, params = query
+    if _dialect() == 'sqlite':
+        weights = ', '.join(str(weight) for _, weight in SEARCH_COLUMNS)
+        statement += f' ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT :limit'
+    else:
+        columns = ', '.join(column for column, _ in SEARCH_COLUMNS)
+        statement += f' ORDER BY MATCH({columns}) AGAINST (:match IN BOOLEAN MODE) DESC LIMIT :limit'
+    return db.session.execute(text(statement), {**params, 'limit': limit}).scalars().all()
+
+
+def count_search_matches(term):
+    """Return the number of catalogue plants matching term, as searched by search_plant_ids."""
+    if not _tokens(term):
+        return 0
+    query = _match_query(term, 'count(*)')
+    if query is None:
+        return db.session.execute(
+            db.select(db.func.count(Plant.plant_id)).where(_like_condition(term))
+        ).scalar()
+    statement, params = query
+    return db.session.execute(text(statement), params).scalar()
+
+
+def search_plants(term, limit=SEARCH_LIMIT):
+    """Return the matching catalogue plants as PlantRecords from the catalogue cache, best match first."""
+    plant_ids = search_plant_ids(term, limit)
+    records = get_plant_records(plant_ids)
+    return [records[plant_id] for plant_id in plant_ids if plant_id in records]
+
+
+def search_plants_like(term, limit=SEARCH_LIMIT):
+    """Unindexed search, used where no full-text index is available and as benchmark baseline."""
+    return Plant.query.filter(_like_condition(term)).limit(limit).all()
+
+
+def _like_condition(term):
+    pattern = f'%{term}%'
+    return db.or_(Plant.common_name.ilike(pattern), Plant.botanical_name.ilike(pattern))
+
+
+def rebuild_search_index():
+    """Resynchronise the full-text index with the plant table after catalogue imports.
+
+    The SQLite FTS5 table uses plant as external content and has to be rebuilt; the MySQL
+    FULLTEXT index is maintained by the database itself. Either is created if missing,
+    as in databases built with db.create_all().
+    """
+    dialect = _dialect()
+    exists = has_search_index()
+    if dialect == 'sqlite':
+        if not exists:
+            db.session.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"{', '.join(column for column, _ in SEARCH_COLUMNS)}, "
+                "content='plant', content_rowid='plant_id', tokenize='unicode61 remove_diacritics 2')"
+            ))
+        db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')"))
+    elif dialect == 'mysql' and not exists:
+        db.session.execute(text(
+            f"CREATE FULLTEXT INDEX {FULLTEXT_INDEX} ON plant "
+            f"({', '.join(column for column, _ in SEARCH_COLUMNS)})"
+        ))
+    current_app.extensions.pop('search_index', None)
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Keep the full-text index, which is created by hand in migrations, out of autogenerate."""
+    if type_ == 'table' and name.startswith(FTS_TABLE):
+        return False
+    if type_ == 'index' and name == FULLTEXT_INDEX:
+        return False
+    return True
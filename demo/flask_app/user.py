@@ -3,9 +3,11 @@ from flask import (
 )
 from werkzeug.exceptions import abort
 import bleach
+from sqlalchemy.orm.attributes import set_committed_value
 
-from flask_app.auth import login_required
+from flask_app.auth import login_required, remember_user
 from flask_app.models import db, User, UserPlant
+from flask_app.presence import presence
 
 bp = Blueprint('user', __name__, url_prefix='/user')
 
@@ -23,6 +25,12 @@ def get_user(username):
     # Adding the plant count to the user object (or you could pass this as separate context to the template)
     user.user_plant_count = user_plant_count
 
+    # Show the buffered last_time_seen if it has not been written yet, without marking the user dirty.
+    # The column is stored without time zone, like the values written by the tracker.
+    last_seen = presence.last_seen(user.user_id)
+    if last_seen is not None:
+        set_committed_value(user, 'last_time_seen', last_seen.replace(tzinfo=None))
+
     return user
 
 
@@ -53,7 +61,10 @@ def edit_profile(username):
             # Update user information using SQLAlchemy ORM
             user.username = new_username
             user.user_description = user_description
+            # Invalidate the user snapshots kept in session cookies
+            user.user_version += 1
             db.session.commit()  # Commit the changes to the database
+            remember_user(user)
             flash('Your changes have been saved.')
             return redirect(url_for('user.user', username=user.username))
 
@@ -0,0 +1,296 @@
+# flask_app/watering.py
+import json
+import time
+from datetime import datetime
+from types import SimpleNamespace
+import pandas as pd
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from flask_app.catalogue import get_meta, set_meta
+from flask_app.http_cache import bump_plants_version
+from flask_app.models import db, Plant, UserPlant, WateringEvent, WateringRollup
+from flask_app.notifications import sync_notifications
+from flask_app.schedule import next_watering_at
+
+# app_meta key of the last watering event summed into the rollups
+ROLLUP_EVENT_ID_KEY = 'watering_rollup_event_id'
+# app_meta key of the event ids below that watermark which were missing when it was set, as
+# JSON {event_id: epoch seconds when first missed}
+ROLLUP_GAPS_KEY = 'watering_rollup_gaps'
+# How long a missing event id is looked for again. By then the transaction that inserted it
+# has committed, or it was rolled back and the id is never used
+ROLLUP_GAP_SECONDS = 10 * 60
+# At most that many missing ids are kept, the highest ones; a rolled back bulk insert can leave many
+ROLLUP_MAX_GAPS = 1000
+# Rollup periods, as pandas period frequencies; weeks start on Monday
+PERIODS = {'week': 'W-SUN', 'month': 'M'}
+GROUPS = ('user_id', 'plant_type')
+
+
+def record_waterings(events):
+    """Append watering events, given as dicts with the WateringEvent columns; the caller commits."""
+    if events:
+        db.session.execute(db.insert(WateringEvent), events)
+
+
+def _correct_amount(event, amount_l):
+    """Set the amount of a logged watering event, and of the rollups it was summed into."""
+    delta = (amount_l or 0.0) - (event.amount_l or 0.0)
+    event.amount_l = amount_l
+    last_event_id, gaps = _rollup_position()
+    if not delta or event.event_id > last_event_id or event.event_id in gaps:
+        return
+    plant = db.session.get(Plant, event.plant_id)
+    summary = _summarize(_events_frame([
+        (event.event_id, event.watered_at, delta, event.user_id, getattr(plant, 'plant_type', None) or '')
+    ]))
+    values = summary.assign(events=0).astype({'events': int, 'amount_l': float, 'user_id': int}).to_dict('records')
+    add_to_counters(WateringRollup, values, ('events', 'amount_l'))
+
+
+def record_watering(user_plant):
+    """Append a watering event for a new UserPlant or one whose last watering was changed.
+
+    If only the watered amount was changed, the event of that watering is corrected instead,
+    so one watering is never counted twice. Must be called before the changes are flushed;
+    the caller commits.
+    """
+    state = db.inspect(user_plant)
+    watered_again = not state.persistent or state.attrs.last_watered.history.has_changes()
+    if user_plant.last_watered is None:
+        return
+    if not watered_again:
+        if not state.attrs.watered_amount.history.has_changes():
+            return
+        event = db.session.execute(
+            db.select(WateringEvent)
+            .where(WateringEvent.user_plant_id == user_plant.user_plant_id,
+                   WateringEvent.watered_at == user_plant.last_watered)
+            .order_by(WateringEvent.event_id.desc()).limit(1)
+        ).scalar_one_or_none()
+        if event is not None:
+            _correct_amount(event, user_plant.watered_amount)
+            return
+    if user_plant.user_plant_id is None:
+        db.session.flush()
+    record_waterings([{
+        'user_plant_id': user_plant.user_plant_id,
+        'user_id': user_plant.user_id,
+        'plant_id': user_plant.plant_id,
+        'watered_at': user_plant.last_watered,
+        'amount_l': user_plant.watered_amount
+    }])
+
+
+def water_plants(user_id, user_plant_ids, watered_amount=None, watered_at=None):
+    """Record that user_id watered the given plants at watered_at (default now).
+
+    Sets last_watered, watered_amount (if given, else the previous amount is kept) and the
+    resulting next_watering_at of all the plants in a single UPDATE. Its WHERE clause also
+    does the ownership check, so plants of other users are left alone. The daily consumption
+    does not change with a watering, so the new dates follow from the stored one. Returns
+    {user_plant_id: next_watering_at} for the watered plants. The caller commits.
+    """
+    watered_at = watered_at or datetime.now()
+    owned = db.and_(UserPlant.user_id == user_id, UserPlant.user_plant_id.in_(set(user_plant_ids)))
+    rows = db.session.execute(
+        db.select(UserPlant.user_plant_id, UserPlant.plant_id, UserPlant.watered_amount, UserPlant.daily_consumption_l)
+        .where(owned)
+    ).all()
+    if not rows:
+        return {}
+
+    schedule = {
+        row.user_plant_id: next_watering_at(
+            watered_at, watered_amount if watered_amount is not None else row.watered_amount, row.daily_consumption_l
+        )
+        for row in rows
+    }
+    values = {
+        'last_watered': watered_at,
+        'next_watering_at': db.case(
+            {user_plant_id: db.null() if next_at is None else db.literal(next_at, db.DateTime)
+             for user_plant_id, next_at in schedule.items()},
+            value=UserPlant.user_plant_id,
+            else_=UserPlant.next_watering_at
+        ),
+        'row_version': UserPlant.row_version + 1
+    }
+    if watered_amount is not None:
+        values['watered_amount'] = watered_amount
+    db.session.execute(
+        db.update(UserPlant)
+        .where(UserPlant.user_id == user_id, UserPlant.user_plant_id.in_(list(schedule)))
+        .values(**values),
+        execution_options={'synchronize_session': False}
+    )
+
+    record_waterings([
+        {
+            'user_plant_id': row.user_plant_id,
+            'user_id': user_id,
+            'plant_id': row.plant_id,
+            'watered_at': watered_at,
+            'amount_l': watered_amount if watered_amount is not None else row.watered_amount
+        }
+        for row in rows
+    ])
+    sync_notifications([
+        SimpleNamespace(user_plant_id=row.user_plant_id, user_id=user_id, plant_id=row.plant_id,
+                        next_watering_at=schedule[row.user_plant_id])
+        for row in rows
+    ])
+    bump_plants_version(user_id)
+    return schedule
+
+
+def _summarize(events_df):
+    """Sum a DataFrame of watering events (watered_at, amount_l, user_id, plant_type) per period."""
+    frames = []
+    for period, frequency in PERIODS.items():
+        summary = events_df.assign(
+            period=period,
+            period_start=events_df['watered_at'].dt.to_period(frequency).dt.start_time.dt.date
+        ).groupby(['period', 'period_start', *GROUPS], as_index=False).agg(
+            events=('amount_l', 'size'),
+            amount_l=('amount_l', 'sum')
+        )
+        frames.append(summary)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _rollup_position():
+    """Return the rollup watermark and the {event_id: first missed} of the ids missing below it."""
+    gaps = json.loads(get_meta(ROLLUP_GAPS_KEY, '{}'))
+    return int(get_meta(ROLLUP_EVENT_ID_KEY, 0)), {int(event_id): seen for event_id, seen in gaps.items()}
+
+
+def _events_query(after_event_id, gaps=()):
+    return db.select(
+        WateringEvent.event_id,
+        WateringEvent.watered_at,
+        WateringEvent.amount_l,
+        WateringEvent.user_id,
+        db.func.coalesce(Plant.plant_type, '').label('plant_type')
+    ).outerjoin(Plant, Plant.plant_id == WateringEvent.plant_id) \
+        .where(db.or_(WateringEvent.event_id > after_event_id, WateringEvent.event_id.in_(list(gaps)))) \
+        .order_by(WateringEvent.event_id)
+
+
+def _events_frame(rows):
+    events_df = pd.DataFrame(rows, columns=['event_id', 'watered_at', 'amount_l', 'user_id', 'plant_type'])
+    events_df['watered_at'] = pd.to_datetime(events_df['watered_at'])
+    events_df['amount_l'] = events_df['amount_l'].astype(float).fillna(0.0)
+    return events_df
+
+
+def add_to_counters(model, rows, counters):
+    """Insert rows (dicts) into the table of model, adding the counters columns of rows whose
+    primary key already exists to the stored values instead; the caller commits."""
+    if not rows:
+        return
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        statement = sqlite_insert(table)
+        db.session.execute(statement.on_conflict_do_update(
+            index_elements=[column.name for column in table.primary_key],
+            set_={name: table.c[name] + statement.excluded[name] for name in counters}
+        ), rows)
+    elif dialect == 'mysql':
+        statement = mysql_insert(table)
+        db.session.execute(statement.on_duplicate_key_update(
+            {name: table.c[name] + statement.inserted[name] for name in counters}
+        ), rows)
+    else:
+        for row in rows:
+            stored = db.session.get(model, tuple(row[column.name] for column in table.primary_key))
+            if stored is None:
+                db.session.add(model(**row))
+            else:
+                for name in counters:
+                    setattr(stored, name, getattr(stored, name) + row[name])
+
+
+def refresh_watering_rollups(batch_size=50000):
+    """Add the watering events logged since the last refresh to the weekly and monthly rollups.
+
+    Events are append-only, so a watermark on event_id finds the new ones. Ids are handed out
+    when an event is inserted but only show up when its transaction commits, so on MySQL a
+    later event can be rolled up before an earlier one is visible. The ids a batch skips are
+    kept and looked for again by every refresh, for ROLLUP_GAP_SECONDS. Each batch is summed
+    with pandas and added to the rollup rows in the same transaction as the watermark.
+    Returns the number of events rolled up.
+    """
+    last_event_id, gaps = _rollup_position()
+    now = int(time.time())
+    live_gaps = {event_id: seen for event_id, seen in gaps.items() if now - seen < ROLLUP_GAP_SECONDS}
+    changed = len(live_gaps) != len(gaps)
+    gaps = live_gaps
+    refreshed = 0
+    while True:
+        rows = db.session.execute(_events_query(last_event_id, gaps).limit(batch_size)).all()
+        if rows:
+            found = {row.event_id for row in rows}
+            newest = max(found)
+            if newest > last_event_id:
+                missing = set(range(max(last_event_id + 1, newest - ROLLUP_MAX_GAPS), newest)) - found
+                gaps.update(dict.fromkeys(missing, now))
+                last_event_id = newest
+            for event_id in found:
+                gaps.pop(event_id, None)
+            gaps = dict(sorted(gaps.items())[-ROLLUP_MAX_GAPS:])
+            summary = _summarize(_events_frame(rows))
+            values = summary.astype({'events': int, 'amount_l': float, 'user_id': int}).to_dict('records')
+            add_to_counters(WateringRollup, values, ('events', 'amount_l'))
+        elif not changed:
+            return refreshed
+        set_meta(ROLLUP_EVENT_ID_KEY, str(last_event_id))
+        set_meta(ROLLUP_GAPS_KEY, json.dumps(gaps))
+        db.session.commit()
+        refreshed += len(rows)
+        changed = False
+
+
+def water_use(period, group_by=('user_id',), user_id=None, start=None, end=None):
+    """Return the water used per period ('week' or 'month') and group_by columns (user_id, plant_type).
+
+    Reads the rollups with one GROUP BY query and adds the events logged since their last
+    refresh, so the result is always up to date. Returns a DataFrame with the columns
+    period_start, *group_by, events and amount_l.
+    """
+    if period not in PERIODS:
+        raise ValueError(f'period must be one of {", ".join(PERIODS)}')
+    group_by = tuple(group_by)
+    if set(group_by) - set(GROUPS):
+        raise ValueError(f'group_by must be a subset of {", ".join(GROUPS)}')
+
+    keys = [WateringRollup.period_start, *[getattr(WateringRollup, name) for name in group_by]]
+    query = db.select(
+        *keys, db.func.sum(WateringRollup.events), db.func.sum(WateringRollup.amount_l)
+    ).where(WateringRollup.period == period).group_by(*keys)
+    if user_id is not None:
+        query = query.where(WateringRollup.user_id == user_id)
+    if start is not None:
+        query = query.where(WateringRollup.period_start >= start)
+    if end is not None:
+        query = query.where(WateringRollup.period_start < end)
+    columns = ['period_start', *group_by, 'events', 'amount_l']
+    usage = pd.DataFrame(db.session.execute(query).all(), columns=columns)
+
+    pending_query = _events_query(*_rollup_position())
+    if user_id is not None:
+        pending_query = pending_query.where(WateringEvent.user_id == user_id)
+    pending = db.session.execute(pending_query).all()
+    if pending:
+        summary = _summarize(_events_frame(pending))
+        summary = summary[summary['period'] == period]
+        if start is not None:
+            summary = summary[summary['period_start'] >= start]
+        if end is not None:
+            summary = summary[summary['period_start'] < end]
+        usage = pd.concat([usage, summary[columns]], ignore_index=True) \
+            .groupby(['period_start', *group_by], as_index=False)[['events', 'amount_l']].sum()
+
+    return usage.sort_values(['period_start', *group_by], ignore_index=True)
@@ -0,0 +1,96 @@
+"""Add persisted watering schedule to UserPlant
+
+Revision ID: 3f9a1c2b7d4e
+Revises: 8ac345f3e176
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import math
+from datetime import timedelta
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c2b7d4e'
+down_revision = '8ac345f3e176'
+branch_labels = None
+depends_on = None
+
+
+def _schedule(row):
+    # The watering schedule formula of schedule.py as of this revision, so that later
+    # changes to it do not change what this backfill writes
+    pot_diameter, min_water, max_water = (
+        math.nan if value is None else float(value)
+        for value in (row.pot_diameter, row.min_water_consumption, row.max_water_consumption)
+    )
+    if row.sun_exposure == 'low':
+        daily_consumption_mm = min_water / 365
+    elif row.sun_exposure == 'medium':
+        daily_consumption_mm = (min_water + max_water) / 2 / 365
+    else:
+        daily_consumption_mm = max_water / 365
+    daily = daily_consumption_mm * math.pi * (pot_diameter / 100 / 2) ** 2
+    if not math.isfinite(daily):
+        return None, None
+    if row.last_watered is None or row.watered_amount is None or not daily:
+        return daily, None
+    days_to_next_watering = row.watered_amount / daily
+    if not math.isfinite(days_to_next_watering):
+        return daily, None
+    try:
+        return daily, row.last_watered + timedelta(microseconds=round(days_to_next_watering * 86_400_000_000))
+    except OverflowError:
+        return daily, None
+
+
+def upgrade():
+    with op.batch_alter_table('userplant', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('daily_consumption_l', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('next_watering_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_userplant_user_id_next_watering_at', ['user_id', 'next_watering_at'], unique=False)
+
+    # Backfill the schedule of existing rows
+    userplant = sa.table(
+        'userplant',
+        sa.column('user_plant_id', sa.Integer()),
+        sa.column('plant_id', sa.Integer()),
+        sa.column('sun_exposure', sa.Text()),
+        sa.column('pot_diameter', sa.Float()),
+        sa.column('watered_amount', sa.Float()),
+        sa.column('last_watered', sa.DateTime()),
+        sa.column('daily_consumption_l', sa.Float()),
+        sa.column('next_watering_at', sa.DateTime())
+    )
+    plant = sa.table(
+        'plant',
+        sa.column('plant_id', sa.Integer()),
+        sa.column('min_water_consumption', sa.Integer()),
+        sa.column('max_water_consumption', sa.Integer())
+    )
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(
+            userplant.c.user_plant_id, userplant.c.sun_exposure, userplant.c.pot_diameter,
+            userplant.c.watered_amount, userplant.c.last_watered,
+            plant.c.min_water_consumption, plant.c.max_water_consumption
+        ).select_from(userplant.join(plant, plant.c.plant_id == userplant.c.plant_id))
+    ).all()
+    if rows:
+        bind.execute(
+            userplant.update()
+            .where(userplant.c.user_plant_id == sa.bindparam('b_user_plant_id'))
+            .values(daily_consumption_l=sa.bindparam('b_daily'), next_watering_at=sa.bindparam('b_next_at')),
+            [
+                dict(zip(('b_daily', 'b_next_at'), _schedule(row)), b_user_plant_id=row.user_plant_id)
+                for row in rows
+            ]
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('userplant', schema=None) as batch_op:
+        batch_op.drop_index('ix_userplant_user_id_next_watering_at')
+        batch_op.drop_column('next_watering_at')
+        batch_op.drop_column('daily_consumption_l')
@@ -0,0 +1,41 @@
+"""Add full-text search index over the plant catalogue
+
+Revision ID: 5b2e8d41c0a7
+Revises: 3f9a1c2b7d4e
+Create Date: 2026-10-18 10:03:17.552091
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b2e8d41c0a7'
+down_revision = '3f9a1c2b7d4e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # External-content FTS5 table over plant, rebuilt by the catalogue import commands
+        op.execute(
+            "CREATE VIRTUAL TABLE plant_fts USING fts5("
+            "common_name, botanical_name, plant_type, "
+            "content='plant', content_rowid='plant_id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute("INSERT INTO plant_fts(plant_fts) VALUES('rebuild')")
+    elif dialect == 'mysql':
+        op.create_index(
+            'ix_plant_fulltext', 'plant', ['common_name', 'botanical_name', 'plant_type'],
+            unique=False, mysql_prefix='FULLTEXT'
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TABLE plant_fts")
+    elif dialect == 'mysql':
+        op.drop_index('ix_plant_fulltext', table_name='plant')
@@ -0,0 +1,65 @@
+# tests/conftest.py
+import pytest
+
+from flask_app import commands, create_app
+from flask_app.catalogue import CSV_FILE_PATH, read_catalogue
+from flask_app.models import db, Plant
+from flask_app.presence import presence
+
+# Catalogue plants created by the plants fixture, as (common_name, plant_type, min/max water consumption)
+CATALOGUE = (
+    ('Rose', 'Shrub', 400, 800),
+    ('Lavender', 'Shrub', 200, 400),
+    ('Basil', 'Herb', 500, 700),
+    ('Fern', 'Groundcover', 600, 900)
+)
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///' + str(tmp_path / 'app.sqlite'))
+    # The upload folder is static/images, image paths are relative to its parent
+    (tmp_path / 'static' / 'images').mkdir(parents=True)
+    app = create_app({
+        'TESTING': True,
+        'UPLOAD_FOLDER': str(tmp_path / 'static' / 'images'),
+        'CATALOGUE_IMAGE_FOLDER': str(tmp_path / 'catalogue_images'),
+        'RECOMMENDATION_FOLDER': str(tmp_path / 'recommendations'),
+        'PRESENCE_BACKGROUND_FLUSH': False,
+        'IMAGE_BACKGROUND_PROCESSING': False
+    })
+    with app.app_context():
+        db.create_all()
+    yield app
+    # The presence tracker is shared by all apps; write what this one buffered to its own database
+    presence.flush(force=True)
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def plants(app):
+    """Add a small catalogue and return the plant ids."""
+    with app.app_context():
+        rows = [
+            Plant(
+                plant_id=plant_id, common_name=name, botanical_name=f'{name} officinalis', plant_type=plant_type,
+                min_water_consumption=min_water, max_water_consumption=max_water, light_needs='Full sun'
+            )
+            for plant_id, (name, plant_type, min_water, max_water) in enumerate(CATALOGUE, start=1)
+        ]
+        db.session.add_all(rows)
+        db.session.commit()
+        return [plant.plant_id for plant in rows]
+
+
+@pytest.fixture
+def catalogue_csv(tmp_path, monkeypatch):
+    """Point the catalogue commands at a copy of the first 12 rows of the bundled CSV; returns its path."""
+    with open(CSV_FILE_PATH, encoding='utf-8') as f:
+        lines = [f.readline() for _ in range(13)]
+    path = tmp_path / 'catalogue.csv'
+    path.write_text(''.join(lines), encoding='utf-8')
+    monkeypatch.setattr(commands, 'read_catalogue', lambda: read_catalogue(str(path)))
+    return path
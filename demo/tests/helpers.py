@@ -0,0 +1,25 @@
+# tests/helpers.py
+
+
+def register(client, username, password='secret'):
+    """Register username and log the client in."""
+    client.post('/auth/register', data={
+        'username': username, 'password': password, 'password2': password, 'email': f'{username}@example.com'
+    })
+    client.post('/auth/login', data={'username': username, 'password': password})
+
+
+def save_plant(client, plant_id, **fields):
+    """Register a catalogue plant for the logged-in user through the save view."""
+    data = {
+        'selected_plant_id': plant_id,
+        'size': '10',
+        'sun_exposure': 'medium',
+        'last_watered': '2026-10-01',
+        'pot_diameter': '20',
+        'watered_amount': '0.5',
+        'plant_position': 'window',
+        'plant_nickname': 'nickname',
+        **fields
+    }
+    return client.post('/save', data=data)
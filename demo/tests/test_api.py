@@ -0,0 +1,118 @@
+# tests/test_api.py
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from flask_app.models import db, UserPlant
+from tests.helpers import register
+
+PLANT = {'sun_exposure': 'medium', 'last_watered': '2026-10-01', 'pot_diameter': 20, 'watered_amount': 0.5}
+
+
+@pytest.fixture
+def api(app, plants):
+    """Test client of alice with a bearer token; api.headers holds the Authorization header."""
+    client = app.test_client()
+    register(client, 'alice')
+    response = client.post('/api/v1/tokens', json={'username': 'alice', 'password': 'secret'})
+    client.headers = {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+    return client
+
+
+def _create(api, plant_id=1, **fields):
+    response = api.post('/api/v1/plants', json={'plant_id': plant_id, **PLANT, **fields}, headers=api.headers)
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['user_plant_id']
+
+
+def test_tokens(app, api):
+    assert api.post('/api/v1/tokens', json={'username': 'alice', 'password': 'wrong'}).status_code == 401
+    assert api.get('/api/v1/plants').status_code == 401
+    assert api.get('/api/v1/plants', headers={'Authorization': 'Bearer nonsense'}).status_code == 422
+    assert api.get('/api/v1/plants', headers=api.headers).get_json() == {'data': [], 'next_cursor': None}
+
+
+def test_cursor_pagination(api):
+    created = [_create(api, plant_id) for plant_id in (1, 2, 3, 4, 1)]
+    seen, cursor = [], None
+    while True:
+        query = f'?limit=2&fields=user_plant_id' + (f'&cursor={cursor}' if cursor else '')
+        page = api.get(f'/api/v1/plants{query}', headers=api.headers).get_json()
+        assert len(page['data']) <= 2
+        seen.extend(item['user_plant_id'] for item in page['data'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == created
+    assert api.get('/api/v1/plants?cursor=***', headers=api.headers).status_code == 400
+
+
+def test_fields_and_ownership(app, api):
+    user_plant_id = _create(api)
+    item = api.get(f'/api/v1/plants/{user_plant_id}?fields=common_name,needs_watering', headers=api.headers).get_json()
+    assert item == {'common_name': 'Rose', 'needs_watering': True}
+    response = api.get('/api/v1/plants?fields=common_name,secret', headers=api.headers)
+    assert response.status_code == 400
+    assert 'secret' in response.get_json()['error']
+
+    other = app.test_client()
+    register(other, 'bob')
+    token = other.post('/api/v1/tokens', json={'username': 'bob', 'password': 'secret'}).get_json()['access_token']
+    assert other.get(f'/api/v1/plants/{user_plant_id}', headers={'Authorization': f'Bearer {token}'}).status_code == 404
+
+
+def test_patch(api):
+    user_plant_id = _create(api)
+    response = api.patch(f'/api/v1/plants/{user_plant_id}', json={'plant_position': 'kitchen', 'size': '12.5'},
+                         headers=api.headers)
+    assert response.status_code == 200
+    item = response.get_json()
+    assert (item['plant_position'], item['size'], item['row_version']) == ('kitchen', 12.5, 2)
+
+    for body in ({'plant_id': 2}, {'sun_exposure': 'dark'}, {'size': 'big'}, {'last_watered': 'yesterday'}):
+        assert api.patch(f'/api/v1/plants/{user_plant_id}', json=body, headers=api.headers).status_code == 400
+
+
+@pytest.mark.parametrize('path, body, field', [
+    ('/water', {'watered_at': '2026-10-10T08:00:00+02:00'}, 'watered_at'),
+    ('', {'last_watered': '2026-10-10T08:00:00+02:00'}, 'last_watered')
+])
+def test_datetimes_with_an_offset_are_stored_as_local_time(app, api, path, body, field):
+    user_plant_id = _create(api)
+    method = api.post if path else api.patch
+    response = method(f'/api/v1/plants/{user_plant_id}{path}', json=body, headers=api.headers)
+    assert response.status_code == 200, response.get_json()
+
+    expected = datetime(2026, 10, 10, 6, tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+    assert response.get_json()['last_watered'] == expected.isoformat()
+    with app.app_context():
+        assert db.session.get(UserPlant, user_plant_id).last_watered == expected
+
+
+def test_water_and_stats(api):
+    user_plant_id = _create(api, last_watered='2026-09-28', watered_amount=0.5)
+    response = api.post(f'/api/v1/plants/{user_plant_id}/water',
+                        json={'watered_amount': 1.5, 'watered_at': '2026-10-07T09:00:00'}, headers=api.headers)
+    assert response.get_json()['last_watered'] == '2026-10-07T09:00:00'
+    assert api.post('/api/v1/plants/999/water', json={}, headers=api.headers).status_code == 404
+
+    stats = api.get('/api/v1/stats/water-use?period=week', headers=api.headers).get_json()['data']
+    assert [(row['period_start'], row['events'], row['amount_l']) for row in stats] == \
+        [('2026-09-28', 1, 0.5), ('2026-10-05', 1, 1.5)]
+    stats = api.get('/api/v1/stats/water-use?period=month&by=plant_type&start=2026-10-01',
+                    headers=api.headers).get_json()['data']
+    assert stats == [{'period_start': '2026-10-01', 'plant_type': 'Shrub', 'events': 1, 'amount_l': 1.5}]
+    assert api.get('/api/v1/stats/water-use?period=day', headers=api.headers).status_code == 400
+
+
+def test_export_streams_ndjson(app, api, monkeypatch):
+    from flask_app import api as api_module
+    monkeypatch.setattr(api_module, 'EXPORT_BATCH_SIZE', 2)
+    created = [_create(api, plant_id) for plant_id in (1, 2, 3, 4, 2)]
+
+    response = api.get('/api/v1/plants/export?fields=user_plant_id,common_name', headers=api.headers)
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['user_plant_id'] for line in lines] == created
+    assert lines[1] == {'user_plant_id': created[1], 'common_name': 'Lavender'}
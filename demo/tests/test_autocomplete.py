@@ -0,0 +1,13 @@
+# tests/test_autocomplete.py
+import pytest
+
+from tests.helpers import register
+
+
+@pytest.mark.parametrize('limit, expected', [(-5, 1), (0, 1), (2, 2), (500, 4)])
+def test_limit_is_clamped(app, plants, limit, expected):
+    client = app.test_client()
+    register(client, 'alice')
+    response = client.get(f'/autocomplete?q=officinalis&limit={limit}')
+    assert response.status_code == 200
+    assert len(response.get_json()['suggestions']) == expected
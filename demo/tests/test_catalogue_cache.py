@@ -0,0 +1,50 @@
+# tests/test_catalogue_cache.py
+from types import SimpleNamespace
+
+import pytest
+
+from flask_app import catalogue
+from flask_app.catalogue import bump_catalogue_version, get_catalogue_cache, get_plant_record, get_plant_records
+from flask_app.models import db, Plant
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Stand-in for the monotonic clock catalogue.py reads; set clock.now to move it."""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(catalogue, 'time', SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def _rename(plant_id, name):
+    # As the CLI commands do from another process
+    db.session.execute(db.update(Plant).where(Plant.plant_id == plant_id).values(common_name=name))
+    db.session.commit()
+
+
+def test_cache_is_emptied_when_the_version_changes(app, plants, clock):
+    with app.app_context():
+        assert get_plant_record(1).common_name == 'Rose'
+        _rename(1, 'Dog rose')
+        # Served from the cache until the catalogue version says otherwise
+        assert get_plant_record(1).common_name == 'Rose'
+
+        bump_catalogue_version()
+        db.session.commit()
+        # The version is only re-read every CATALOGUE_VERSION_CHECK_SECONDS
+        assert get_plant_record(1).common_name == 'Rose'
+        clock.now += app.config['CATALOGUE_VERSION_CHECK_SECONDS']
+        assert get_plant_record(1).common_name == 'Dog rose'
+        assert len(get_catalogue_cache()) == 1
+
+
+def test_cache_is_bounded_and_read_only(app, plants, clock):
+    app.config['CATALOGUE_CACHE_SIZE'] = 2
+    with app.app_context():
+        records = get_plant_records(plants)
+        assert sorted(records) == plants
+        cache = get_catalogue_cache()
+        assert len(cache) == 2
+        assert get_plant_records([404]) == {}
+        with pytest.raises(AttributeError):
+            records[1].common_name = 'Rose'
@@ -0,0 +1,69 @@
+# tests/test_catalogue_images.py
+import functools
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import imageio.v3 as iio
+import numpy as np
+import pytest
+
+from flask_app.catalogue import upsert_plants
+from flask_app.catalogue_images import cache_catalogue_images, catalogue_image_url
+from flask_app.models import db, CachedImage, Plant
+from tests.helpers import register, save_plant
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def image_server(tmp_path):
+    """Local stand-in for the catalogue's image host, serving one PNG; yields its base URL."""
+    root = tmp_path / 'remote'
+    root.mkdir()
+    pixels = np.zeros((600, 900, 3), dtype=np.uint8)
+    pixels[..., 0] = 200
+    iio.imwrite(root / 'rose.png', pixels)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(_QuietHandler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_cached_image_survives_catalogue_writes(app, plants, image_server):
+    url = f'{image_server}/rose.png'
+    missing = f'{image_server}/missing.png'
+    with app.app_context():
+        db.session.get(Plant, 1).image_location = url
+        db.session.get(Plant, 2).image_location = missing
+        db.session.commit()
+
+        fetched, served, failed = cache_catalogue_images(workers=2, timeout=5)
+        assert (fetched, served, list(failed)) == (1, 1, [missing])
+        cached = db.session.execute(db.select(CachedImage)).scalar_one()
+        assert cached.source_url == url
+        # The plant keeps its source URL
+        assert db.session.get(Plant, 1).image_location == url
+
+        # A catalogue import writes the CSV URL back; the cached copy is still used
+        record = {column.key: getattr(db.session.get(Plant, 1), column.key) for column in Plant.__table__.columns}
+        upsert_plants([record])
+        db.session.commit()
+        with app.test_request_context():
+            local = catalogue_image_url(url)
+            assert local == f'/catalogue-images/{cached.image_path}'
+            assert catalogue_image_url(missing) == missing
+
+        # Nothing new to fetch
+        assert cache_catalogue_images(workers=2, timeout=5)[:2] == (0, 1)
+
+    client = app.test_client()
+    register(client, 'alice')
+    save_plant(client, 1)
+    assert f'src="{local}"'.encode() in client.get('/').data
+    response = client.get(local)
+    assert response.status_code == 200
+    assert response.mimetype == 'image/webp'
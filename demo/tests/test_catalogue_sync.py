@@ -0,0 +1,39 @@
+# tests/test_catalogue_sync.py
+from datetime import datetime, timedelta
+
+from flask_app.catalogue import CSV_FILE_PATH, sync_catalogue
+from flask_app.models import db, PlantSyncState, User, UserPlant
+
+
+def _write_catalogue(path, rows):
+    path.write_text(''.join(rows), encoding='utf-8')
+    return str(path)
+
+
+def test_flagged_plant_that_comes_back_is_unflagged(app, tmp_path):
+    with open(CSV_FILE_PATH, encoding='utf-8') as f:
+        header, first, second = f.readline(), f.readline(), f.readline()
+    csv_path = tmp_path / 'catalogue.csv'
+
+    with app.app_context():
+        result = sync_catalogue(_write_catalogue(csv_path, [header, first, second]))
+        kept_id = result['inserted'][1]
+        user = User(username='alice', email='a@example.com', avatar='', password='')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(UserPlant(user_id=user.user_id, plant_id=kept_id))
+        db.session.commit()
+
+        # Kept but flagged while the row is missing, because a user owns the plant
+        result = sync_catalogue(_write_catalogue(csv_path, [header, first]), delete_missing=True)
+        assert result['flagged'] == [kept_id]
+        removed_at = db.session.get(PlantSyncState, kept_id).removed_at
+        # Naive local time, like the other DateTime columns
+        assert removed_at.tzinfo is None
+        assert abs(datetime.now() - removed_at) < timedelta(minutes=1)
+
+        # Back with the same content
+        result = sync_catalogue(_write_catalogue(csv_path, [header, first, second]))
+        assert kept_id in result['unchanged']
+        db.session.expire_all()
+        assert db.session.get(PlantSyncState, kept_id).removed_at is None
@@ -0,0 +1,64 @@
+# tests/test_consumption.py
+import math
+import numpy as np
+
+from flask_app.consumption import fit_consumption_factors, solve_factors
+from flask_app.models import db, ConsumptionFactor, ConsumptionFitStat
+
+
+def _least_squares(user_index, plant_type_index, intervals, sum_log_ratio, prior_weight):
+    # The same fit as one weighted least-squares problem: every cell's mean log ratio weighted
+    # by its number of intervals, plus prior_weight pseudo-observations of 0 per effect
+    users, plant_types = user_index.max() + 1, plant_type_index.max() + 1
+    design = np.zeros((len(intervals), users + plant_types))
+    design[np.arange(len(intervals)), user_index] = 1
+    design[np.arange(len(intervals)), users + plant_type_index] = 1
+    weights = np.sqrt(intervals)
+    design = np.vstack([design * weights[:, None], np.sqrt(prior_weight) * np.eye(users + plant_types)])
+    target = np.concatenate([sum_log_ratio / intervals * weights, np.zeros(users + plant_types)])
+    effects = np.linalg.lstsq(design, target, rcond=None)[0]
+    return effects[:users], effects[users:]
+
+
+def test_solve_factors_matches_least_squares():
+    user_index = np.array([0, 0, 1, 2, 2, 3])
+    plant_type_index = np.array([0, 1, 0, 1, 2, 2])
+    intervals = np.array([12.0, 3.0, 40.0, 1.0, 8.0, 25.0])
+    sum_log_ratio = intervals * np.array([0.3, -0.1, 0.5, 1.2, -0.4, 0.05])
+
+    for prior_weight in (0.5, 5, 50):
+        solved = solve_factors(user_index, plant_type_index, intervals, sum_log_ratio, prior_weight)
+        expected = _least_squares(user_index, plant_type_index, intervals, sum_log_ratio, prior_weight)
+        np.testing.assert_allclose(solved[0], expected[0], atol=1e-6)
+        np.testing.assert_allclose(solved[1], expected[1], atol=1e-6)
+
+
+def test_prior_shrinks_effects_with_little_data():
+    # One cell: the log ratio is split evenly and shrunk by the prior, n L / (2 n + prior_weight)
+    for intervals, effect in ((1, 0.5 / 7), (100, 50 / 205)):
+        user_effects, plant_type_effects = solve_factors(
+            np.array([0]), np.array([0]), np.array([float(intervals)]), np.array([0.5 * intervals]), 5
+        )
+        assert math.isclose(user_effects[0], effect, rel_tol=1e-6)
+        assert math.isclose(plant_type_effects[0], effect, rel_tol=1e-6)
+
+
+def test_factors_are_clipped(app):
+    app.config['CONSUMPTION_FIT_PRIOR_WEIGHT'] = 1
+    with app.app_context():
+        db.session.add_all([
+            ConsumptionFitStat(user_id=1, plant_type='Shrub', intervals=500, sum_log_ratio=500 * math.log(100)),
+            ConsumptionFitStat(user_id=2, plant_type='Herb', intervals=500, sum_log_ratio=500 * math.log(0.01)),
+            ConsumptionFitStat(user_id=3, plant_type='Fern', intervals=500, sum_log_ratio=500 * math.log(1.21))
+        ])
+        assert fit_consumption_factors() == 6
+        factors = dict(db.session.execute(
+            db.select(ConsumptionFactor.scope_key, ConsumptionFactor.factor).where(ConsumptionFactor.scope == 'user')
+        ).all())
+        assert factors['1'] == 4.0
+        assert factors['2'] == 0.25
+        assert math.isclose(factors['3'], 1.1, rel_tol=1e-2)
+        intervals = db.session.execute(
+            db.select(ConsumptionFactor.intervals).where(ConsumptionFactor.scope_key == 'Fern')
+        ).scalar_one()
+        assert intervals == 500
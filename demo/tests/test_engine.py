@@ -0,0 +1,59 @@
+# tests/test_engine.py
+import pytest
+from sqlalchemy.engine import make_url
+
+from flask_app.config import Config
+from flask_app.engine import MeasuredQueuePool, engine_options, engine_profile
+from flask_app.models import db
+
+POOL = {'poolclass': MeasuredQueuePool, 'pool_size': 5, 'max_overflow': 10, 'pool_timeout': 10}
+
+
+@pytest.fixture
+def config():
+    return {name: getattr(Config, name) for name in dir(Config) if name.isupper()}
+
+
+@pytest.mark.parametrize('uri', ['sqlite://', 'sqlite:///:memory:'])
+def test_sqlite_memory_is_left_alone(config, uri):
+    assert engine_options(config, uri) == (uri, {})
+
+
+def test_sqlite_file(config):
+    uri, options = engine_options(config, 'sqlite:////srv/app.sqlite')
+    assert uri == 'sqlite:////srv/app.sqlite'
+    assert options == {**POOL, 'connect_args': {'timeout': 5.0, 'check_same_thread': False}}
+
+
+def test_sqlite_shared_cache(config):
+    config.update(SQLITE_SHARED_CACHE=True, SQLITE_PRAGMAS={}, DB_POOL_SIZE=2)
+    uri, options = engine_options(config, 'sqlite:////srv/app.sqlite')
+    url = make_url(uri)
+    assert (url.database, dict(url.query)) == ('file:/srv/app.sqlite', {'cache': 'shared', 'uri': 'true'})
+    assert options == {**POOL, 'pool_size': 2, 'connect_args': {'timeout': 5.0, 'check_same_thread': False}}
+    # URIs already in the file: form are kept
+    url = make_url(engine_options(config, 'sqlite:///file:app.sqlite?mode=ro&uri=true')[0])
+    assert (url.database, dict(url.query)) == ('file:app.sqlite', {'mode': 'ro', 'uri': 'true'})
+
+
+def test_mysql(config):
+    config['DB_POOL_RECYCLE'] = 600
+    uri, options = engine_options(config, 'mysql+pymysql://plants:p%40ss@db/plants?charset=utf8mb4')
+    assert uri == 'mysql+pymysql://plants:p%40ss@db/plants?charset=utf8mb4'
+    assert options == {**POOL, 'pool_pre_ping': True, 'pool_recycle': 600}
+
+
+def test_other_dialects_keep_their_defaults(config):
+    uri = 'postgresql://plants:secret@db/plants'
+    assert engine_options(config, uri) == (uri, {})
+
+
+def test_app_engine_uses_the_profile(app):
+    with app.app_context():
+        assert isinstance(db.engine.pool, MeasuredQueuePool)
+        with db.engine.connect() as connection:
+            assert connection.exec_driver_sql('PRAGMA busy_timeout').scalar() == 5000
+            assert connection.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+        stats = engine_profile.pool_stats()[None]
+        assert stats['size'] == app.config['DB_POOL_SIZE']
+        assert stats['checkouts'] >= 1
@@ -0,0 +1,101 @@
+# tests/test_facets.py
+import pytest
+
+from flask_app.catalogue import FACET_COLUMNS, facet_values, refresh_plant_facets
+from flask_app.facets import facet_counts, faceted_search, filter_plants, parse_facet_filters
+from flask_app.models import db, Plant
+from werkzeug.datastructures import MultiDict
+
+# plant_type, light_needs, soil_type, edible of the test catalogue
+FACETS = (
+    ('Shrub', 'Full sun', 'Sand,Loam', 'No'),
+    ('Shrub', 'Full sun,Partial shade', 'loam', 'yes'),
+    ('Herb', 'Full sun', 'Loam', 'Yes'),
+    ('Herb', 'Partial shade', 'Clay,sand', 'Yes'),
+    ('Groundcover', 'Shade', 'Clay', 'No'),
+    ('Groundcover', 'Partial shade,Shade', 'Unknown', 'No'),
+    ('Tree', 'Full sun', 'Sand', '')
+)
+FILTERS = (
+    {},
+    {'plant_type': ['Herb']},
+    {'plant_type': ['Shrub', 'Herb']},
+    {'light_needs': ['Full sun'], 'soil_type': ['Loam']},
+    {'plant_type': ['Groundcover', 'Tree'], 'light_needs': ['Shade', 'Full sun'], 'edible': ['No']},
+    {'soil_type': ['Peat']}
+)
+
+
+@pytest.fixture
+def catalogue(app):
+    """Add the FACETS catalogue with its plant_facet rows; returns {plant_id: {facet column: [values]}}."""
+    with app.app_context():
+        for plant_id, (plant_type, light_needs, soil_type, edible) in enumerate(FACETS, start=1):
+            db.session.add(Plant(
+                plant_id=plant_id, common_name=f'Plant {plant_id}', plant_type=plant_type,
+                light_needs=light_needs, soil_type=soil_type, edible=edible,
+                min_water_consumption=100, max_water_consumption=200
+            ))
+        db.session.flush()
+        assert refresh_plant_facets() == len(FACETS)
+        db.session.commit()
+        return {
+            plant.plant_id: {column: facet_values(column, getattr(plant, column)) for column in FACET_COLUMNS}
+            for plant in db.session.execute(db.select(Plant)).scalars()
+        }
+
+
+def _matches(facets, filters, skip=None):
+    return all(set(facets[column]) & set(values) for column, values in filters.items() if column != skip)
+
+
+def _expected_counts(catalogue, filters, candidates=None):
+    counts = {column: {} for column in FACET_COLUMNS}
+    for plant_id, facets in catalogue.items():
+        if candidates is not None and plant_id not in candidates:
+            continue
+        for column in FACET_COLUMNS:
+            if _matches(facets, filters, skip=column):
+                for value in facets[column]:
+                    counts[column][value] = counts[column].get(value, 0) + 1
+    return {
+        column: sorted(values.items(), key=lambda item: (-item[1], item[0]))
+        for column, values in counts.items()
+    }
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_facet_counts_leave_out_their_own_filter(app, catalogue, filters):
+    with app.app_context():
+        assert facet_counts(filters) == _expected_counts(catalogue, filters)
+        assert facet_counts(filters, candidates=[2, 3, 5]) == _expected_counts(catalogue, filters, {2, 3, 5})
+
+
+@pytest.mark.parametrize('filters', FILTERS)
+def test_filter_plants(app, catalogue, filters):
+    expected = [plant_id for plant_id, facets in sorted(catalogue.items()) if _matches(facets, filters)]
+    with app.app_context():
+        assert filter_plants(filters) == (expected, len(expected))
+        assert filter_plants(filters, limit=2) == (expected[:2], len(expected))
+
+
+def test_facet_values_are_normalized(app, catalogue):
+    with app.app_context():
+        counts = facet_counts({})
+        assert counts['soil_type'] == [('Loam', 3), ('Sand', 3), ('Clay', 2)]
+        assert counts['edible'] == [('No', 3), ('Yes', 3)]
+
+
+def test_faceted_search(app, catalogue):
+    with app.app_context():
+        plants, total, counts, complete = faceted_search('plant', {'plant_type': ['Herb', 'Tree']})
+        assert [plant.plant_id for plant in plants] == [3, 4, 7]
+        assert (total, complete) == (3, True)
+        assert counts == _expected_counts(catalogue, {'plant_type': ['Herb', 'Tree']})
+        plants, total, _, _ = faceted_search(filters={'light_needs': ['Shade']}, limit=1)
+        assert ([plant.plant_id for plant in plants], total) == ([5], 2)
+
+
+def test_parse_facet_filters():
+    args = MultiDict([('plant_type', 'Herb'), ('plant_type', 'Tree'), ('edible', ''), ('page', '2')])
+    assert parse_facet_filters(args) == {'plant_type': ['Herb', 'Tree']}
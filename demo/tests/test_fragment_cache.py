@@ -0,0 +1,39 @@
+# tests/test_fragment_cache.py
+from flask_app.models import db, UserPlant
+from tests.helpers import register, save_plant
+
+
+def test_personal_card_is_not_shared_through_a_reused_id(app, plants):
+    alice = app.test_client()
+    register(alice, 'alice')
+    save_plant(alice, 1, plant_position='alice balcony')
+    assert b'alice balcony' in alice.get('/').data
+    with app.app_context():
+        user_plant_id = db.session.execute(db.select(UserPlant.user_plant_id)).scalar_one()
+    alice.post(f'/{user_plant_id}/delete')
+
+    bob = app.test_client()
+    register(bob, 'bob')
+    save_plant(bob, 1, plant_position='bob kitchen')
+    with app.app_context():
+        # SQLite hands out the freed id again
+        assert db.session.execute(db.select(UserPlant.user_plant_id)).scalar_one() == user_plant_id
+
+    page = bob.get('/').data
+    assert b'bob kitchen' in page
+    assert b'alice balcony' not in page
+
+
+def test_personal_card_is_not_reused_by_the_same_user(app, plants):
+    client = app.test_client()
+    register(client, 'alice')
+    save_plant(client, 1, plant_position='balcony')
+    assert b'balcony' in client.get('/').data
+    with app.app_context():
+        user_plant_id = db.session.execute(db.select(UserPlant.user_plant_id)).scalar_one()
+    client.post(f'/{user_plant_id}/delete')
+
+    save_plant(client, 1, plant_position='kitchen')
+    page = client.get('/').data
+    assert b'kitchen' in page
+    assert b'balcony' not in page
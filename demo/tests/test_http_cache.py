@@ -0,0 +1,45 @@
+# tests/test_http_cache.py
+import pytest
+
+from flask_app.http_cache import bump_plants_versions
+from flask_app.models import db, User
+from tests.helpers import register, save_plant
+
+
+@pytest.fixture
+def client(app, plants):
+    client = app.test_client()
+    register(client, 'alice')
+    save_plant(client, 1)
+    return client
+
+
+def _revalidate(client, etag):
+    return client.get('/', headers={'If-None-Match': etag})
+
+
+def test_unchanged_page_is_not_rendered_again(client):
+    etag = client.get('/').headers['ETag']
+    assert _revalidate(client, etag).status_code == 304
+
+    save_plant(client, 2)
+    response = _revalidate(client, etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_change_from_another_session_is_seen_right_away(app, client):
+    etag = client.get('/').headers['ETag']
+    other = app.test_client()
+    other.post('/auth/login', data={'username': 'alice', 'password': 'secret'})
+    save_plant(other, 3)
+    assert _revalidate(client, etag).status_code == 200
+
+
+def test_change_from_a_cli_job_is_seen_right_away(app, client):
+    etag = client.get('/').headers['ETag']
+    with app.app_context():
+        # As refresh_schedules does after fit-consumption-model
+        bump_plants_versions([db.session.execute(db.select(User.user_id)).scalar_one()])
+        db.session.commit()
+    assert _revalidate(client, etag).status_code == 200
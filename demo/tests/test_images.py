@@ -0,0 +1,59 @@
+# tests/test_images.py
+import glob
+import io
+import os
+import stat
+import imageio.v3 as iio
+import numpy as np
+
+from flask_app.images import images
+from flask_app.models import db, UserPlant
+from tests.helpers import register, save_plant
+
+
+def _photo(width, height, extension='jpg'):
+    pixels = np.zeros((height, width, 3), dtype=np.uint8)
+    pixels[:, :, 1] = 160
+    return io.BytesIO(iio.imwrite('<bytes>', pixels, extension=f'.{extension}'))
+
+
+def _update(client, user_plant_id, filename, photo):
+    return client.post(f'/{user_plant_id}/update', data={
+        'size': '10', 'last_watered': '2026-10-01', 'sun_exposure': 'medium', 'pot_diameter': '20',
+        'watered_amount': '0.5', 'plant_position': 'window', 'plant_nickname': 'nickname',
+        'image': (photo, filename)
+    }, content_type='multipart/form-data')
+
+
+def test_upload_with_non_ascii_name(app, plants):
+    client = app.test_client()
+    register(client, 'alice')
+    save_plant(client, plants[0])
+
+    response = _update(client, 1, 'фото.jpg', _photo(64, 48))
+    assert response.status_code == 302
+    with app.app_context():
+        image_path = db.session.get(UserPlant, 1).image_path
+    assert image_path.endswith('.jpg')
+
+    # The original and the widths file are served by a front-end server that may run as another user
+    stem = os.path.join(os.path.dirname(app.config['UPLOAD_FOLDER']), os.path.splitext(image_path)[0])
+    for path in [f'{stem}.jpg', f'{stem}_widths.json']:
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+    assert not glob.glob(os.path.join(app.config['UPLOAD_FOLDER'], '*.part'))
+
+
+def test_srcset_uses_actual_variant_widths(app, plants):
+    client = app.test_client()
+    register(client, 'alice')
+    save_plant(client, plants[0])
+
+    # 2000 px wide: the 480 variant is shrunk by 5 to 400 px, the 1024 variant by 2 to 1000 px
+    _update(client, 1, 'garden.png', _photo(2000, 1000, 'png'))
+    page = client.get('/').data.decode()
+    assert ' 400w' in page and ' 1000w' in page
+    assert ' 480w' not in page and ' 1024w' not in page
+
+    with app.app_context():
+        image_path = db.session.get(UserPlant, 1).image_path
+        assert [width for width, _, _ in images.variants(image_path)] == [400, 1000]
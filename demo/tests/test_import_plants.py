@@ -0,0 +1,58 @@
+# tests/test_import_plants.py
+import pytest
+from sqlalchemy import event
+
+from flask_app.catalogue import get_catalogue_version
+from flask_app.models import db, Plant, PlantFacet
+
+
+def _counts(app):
+    with app.app_context():
+        return (
+            db.session.execute(db.select(db.func.count()).select_from(Plant)).scalar_one(),
+            db.session.execute(db.select(db.func.count()).select_from(PlantFacet)).scalar_one(),
+            get_catalogue_version()
+        )
+
+
+def test_import_is_idempotent(app, catalogue_csv):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=['import-plants'])
+    assert result.exit_code == 0, result.output
+    assert '12 inserted, 0 updated, 0 unchanged' in result.output
+    imported = _counts(app)
+    assert imported[0] == 12 and imported[1] > 0
+
+    result = runner.invoke(args=['import-plants'])
+    assert '0 inserted, 0 updated, 12 unchanged' in result.output
+    # Nothing is written, not even a new catalogue version
+    assert _counts(app) == imported
+
+    # A changed row is updated in place
+    text = catalogue_csv.read_text(encoding='utf-8')
+    catalogue_csv.write_text(text.replace('Chinese Abelia', 'Glossy Abelia'), encoding='utf-8')
+    result = runner.invoke(args=['import-plants'])
+    assert '0 inserted, 1 updated, 11 unchanged' in result.output
+    with app.app_context():
+        assert db.session.execute(
+            db.select(Plant.common_name).where(Plant.botanical_name == 'Abelia chinensis')
+        ).scalar_one() == 'Glossy Abelia'
+    assert _counts(app)[:2] == imported[:2]
+
+
+@pytest.mark.parametrize('batch_size, transactions', [(5, 3), (12, 1), (1000, 1)])
+def test_batch_size_sets_the_rows_per_transaction(app, catalogue_csv, batch_size, transactions):
+    runner = app.test_cli_runner()
+    runner.invoke(args=['import-plants'])
+    commits = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda connection: commits.append(connection)
+    event.listen(engine, 'commit', listener)
+    try:
+        # Unchanged rows are only read, one transaction per batch
+        result = runner.invoke(args=['import-plants', '--batch-size', str(batch_size)])
+    finally:
+        event.remove(engine, 'commit', listener)
+    assert '12 unchanged' in result.output
+    assert len(commits) == transactions
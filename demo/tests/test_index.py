@@ -0,0 +1,42 @@
+# tests/test_index.py
+import re
+
+import pytest
+
+from tests.helpers import register, save_plant
+
+
+def _nicknames(page):
+    return re.findall(r'<h1 class="h5">My (\w+) \(', page)
+
+
+@pytest.fixture
+def client(app, plants):
+    """Client of a user with seven plants, nicknamed p0 to p6 in the order they were saved."""
+    client = app.test_client()
+    register(client, 'alice')
+    for number in range(7):
+        save_plant(client, plants[number % len(plants)], plant_nickname=f'p{number}')
+    return client
+
+
+def test_pages_follow_the_save_order(app, client):
+    assert app.config['PLANTS_PER_PAGE'] == 3
+    pages = [_nicknames(client.get(f'/?page={page}').get_data(as_text=True)) for page in (1, 2, 3)]
+    assert pages == [['p0', 'p1', 'p2'], ['p3', 'p4', 'p5'], ['p6']]
+
+
+@pytest.mark.parametrize('page, expected', [('0', ['p0', 'p1', 'p2']), ('-4', ['p0', 'p1', 'p2']),
+                                            ('x', ['p0', 'p1', 'p2']), ('9', [])])
+def test_page_bounds(client, page, expected):
+    response = client.get(f'/?page={page}')
+    assert response.status_code == 200
+    assert _nicknames(response.get_data(as_text=True)) == expected
+
+
+def test_other_users_plants_are_not_listed(app, client):
+    other = app.test_client()
+    register(other, 'bob')
+    save_plant(other, 1, plant_nickname='bobs')
+    assert _nicknames(other.get('/').get_data(as_text=True)) == ['bobs']
+    assert 'bobs' not in client.get('/?page=3').get_data(as_text=True)
@@ -0,0 +1,58 @@
+# tests/test_notifications.py
+from datetime import date, datetime
+
+import pytest
+
+from flask_app.models import db, Notification, User, UserPlant
+from flask_app.notifications import get_swept_until, get_user_notifications, sweep_notifications
+
+
+@pytest.fixture
+def user_id(app, plants):
+    with app.app_context():
+        user = User(username='alice', email='a@example.com', avatar='', password='')
+        db.session.add(user)
+        db.session.commit()
+        return user.user_id
+
+
+def _add(user_id, plant_id, next_watering_at):
+    # Written directly, as a schedule change that bypassed sync_notifications would be
+    user_plant = UserPlant(user_id=user_id, plant_id=plant_id, next_watering_at=next_watering_at)
+    db.session.add(user_plant)
+    db.session.commit()
+    return user_plant.user_plant_id
+
+
+def _notified():
+    return set(db.session.execute(db.select(Notification.user_plant_id)).scalars())
+
+
+@pytest.mark.parametrize('batch_size', [1, 5000])
+def test_sweep_only_reads_plants_due_since_the_watermark(app, user_id, batch_size):
+    with app.app_context():
+        overdue = _add(user_id, 1, datetime(2026, 10, 9, 8))
+        later = _add(user_id, 2, datetime(2026, 10, 12, 18))
+        _add(user_id, 3, None)
+
+        # The first sweep is a full one
+        assert sweep_notifications(today=date(2026, 10, 10), batch_size=batch_size) == (1, 0)
+        assert _notified() == {overdue}
+        assert get_swept_until() == datetime(2026, 10, 11)
+        assert sweep_notifications(today=date(2026, 10, 10), batch_size=batch_size) == (0, 0)
+
+        # Due before the watermark, so an incremental sweep does not see it
+        missed = _add(user_id, 4, datetime(2026, 10, 5))
+        # Not swept yet, but already listed from the user's next_watering_at range
+        listed = {row['user_plant_id'] for row in get_user_notifications(user_id, today=date(2026, 10, 12))}
+        assert listed == {overdue, later}
+
+        assert sweep_notifications(today=date(2026, 10, 12), batch_size=batch_size) == (1, 0)
+        assert _notified() == {overdue, later}
+        assert get_swept_until() == datetime(2026, 10, 13)
+
+        # A full sweep reconciles everything, including removed plants
+        db.session.execute(db.delete(UserPlant).where(UserPlant.user_plant_id == overdue))
+        db.session.commit()
+        assert sweep_notifications(today=date(2026, 10, 12), full=True, batch_size=batch_size) == (1, 1)
+        assert _notified() == {later, missed}
@@ -0,0 +1,43 @@
+# tests/test_presence.py
+from datetime import datetime, timedelta, timezone
+
+from flask_app.models import db, User
+from flask_app.presence import presence
+
+
+def _last_time_seen(app, user_id):
+    with app.app_context():
+        return db.session.execute(db.select(User.last_time_seen).where(User.user_id == user_id)).scalar_one()
+
+
+def test_last_seen_is_written_at_most_once_per_interval(app):
+    with app.app_context():
+        user = User(username='alice', email='a@example.com', avatar='', password='')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.user_id
+    interval = timedelta(seconds=app.config['PRESENCE_WRITE_INTERVAL_SECONDS'])
+    # The tracker is shared by the apps of all tests; start clear of what earlier ones wrote
+    start = datetime.now(timezone.utc) + 2 * interval
+
+    presence.touch(user_id, when=start)
+    assert presence.flush() == 1
+    assert _last_time_seen(app, user_id) == start.replace(tzinfo=None)
+
+    # Seen again within the interval: buffered, not written
+    for seconds in (1, 30, 60):
+        presence.touch(user_id, when=start + timedelta(seconds=seconds))
+    assert presence.flush() == 0
+    assert _last_time_seen(app, user_id) == start.replace(tzinfo=None)
+    assert presence.last_seen(user_id) == start + timedelta(seconds=60)
+
+    # Once the interval has passed, the latest timestamp is written
+    presence.touch(user_id, when=start + interval)
+    assert presence.flush() == 1
+    assert _last_time_seen(app, user_id) == (start + interval).replace(tzinfo=None)
+
+    # A forced flush writes whatever is buffered
+    presence.touch(user_id, when=start + interval + timedelta(seconds=5))
+    assert presence.flush() == 0
+    assert presence.flush(force=True) == 1
+    assert presence.flush(force=True) == 0
@@ -0,0 +1,15 @@
+# tests/test_recommend.py
+import glob
+import os
+import stat
+
+from flask_app.recommend import recommender
+
+
+def test_feature_files_are_world_readable(app, plants):
+    with app.app_context():
+        recommender.build()
+    paths = glob.glob(os.path.join(app.config['RECOMMENDATION_FOLDER'], 'plant_*.npy'))
+    assert len(paths) == 2
+    for path in paths:
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
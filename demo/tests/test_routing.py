@@ -0,0 +1,122 @@
+# tests/test_routing.py
+import sqlite3
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import event
+
+from flask_app import create_app, routing
+from flask_app.models import db, Plant, UserPlant
+from flask_app.presence import presence
+from tests.conftest import CATALOGUE
+from tests.helpers import register, save_plant
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Stand-in for the clock routing.py reads; set clock.now to move it."""
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(routing, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def replicated_app(tmp_path, monkeypatch, clock):
+    """App on a primary and a replica SQLite file, each holding the same user and plant."""
+    primary, replica = tmp_path / 'primary.sqlite', tmp_path / 'replica.sqlite'
+    monkeypatch.setenv('DATABASE_URL', f'sqlite:///{primary}')
+    (tmp_path / 'static' / 'images').mkdir(parents=True)
+    app = create_app({
+        'TESTING': True,
+        'DATABASE_REPLICA_URLS': [f'sqlite:///{replica}'],
+        'UPLOAD_FOLDER': str(tmp_path / 'static' / 'images'),
+        'CATALOGUE_IMAGE_FOLDER': str(tmp_path / 'catalogue_images'),
+        'RECOMMENDATION_FOLDER': str(tmp_path / 'recommendations'),
+        'PRESENCE_BACKGROUND_FLUSH': False,
+        'IMAGE_BACKGROUND_PROCESSING': False
+    })
+    with app.app_context():
+        db.create_all(bind_key=None)
+        for plant_id, (name, plant_type, min_water, max_water) in enumerate(CATALOGUE, start=1):
+            db.session.add(Plant(
+                plant_id=plant_id, common_name=name, botanical_name=f'{name} officinalis', plant_type=plant_type,
+                min_water_consumption=min_water, max_water_consumption=max_water, light_needs='Full sun'
+            ))
+        db.session.commit()
+    client = app.test_client()
+    register(client, 'alice')
+    save_plant(client, 1, plant_position='balcony')
+    presence.flush(force=True)
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+    # Replicate, then mark the replica's copy of the row so that pages tell where they read from
+    with sqlite3.connect(primary) as source, sqlite3.connect(replica) as target:
+        source.backup(target)
+        target.execute("UPDATE userplant SET plant_position = 'replica balcony'")
+    yield app, client
+    presence.flush(force=True)
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    # db keeps a MetaData per bind key; other apps have no replica, so create_all must not see it
+    db.metadatas.pop(f'{routing.REPLICA_BIND_PREFIX}0', None)
+
+
+@pytest.fixture
+def statements(replicated_app):
+    """{bind key: number of statements run on its engine}."""
+    app, _ = replicated_app
+    counts = {}
+    listeners = []
+    with app.app_context():
+        for key, engine in db.engines.items():
+            counts[key] = 0
+            listener = lambda *args, key=key: counts.__setitem__(key, counts[key] + 1)
+            event.listen(engine, 'before_cursor_execute', listener)
+            listeners.append((engine, listener))
+    yield counts
+    for engine, listener in listeners:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+
+def _reset(counts):
+    for key in counts:
+        counts[key] = 0
+
+
+def test_reads_writes_and_stickiness(replicated_app, statements, clock):
+    app, client = replicated_app
+    with app.app_context():
+        user_plant_id = db.session.execute(db.select(UserPlant.user_plant_id)).scalar_one()
+    # Past the window opened by saving the plant
+    clock.now += app.config['REPLICA_STICKY_SECONDS'] + 1
+    _reset(statements)
+
+    page = client.get('/').get_data(as_text=True)
+    assert 'replica balcony' in page
+    assert statements['replica_0'] > 0
+    assert statements[None] == 0
+
+    _reset(statements)
+    response = client.post(f'/{user_plant_id}/update', data={
+        'size': '10', 'sun_exposure': 'medium', 'last_watered': '2026-10-01', 'pot_diameter': '20',
+        'watered_amount': '0.5', 'plant_position': 'kitchen', 'plant_nickname': 'nickname'
+    })
+    assert response.status_code == 302
+    assert statements[None] > 0
+    assert statements['replica_0'] == 0
+
+    # The page after the redirect reads from the primary, so it shows the change
+    _reset(statements)
+    page = client.get(response.headers['Location']).get_data(as_text=True)
+    assert 'kitchen' in page
+    assert statements[None] > 0
+    assert statements['replica_0'] == 0
+
+    # Once the window is over, reads go back to the replica
+    clock.now += app.config['REPLICA_STICKY_SECONDS'] + 1
+    _reset(statements)
+    client.get('/')
+    assert statements['replica_0'] > 0
+    assert statements[None] == 0
@@ -0,0 +1,108 @@
+# tests/test_schedule.py
+from datetime import date, datetime, timedelta
+import math
+import pandas as pd
+import pytest
+
+from flask_app.models import db, Plant, User, UserPlant
+from flask_app.plant import calculate_next_watering, calculate_water_consumption, check_if_watering_needed
+from flask_app.schedule import apply_stored_schedule, refresh_schedules, schedule_values
+from tests.helpers import register, save_plant
+
+TODAY = datetime.today().date()
+
+ROWS = [
+    # sun_exposure, pot_diameter, watered_amount, last_watered, min, max
+    ('low', 20.0, 0.5, datetime(2026, 9, 1), 400, 800),
+    ('medium', 35.0, 1.25, datetime(2026, 9, 20, 18, 30), 200, 400),
+    ('high', 12.5, 0.3, datetime.combine(TODAY, datetime.min.time()), 500, 700),
+    ('partial', 50.0, 2.0, datetime.combine(TODAY - timedelta(days=3), datetime.min.time()), 600, 900),
+    ('medium', 20.0, 0.05, datetime(2025, 1, 1, 7, 45), 1000, 1200)
+]
+
+
+def _frame(rows):
+    return pd.DataFrame(rows, columns=[
+        'sun_exposure', 'pot_diameter', 'watered_amount', 'last_watered',
+        'min_water_consumption', 'max_water_consumption'
+    ])
+
+
+def _stored_schedule(rows):
+    """Compute the persisted schedule of rows and derive the displayed columns from it, as the index does."""
+    daily, next_at = schedule_values(_frame(rows))
+    stored_df = pd.DataFrame({'daily_consumption_l': daily, 'next_watering_at': next_at})
+    return apply_stored_schedule(stored_df, today=TODAY), daily, next_at
+
+
+def test_matches_scalar_helpers():
+    plants_df, daily, next_at = _stored_schedule(ROWS)
+
+    for i, (sun, diameter, amount, watered, min_water, max_water) in enumerate(ROWS):
+        consumption = calculate_water_consumption(sun, diameter, min_water, max_water)
+        next_date = calculate_next_watering(watered, amount, consumption)
+        days, needed = check_if_watering_needed(next_date)
+
+        assert plants_df['daily_water_consumption'][i] == pytest.approx(consumption, rel=1e-12)
+        assert daily[i] == pytest.approx(consumption, rel=1e-12)
+        assert plants_df['next_watering_date'][i] == next_date
+        assert next_at[i].date() == next_date
+        assert plants_df['time_to_watering'][i] == days
+        assert plants_df['needs_watering'][i] == needed
+
+
+def test_rows_without_schedule():
+    rows = [
+        # Consumption not a number: the catalogue has no water consumption
+        ('low', 20.0, 0.5, datetime(2026, 9, 1), None, 800),
+        # Never watered
+        ('medium', 20.0, 0.5, None, 400, 800),
+        # Zero consumption would never need water
+        ('low', 20.0, 0.5, datetime(2026, 9, 1), 0, 800)
+    ]
+    assert math.isnan(calculate_water_consumption('low', 20.0, float('nan'), 800))
+    with pytest.raises(ValueError):
+        calculate_next_watering(datetime(2026, 9, 1), 0.5, float('nan'))
+    assert pd.isna(calculate_next_watering(None, 0.5, calculate_water_consumption('medium', 20.0, 400, 800)))
+
+    plants_df, daily, next_at = _stored_schedule(rows)
+
+    assert daily[0] is None
+    assert daily[1] == pytest.approx(calculate_water_consumption('medium', 20.0, 400, 800))
+    assert daily[2] == 0
+    assert next_at == [None, None, None]
+    assert plants_df['next_watering_date'].tolist() == [None, None, None]
+    assert plants_df['time_to_watering'].isna().all()
+    assert not plants_df['needs_watering'].any()
+
+
+def test_scalar_helpers_use_today():
+    watered = datetime.combine(date.today(), datetime.min.time())
+    consumption = calculate_water_consumption('high', 20.0, 365, 365)
+    next_date = calculate_next_watering(watered, consumption, consumption)
+    assert next_date == date.today() + timedelta(days=1)
+    assert check_if_watering_needed(next_date) == (-1, False)
+
+
+def test_refresh_bumps_versions_of_changed_rows(app, plants):
+    client = app.test_client()
+    register(client, 'alice')
+    save_plant(client, 1)
+    save_plant(client, 2)
+    assert b'Daily Water Consumption (litres): 0.0516' in client.get('/').data
+    with app.app_context():
+        versions = dict(db.session.execute(db.select(UserPlant.plant_id, UserPlant.row_version)).all())
+        plants_version = db.session.execute(db.select(User.plants_version)).scalar_one()
+
+        # The consumption of plant 1 changes, e.g. with a new fitted factor
+        db.session.get(Plant, 1).min_water_consumption = 4000
+        db.session.get(Plant, 1).max_water_consumption = 8000
+        db.session.commit()
+        assert refresh_schedules() == 1
+        db.session.commit()
+        assert dict(db.session.execute(db.select(UserPlant.plant_id, UserPlant.row_version)).all()) == \
+            {1: versions[1] + 1, 2: versions[2]}
+        assert db.session.execute(db.select(User.plants_version)).scalar_one() == plants_version + 1
+        assert refresh_schedules() == 0
+
+    assert b'Daily Water Consumption (litres): 0.5164' in client.get('/').data
@@ -0,0 +1,40 @@
+# tests/test_search.py
+from flask_app.models import db
+from flask_app.search import count_search_matches, has_search_index, rebuild_search_index, search_plant_ids
+
+from tests.helpers import register
+
+
+def test_search_without_index_falls_back(app, plants):
+    with app.app_context():
+        assert not has_search_index()
+        assert search_plant_ids('rose') == [1]
+        assert count_search_matches('officinalis') == len(plants)
+
+
+def test_rebuild_creates_missing_index(app, plants):
+    with app.app_context():
+        rebuild_search_index()
+        db.session.commit()
+        assert has_search_index()
+        assert search_plant_ids('lav') == [2]
+        assert search_plant_ids('officinalis', limit=2) == search_plant_ids('officinalis')[:2]
+        assert count_search_matches('officinalis') == len(plants)
+
+
+def test_add_page_searches_without_index(app, plants):
+    client = app.test_client()
+    register(client, 'alice')
+    response = client.get('/add?plant_name=basil')
+    assert response.status_code == 200
+    assert b'Basil' in response.data
+
+
+def test_faceted_search_reports_truncated_candidates(app, plants, monkeypatch):
+    from flask_app import facets
+    monkeypatch.setattr(facets, 'MAX_SEARCH_CANDIDATES', 2)
+    with app.app_context():
+        _, total, _, complete = facets.faceted_search('officinalis')
+        assert (total, complete) == (len(plants), True)
+        _, total, _, complete = facets.faceted_search('officinalis', {'plant_type': ['Shrub']})
+        assert not complete
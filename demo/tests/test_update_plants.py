@@ -0,0 +1,54 @@
+# tests/test_update_plants.py
+from flask_app.catalogue import get_catalogue_version
+from flask_app.models import db, Plant
+
+
+def _plant(app, botanical_name):
+    with app.app_context():
+        return db.session.execute(db.select(Plant).where(Plant.botanical_name == botanical_name)).scalar_one()
+
+
+def _edit_catalogue(catalogue_csv):
+    text = catalogue_csv.read_text(encoding='utf-8')
+    text = text.replace('Chinese Abelia', 'Glossy Abelia')
+    text = text.replace('https://xeraplants.com/wp-content/uploads/2020/12/logo_gray-1.jpg', 'https://example.com/abelia.jpg')
+    catalogue_csv.write_text(text, encoding='utf-8')
+
+
+def test_dry_run_reports_without_writing(app, catalogue_csv):
+    runner = app.test_cli_runner()
+    runner.invoke(args=['import-plants'])
+    _edit_catalogue(catalogue_csv)
+    with app.app_context():
+        version = get_catalogue_version()
+
+    result = runner.invoke(args=['update-plants', '--dry-run', '--columns', 'common_name,image_location'])
+    assert result.exit_code == 0, result.output
+    assert "common_name: 'Chinese Abelia' -> 'Glossy Abelia'" in result.output
+    assert "'https://example.com/abelia.jpg'" in result.output
+    assert 'Dry run: 2 records would be updated, 0 records skipped.' in result.output
+    assert _plant(app, 'Abelia chinensis').common_name == 'Chinese Abelia'
+    with app.app_context():
+        assert get_catalogue_version() == version
+
+
+def test_only_the_given_columns_are_updated(app, catalogue_csv):
+    runner = app.test_cli_runner()
+    runner.invoke(args=['import-plants'])
+    _edit_catalogue(catalogue_csv)
+
+    # The default column is image_location
+    result = runner.invoke(args=['update-plants'])
+    assert '1 records updated' in result.output
+    assert _plant(app, 'Abelia floribunda').image_location == 'https://example.com/abelia.jpg'
+    assert _plant(app, 'Abelia chinensis').common_name == 'Chinese Abelia'
+
+    result = runner.invoke(args=['update-plants', '-c', 'common_name', '-c', 'plant_type'])
+    assert '1 records updated' in result.output
+    assert _plant(app, 'Abelia chinensis').common_name == 'Glossy Abelia'
+
+
+def test_unknown_column_is_rejected(app, catalogue_csv):
+    result = app.test_cli_runner().invoke(args=['update-plants', '--columns', 'plant_id'])
+    assert result.exit_code == 2
+    assert 'unknown column(s) plant_id' in result.output
@@ -0,0 +1,89 @@
+# tests/test_user_snapshot.py
+import pytest
+from flask import session as flask_session
+from sqlalchemy import event
+
+from flask_app.auth import USER_SNAPSHOT_FORMAT, UserProxy
+from flask_app.models import db, User
+from tests.helpers import register
+
+
+@pytest.fixture
+def user_queries(app):
+    """List of the statements run against the user table."""
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda conn, cursor, statement, *args: statements.append(statement) if 'FROM user' in statement else None
+    event.listen(engine, 'before_cursor_execute', listener)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', listener)
+
+
+def _rename(app, name):
+    # As another session would, through the profile page
+    with app.app_context():
+        user = db.session.execute(db.select(User)).scalar_one()
+        user.username = name
+        user.user_version += 1
+        db.session.commit()
+
+
+def test_login_stores_a_snapshot(app):
+    client = app.test_client()
+    register(client, 'alice')
+    with client.session_transaction() as session:
+        snapshot = session['user']
+    assert snapshot['format'] == USER_SNAPSHOT_FORMAT
+    assert snapshot['user_id'] == session['user_id']
+    assert (snapshot['username'], snapshot['user_version']) == ('alice', 1)
+
+
+def test_snapshot_is_used_until_it_is_too_old(app, plants, user_queries):
+    client = app.test_client()
+    register(client, 'alice')
+    _rename(app, 'alicia')
+    user_queries.clear()
+
+    # The view only needs g.user.user_id, so the User row is not loaded
+    assert client.get('/autocomplete?q=ro').status_code == 200
+    assert user_queries == []
+    with client.session_transaction() as session:
+        assert session['user']['username'] == 'alice'
+        session['user'] = dict(session['user'], checked_at=session['user']['checked_at'] -
+                               app.config['USER_SNAPSHOT_MAX_AGE_SECONDS'])
+
+    client.get('/autocomplete?q=ro')
+    assert len(user_queries) == 1
+    with client.session_transaction() as session:
+        assert (session['user']['username'], session['user']['user_version']) == ('alicia', 2)
+
+
+def test_loading_the_row_refreshes_a_stale_snapshot(app):
+    client = app.test_client()
+    register(client, 'alice')
+    _rename(app, 'alicia')
+    with client.session_transaction() as session:
+        snapshot = session['user']
+
+    with app.test_request_context():
+        flask_session['user'] = snapshot
+        proxy = UserProxy(snapshot)
+        assert proxy.username == 'alice'
+        # Attributes the snapshot does not carry load the row, whose user_version is newer
+        assert proxy.email == 'alice@example.com'
+        assert (flask_session['user']['username'], flask_session['user']['user_version']) == ('alicia', 2)
+
+
+def test_snapshot_of_a_deleted_user_logs_out(app):
+    client = app.test_client()
+    register(client, 'alice')
+    with app.app_context():
+        db.session.execute(db.delete(User))
+        db.session.commit()
+    with client.session_transaction() as session:
+        session['user'] = dict(session['user'], checked_at=0)
+    response = client.get('/')
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        assert 'user_id' not in session
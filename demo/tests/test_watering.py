@@ -0,0 +1,94 @@
+# tests/test_watering.py
+import re
+from datetime import datetime
+
+from flask_app import watering
+from flask_app.models import db, UserPlant, WateringEvent, WateringRollup
+from flask_app.watering import refresh_watering_rollups, water_use
+from tests.helpers import register, save_plant
+
+
+def _events():
+    return db.session.execute(db.select(db.func.count()).select_from(WateringEvent)).scalar_one()
+
+
+def test_edit_after_one_click_watering_keeps_its_time(app, plants):
+    client = app.test_client()
+    register(client, 'alice')
+    save_plant(client, 1)
+    with app.app_context():
+        user_plant_id = db.session.execute(db.select(UserPlant.user_plant_id)).scalar_one()
+    client.post(f'/{user_plant_id}/water')
+    with app.app_context():
+        watered_at = db.session.get(UserPlant, user_plant_id).last_watered
+        events = _events()
+
+    page = client.get(f'/{user_plant_id}/update').get_data(as_text=True)
+    form = dict(re.findall(r'name="(\w+)" class="form-control"[^>]* value="([^"]*)"', page))
+    form = {**form, 'sun_exposure': 'medium', 'plant_position': 'kitchen'}
+    assert form['last_watered'] == watered_at.date().isoformat()
+    client.post(f'/{user_plant_id}/update', data=form)
+
+    with app.app_context():
+        user_plant = db.session.get(UserPlant, user_plant_id)
+        assert user_plant.plant_position == 'kitchen'
+        assert user_plant.last_watered == watered_at
+        assert _events() == events
+
+
+def test_changing_only_the_amount_corrects_the_logged_watering(app, plants):
+    client = app.test_client()
+    register(client, 'alice')
+    save_plant(client, 1, last_watered='2026-10-05', watered_amount='0.5')
+    with app.app_context():
+        user_plant_id = db.session.execute(db.select(UserPlant.user_plant_id)).scalar_one()
+        assert refresh_watering_rollups() == 1
+
+    page = client.get(f'/{user_plant_id}/update').get_data(as_text=True)
+    form = dict(re.findall(r'name="(\w+)" class="form-control"[^>]* value="([^"]*)"', page))
+    client.post(f'/{user_plant_id}/update', data={**form, 'sun_exposure': 'medium', 'watered_amount': '1.5'})
+
+    with app.app_context():
+        assert db.session.execute(db.select(WateringEvent.amount_l)).scalars().all() == [1.5]
+        assert refresh_watering_rollups() == 0
+        rollups = db.session.execute(db.select(WateringRollup.period, WateringRollup.events, WateringRollup.amount_l)
+                                     .order_by(WateringRollup.period)).all()
+        assert [tuple(row) for row in rollups] == [('month', 1, 1.5), ('week', 1, 1.5)]
+        assert water_use('week')[['events', 'amount_l']].values.tolist() == [[1, 1.5]]
+
+
+def _add_event(event_id):
+    db.session.add(WateringEvent(
+        event_id=event_id, user_plant_id=1, user_id=1, plant_id=1, watered_at=datetime(2026, 10, 5), amount_l=1.0
+    ))
+    db.session.commit()
+
+
+def _rolled_up():
+    return db.session.execute(
+        db.select(WateringRollup.events).where(WateringRollup.period == 'week')
+    ).scalar_one_or_none()
+
+
+def test_rollups_pick_up_events_committed_late(app, plants, monkeypatch):
+    with app.app_context():
+        # Event 2 is still uncommitted when 1 and 3 are rolled up
+        _add_event(1)
+        _add_event(3)
+        assert refresh_watering_rollups() == 2
+        assert _rolled_up() == 2
+
+        _add_event(2)
+        assert water_use('week')['events'].tolist() == [3]
+        assert refresh_watering_rollups() == 1
+        assert _rolled_up() == 3
+        assert refresh_watering_rollups() == 0
+
+        # Ids missing for longer than ROLLUP_GAP_SECONDS are given up
+        _add_event(6)
+        refresh_watering_rollups()
+        monkeypatch.setattr(watering, 'ROLLUP_GAP_SECONDS', 0)
+        refresh_watering_rollups()
+        _add_event(5)
+        assert refresh_watering_rollups() == 0
+        assert _rolled_up() == 4